@@ -1,15 +1,56 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Request, UploadFile, File, Form
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from typing import Any, AsyncIterator, Dict, List
 import httpx
 import os
 from logger import log  # Используем кастомный логгер
-
-app = FastAPI()
+from http_client import close_http_client, get_http_client, iter_upstream, start_http_client, stream_proxy
+from health_monitor import HealthMonitor
 
 # Загрузка конфигураций
 SQLITE_URL = os.getenv("SQLITE_URL")
 MONGO_SERVER_URL = os.getenv("MONGO_SERVER_URL")
 WORKER_CONTROL_SERVER_URL = os.getenv("WORKER_CONTROL_SERVER_URL", default="http://worker-node-control-server:8003")
+# Максимальное время ожидания результата разложения (в секундах): задачи могут выполняться минутами
+DECOMPOSITION_TIMEOUT = float(os.getenv("DECOMPOSITION_TIMEOUT", "1800"))
+# Загрузка матрицы передаётся потоком: размер части и таймаут ожидания каждой операции (в секундах)
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_TIMEOUT = float(os.getenv("UPLOAD_TIMEOUT", "300"))
+# Таймаут ожидания очередной части артефакта результата при скачивании (в секундах)
+ARTIFACT_TIMEOUT = float(os.getenv("ARTIFACT_TIMEOUT", "600"))
+
+# Кэш доступности сервисов, обновляемый в фоне
+health_monitor = HealthMonitor({
+    "sqlite": SQLITE_URL,
+    "mongo": MONGO_SERVER_URL,
+    "worker_control": WORKER_CONTROL_SERVER_URL,
+})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_http_client()
+    health_monitor.start()
+    yield
+    await health_monitor.stop()
+    await close_http_client()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(httpx.RequestError)
+async def request_error_handler(request: Request, exc: httpx.RequestError):
+    # Ошибка соединения с сервисом сразу учитывается в его предохранителе
+    service = health_monitor.find_service(str(exc.request.url))
+    if service is not None:
+        health_monitor.report_failure(service, exc)
+    log(f"Request to {exc.request.url} failed: {exc}", level="error")
+    return JSONResponse(status_code=503, content={"detail": "Сервис недоступен"})
+
+
 # Pydantic модель для регистрации пользователя
 class RegisterCredentials(BaseModel):
     name: str
@@ -29,23 +70,22 @@ class IdCredentials(BaseModel):
 class MatrixName(BaseModel):
     matrix_name: str
     algorithm: str
+    options: Dict[str, Any] = {}
+    accept_artifact: bool = False  # Большой результат - ссылкой на артефакт вместо блоков
     
+class MatrixJob(MatrixName):
+    priority: int = 0
+
 class InvertibleMatrixName(BaseModel):
     matrix_name: str
+    accept_artifact: bool = False
 
-# Функция для проверки доступности серверов
-async def check_server_availability(url: str):
-    try:
-        log(f"Checking server availability: {url}")
-        async with httpx.AsyncClient() as client:
-            print(f" checking server availability for url:{url}")
-            response = await client.get(url)
-            if response.status_code == 200:
-                log(f"Server available: {url}")
-                return True
-    except httpx.RequestError as e:
-        log(f"Request error while checking {url}: {e}", level="error")
-    return False
+class MatrixBatch(BaseModel):
+    matrix_names: List[str]
+    algorithms: List[str]
+    options: Dict[str, Any] = {}
+    priority: int = 0
+    accept_artifact: bool = False
 
 # Корневой маршрут, добавьте его
 @app.get("/")
@@ -56,12 +96,11 @@ async def read_root():
 @app.post("/login")
 async def login_user(credentials: LoginCredentials):
     log(f"User login attempt: {credentials.login}")
-    if not await check_server_availability(f"{SQLITE_URL}/status"):
+    if not await health_monitor.is_available("sqlite"):
         log(f"SQLite server unavailable: {SQLITE_URL}/status", level="error")
         raise HTTPException(status_code=503, detail="SQLite сервер недоступен")
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(f"{SQLITE_URL}/login", json=credentials.dict())
+    response = await get_http_client().post(f"{SQLITE_URL}/login", json=credentials.dict())
 
     if response.status_code != 200:
         log(f"Login failed for user {credentials.login}: {response.text}", level="error")
@@ -74,12 +113,11 @@ async def login_user(credentials: LoginCredentials):
 @app.post("/register")
 async def register(credentials: RegisterCredentials):
     log(f"User registration attempt: {credentials.login}")
-    if not await check_server_availability(f"{SQLITE_URL}/status"):
+    if not await health_monitor.is_available("sqlite"):
         log(f"SQLite server unavailable: {SQLITE_URL}/status", level="error")
         raise HTTPException(status_code=503, detail="SQLite сервер недоступен")
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(f"{SQLITE_URL}/register", json=credentials.model_dump())
+    response = await get_http_client().post(f"{SQLITE_URL}/register", json=credentials.model_dump())
 
     if response.status_code != 200:
         log(f"Registration failed for user {credentials.login}: {response.text}", level="error")
@@ -89,35 +127,56 @@ async def register(credentials: RegisterCredentials):
     return response.json()
 
 # API для сохранения матрицы
-@app.post("/save_matrix")
-async def save_matrix(login: str = Form(...), matrix_file: UploadFile = File(...)):
-    log(f"Saving matrix {matrix_file.filename} for user {login}")
-    if not await check_server_availability(f"{MONGO_SERVER_URL}/status"):
+async def iter_upload_file(matrix_file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await matrix_file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+async def proxy_matrix_upload(login: str, matrix_name: str, chunks: AsyncIterator[bytes]):
+    """
+    Передаёт матрицу на MongoDB сервер потоком (Transfer-Encoding: chunked), не собирая её в памяти.
+    """
+    if not await health_monitor.is_available("mongo"):
         log(f"MongoDB server unavailable: {MONGO_SERVER_URL}/status", level="error")
         raise HTTPException(status_code=503, detail="MongoDB сервер недоступен")
 
-    async with httpx.AsyncClient() as client:
-        files = {'matrix_file': (matrix_file.filename, await matrix_file.read())}
-        data = {'login': login}
-        response = await client.post(f"{MONGO_SERVER_URL}/save_matrix", data=data, files=files)
+    response = await get_http_client().put(
+        f"{MONGO_SERVER_URL}/upload_matrix", params={"login": login, "matrix_name": matrix_name},
+        content=chunks, headers={"Content-Type": "application/octet-stream"},
+        timeout=httpx.Timeout(UPLOAD_TIMEOUT, connect=10.0),
+    )
 
     if response.status_code != 200:
         log(f"Matrix save failed for user {login}: {response.text}", level="error")
         raise HTTPException(status_code=response.status_code, detail="Ошибка при сохранении матрицы")
 
-    log(f"Matrix {matrix_file.filename} saved successfully for user {login}.")
+    log(f"Matrix {matrix_name} saved successfully for user {login}.")
     return response.json()
 
+
+@app.post("/save_matrix")
+async def save_matrix(login: str = Form(...), matrix_file: UploadFile = File(...)):
+    log(f"Saving matrix {matrix_file.filename} for user {login}")
+    return await proxy_matrix_upload(login, matrix_file.filename, iter_upload_file(matrix_file))
+
+
+@app.put("/upload_matrix")
+async def upload_matrix(login: str, matrix_name: str, request: Request):
+    """
+    Потоковая загрузка матрицы без multipart: тело запроса - файл .mtx, передаётся дальше по частям.
+    """
+    log(f"Uploading matrix {matrix_name} for user {login}")
+    return await proxy_matrix_upload(login, matrix_name, request.stream())
+
 # API для получения списка матриц
 @app.post("/get_matrices_by_user_login")
 async def get_matrices_by_user_login(credentials: IdCredentials):
     log(f"Fetching matrix list for user {credentials.login}")
-    if not await check_server_availability(f"{MONGO_SERVER_URL}/status") or not await check_server_availability(f"{SQLITE_URL}/status"):
+    if not await health_monitor.is_available("mongo") or not await health_monitor.is_available("sqlite"):
         log(f"One or more servers unavailable: {MONGO_SERVER_URL}, {SQLITE_URL}", level="error")
         raise HTTPException(status_code=503, detail="Один из серверов недоступен")
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(f"{MONGO_SERVER_URL}/get_matrices_by_user_login", json=credentials.model_dump())
+    response = await get_http_client().post(f"{MONGO_SERVER_URL}/get_matrices_by_user_login", json=credentials.model_dump())
 
     if response.status_code != 200:
         log(f"Failed to fetch matrices for user {credentials.login}: {response.text}", level="error")
@@ -133,12 +192,14 @@ async def calculate_decomposition_of_matrix_by_matrix_name(credentials: MatrixNa
     algorithm = credentials.algorithm
     log(f"Calculating decomposition for {matrix_name} with {algorithm} algorithm")
 
-    if not await check_server_availability(f"{MONGO_SERVER_URL}/status") or not await check_server_availability(f"{WORKER_CONTROL_SERVER_URL}/status"):
+    if not await health_monitor.is_available("mongo") or not await health_monitor.is_available("worker_control"):
         log(f"Required servers unavailable: {MONGO_SERVER_URL}, {WORKER_CONTROL_SERVER_URL}", level="error")
         raise HTTPException(status_code=503, detail="Необходимые серверы недоступны")
 
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        response = await client.post(f"{WORKER_CONTROL_SERVER_URL}/calculate_decomposition_of_matrix_by_matrix_name", json=credentials.model_dump())
+    response = await get_http_client().post(
+        f"{WORKER_CONTROL_SERVER_URL}/calculate_decomposition_of_matrix_by_matrix_name", json=credentials.model_dump(),
+        timeout=httpx.Timeout(10.0, read=DECOMPOSITION_TIMEOUT),
+    )
 
     if response.status_code != 200:
         error_details = response.json() if response.headers.get("content-type") == "application/json" else response.text
@@ -148,18 +209,93 @@ async def calculate_decomposition_of_matrix_by_matrix_name(credentials: MatrixNa
     log(f"{algorithm} decomposition matrix for {matrix_name} calculated successfully.")
     return response.json()
 
+# Пакет разложений: результаты control server'а (NDJSON) передаются клиенту потоком по мере готовности
+@app.post("/batch")
+async def calculate_batch(batch: MatrixBatch):
+    log(f"Calculating batch: {batch.matrix_names} x {batch.algorithms}")
+
+    if not await health_monitor.is_available("mongo") or not await health_monitor.is_available("worker_control"):
+        log(f"Required servers unavailable: {MONGO_SERVER_URL}, {WORKER_CONTROL_SERVER_URL}", level="error")
+        raise HTTPException(status_code=503, detail="Необходимые серверы недоступны")
+
+    client = get_http_client()
+    request = client.build_request(
+        "POST", f"{WORKER_CONTROL_SERVER_URL}/batch", json=batch.model_dump(),
+        timeout=httpx.Timeout(10.0, read=DECOMPOSITION_TIMEOUT),
+    )
+    response = await client.send(request, stream=True)
+    if response.status_code != 200:
+        await response.aread()
+        await response.aclose()
+        log(f"Batch failed: HTTP {response.status_code}: {response.text}", level="error")
+        return job_proxy_response(response)
+
+    headers = {name: response.headers[name] for name in ("content-encoding",) if name in response.headers}
+    return StreamingResponse(iter_upstream(response), media_type="application/x-ndjson", headers=headers)
+
+# Большие результаты разложений хранятся как артефакты (бинарные кадры) и скачиваются потоком, с поддержкой Range
+@app.get("/artifacts/{artifact_id}")
+async def get_artifact(artifact_id: str, request: Request):
+    log(f"Downloading artifact {artifact_id}")
+    return await stream_proxy(f"{WORKER_CONTROL_SERVER_URL}/artifacts/{artifact_id}", request.headers,
+                              timeout=httpx.Timeout(10.0, read=ARTIFACT_TIMEOUT))
+
+# Асинхронный API задач: задача ставится в очередь control server'а, результат забирается позже
+@app.post("/jobs", status_code=202)
+async def create_job(job: MatrixJob):
+    log(f"Submitting {job.algorithm} decomposition job for {job.matrix_name} with priority {job.priority}")
+
+    if not await health_monitor.is_available("mongo") or not await health_monitor.is_available("worker_control"):
+        log(f"Required servers unavailable: {MONGO_SERVER_URL}, {WORKER_CONTROL_SERVER_URL}", level="error")
+        raise HTTPException(status_code=503, detail="Необходимые серверы недоступны")
+
+    response = await get_http_client().post(f"{WORKER_CONTROL_SERVER_URL}/jobs", json=job.model_dump())
+    return job_proxy_response(response)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    response = await get_http_client().get(
+        f"{WORKER_CONTROL_SERVER_URL}/jobs/{job_id}", params={"wait": wait},
+        timeout=httpx.Timeout(10.0, read=wait + 30.0),
+    )
+    return job_proxy_response(response)
+
+
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    response = await get_http_client().delete(f"{WORKER_CONTROL_SERVER_URL}/jobs/{job_id}")
+    return job_proxy_response(response)
+
+
+def job_proxy_response(response: httpx.Response) -> JSONResponse:
+    """
+    Передаёт клиенту ответ control server'а с тем же кодом (202 - задача ещё выполняется, 429 - очередь заполнена).
+    Ответ не в формате JSON (например, текст ошибки 502 от прокси) передаётся в поле detail.
+    """
+    if response.status_code >= 400:
+        log(f"Job request failed: HTTP {response.status_code}: {response.text}", level="error")
+    headers = {name: response.headers[name] for name in ("Location", "Retry-After") if name in response.headers}
+    if response.headers.get("content-type", "").startswith("application/json"):
+        content = response.json()
+    else:
+        content = {"detail": response.text}
+    return JSONResponse(status_code=response.status_code, content=content, headers=headers)
+
 # API для вычисления обратимой матрицы
 @app.post("/calculate_invertible_matrix_by_matrix_name")
 async def calculate_invertible_matrix_by_matrix_name(credentials: InvertibleMatrixName):
     matrix_name = credentials.matrix_name
     log(f"Calculating invertible matrix for {matrix_name}")
 
-    if not await check_server_availability(f"{MONGO_SERVER_URL}/status") or not await check_server_availability(f"{WORKER_CONTROL_SERVER_URL}/status"):
+    if not await health_monitor.is_available("mongo") or not await health_monitor.is_available("worker_control"):
         log(f"Required servers unavailable: {MONGO_SERVER_URL}, {WORKER_CONTROL_SERVER_URL}", level="error")
         raise HTTPException(status_code=503, detail="Необходимые серверы недоступны")
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(f"{WORKER_CONTROL_SERVER_URL}/calculate_invertible_matrix_by_matrix_name", json=credentials.model_dump())
+    response = await get_http_client().post(
+        f"{WORKER_CONTROL_SERVER_URL}/calculate_invertible_matrix_by_matrix_name", json=credentials.model_dump(),
+        timeout=httpx.Timeout(10.0, read=DECOMPOSITION_TIMEOUT),
+    )
 
     if response.status_code != 200:
         error_details = response.json() if response.headers.get("content-type") == "application/json" else response.text
@@ -173,9 +309,9 @@ async def calculate_invertible_matrix_by_matrix_name(credentials: InvertibleMatr
 @app.get("/status")
 async def get_status():
     log("Fetching server status")
-    sqlite_status = await check_server_availability(f"{SQLITE_URL}/status")
-    mongo_server_status = await check_server_availability(f"{MONGO_SERVER_URL}/status")
-    worker_control_server_status = await check_server_availability(f"{WORKER_CONTROL_SERVER_URL}/status")
+    sqlite_status = await health_monitor.is_available("sqlite")
+    mongo_server_status = await health_monitor.is_available("mongo")
+    worker_control_server_status = await health_monitor.is_available("worker_control")
     log(f"Server statuses: SQLite={sqlite_status}, MongoDB={mongo_server_status}, WorkerControl={worker_control_server_status}")
     return {
         "status": "running",
@@ -184,5 +320,6 @@ async def get_status():
         "WORKER_CONTROL_SERVER_URL": WORKER_CONTROL_SERVER_URL,
         "sqlite_status": sqlite_status,
         "mongo_server_status": mongo_server_status,
-        "worker_control_server_status": worker_control_server_status
+        "worker_control_server_status": worker_control_server_status,
+        "services": health_monitor.snapshot(),
     }
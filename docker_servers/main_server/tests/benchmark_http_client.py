@@ -0,0 +1,66 @@
+# Сравнение задержки запросов: новый httpx.AsyncClient на каждый запрос (как было раньше)
+# против одного клиента с пулом соединений и keep-alive (http_client.py).
+#
+# Запуск: python benchmark_http_client.py [URL] [число запросов]
+# По умолчанию измеряется GET /status основного сервера; для сквозного замера
+# разложения задайте MATRIX_NAME - тогда дополнительно измеряется
+# POST /calculate_decomposition_of_matrix_by_matrix_name (запустите замер
+# до и после обновления сервисов, чтобы сравнить задержку всей цепочки).
+import asyncio
+import os
+import statistics
+import sys
+import time
+import httpx
+
+MAIN_SERVER_URL = "http://localhost:8002"
+MATRIX_NAME = os.getenv("MATRIX_NAME")
+ALGORITHM = os.getenv("ALGORITHM", "lu")
+
+
+def report(title: str, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(f"{title:<28} mean {statistics.mean(latencies) * 1000:8.2f} ms   "
+          f"median {statistics.median(latencies) * 1000:8.2f} ms   p95 {p95 * 1000:8.2f} ms")
+
+
+async def fresh_client(method: str, url: str, count: int, **kwargs):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(timeout=None) as client:
+            await client.request(method, url, **kwargs)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def pooled_client(method: str, url: str, count: int, **kwargs):
+    latencies = []
+    async with httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_keepalive_connections=20)) as client:
+        await client.request(method, url, **kwargs)  # Прогрев: открытие соединения
+        for _ in range(count):
+            start = time.perf_counter()
+            await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def main():
+    base_url = sys.argv[1] if len(sys.argv) > 1 else MAIN_SERVER_URL
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print(f"GET {base_url}/status, {count} requests")
+    report("new client per request", await fresh_client("GET", f"{base_url}/status", count))
+    report("shared pooled client", await pooled_client("GET", f"{base_url}/status", count))
+
+    if MATRIX_NAME:
+        url = f"{base_url}/calculate_decomposition_of_matrix_by_matrix_name"
+        payload = {"matrix_name": MATRIX_NAME, "algorithm": ALGORITHM}
+        runs = max(1, count // 20)
+        print(f"\nPOST {url} ({MATRIX_NAME}, {ALGORITHM}), {runs} requests")
+        report("end-to-end", await pooled_client("POST", url, runs, json=payload))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -76,6 +76,11 @@ curl -s -X POST "$MAIN_SERVER_URL/save_matrix" \
     -F "login=$USER_LOGIN" \
     -F "matrix_file=@$MATRIX_FILE_NAME"
 
+# Потоковая загрузка того же файла под другим именем: сохраняется ссылка на уже загруженные данные
+curl -s -X PUT "$MAIN_SERVER_URL/upload_matrix?login=$USER_LOGIN&matrix_name=copy_$MATRIX_FILE_NAME" \
+    -H "Content-Type: application/octet-stream" \
+    -T "$MATRIX_FILE_NAME"
+
 #print_result $? "Matrix upload"
 
 # 4. Test retrieving list of matrices for user
@@ -124,6 +129,13 @@ curl -X POST "$MAIN_SERVER_URL/calculate_decomposition_of_matrix_by_matrix_name"
 -H "Content-Type: application/json" \
 -d '{"matrix_name": "'"$MATRIX_FILE_NAME"'" , "algorithm" : "qr"}'
 
+echo ""
+echo ""
+echo "Submitting a QR decomposition job and waiting for its result..."
+JOB_ID=$(curl -s -X POST "$MAIN_SERVER_URL/jobs" \
+-H "Content-Type: application/json" \
+-d '{"matrix_name": "'"$MATRIX_FILE_NAME"'" , "algorithm" : "qr"}' | sed -E 's/.*"job_id":"([^"]+)".*/\1/')
+curl -s -w "\nHTTP %{http_code}\n" -X GET "$MAIN_SERVER_URL/jobs/$JOB_ID?wait=30"
 
 echo ""
 echo ""
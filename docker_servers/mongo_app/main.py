@@ -1,25 +1,69 @@
 # main.py
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from starlette.requests import ClientDisconnect
+from typing import AsyncIterator
+import asyncio
 import httpx
 import os
-import tempfile
 from logger import log  # Используем кастомный логгер
+from http_client import close_http_client, get_http_client, start_http_client
 from mongo_service import (
-    save_matrix_to_db,
-    get_matrix_from_db,
+    save_matrix_stream,
+    ensure_indexes,
+    UPLOAD_CHUNK_SIZE,
     find_matrices_by_user_id,
     find_matrix_by_filename,
     list_files_in_db,
     check_mongodb_availability,
-)  # Импортируем функции из mongo_service.py
+    find_matrix_hash,
+    open_result,
+    save_result_stream,
+    save_binary_matrix,
+    find_matrix_document,
+    open_matrix_file,
+    open_binary_matrix,
+    save_artifact_stream,
+    open_artifact,
+    delete_artifact,
+    delete_expired_artifacts,
+)
+from streaming import etag_matches, stream_grid_file
+from matrix_codec import MATRIX_FRAME_CONTENT_TYPE
 
 
 # Получаем URL из переменных окружения
 SQLITE_URL = os.getenv("SQLITE_URL", "http://localhost:8000")
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-app = FastAPI()
+# Период удаления устаревших артефактов результатов (в секундах)
+ARTIFACT_CLEANUP_INTERVAL = float(os.getenv("ARTIFACT_CLEANUP_INTERVAL", "3600"))
+
+
+async def cleanup_artifacts():
+    while True:
+        try:
+            await run_in_threadpool(delete_expired_artifacts)
+        except Exception as e:
+            log(f"Failed to remove expired artifacts: {e}", level="warning")
+        await asyncio.sleep(ARTIFACT_CLEANUP_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_http_client()
+    try:
+        await run_in_threadpool(ensure_indexes)
+    except Exception as e:
+        log(f"Failed to create MongoDB indexes: {e}", level="warning")
+    cleanup_task = asyncio.create_task(cleanup_artifacts())
+    yield
+    cleanup_task.cancel()
+    await close_http_client()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Pydantic модель для получения данных
 class UserInput(BaseModel):
@@ -29,11 +73,10 @@ class UserInput(BaseModel):
 async def check_server_availability(url: str):
     log(f"Checking server availability at {url}")
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            if response.status_code == 200:
-                log(f"Server at {url} is available")
-                return True
+        response = await get_http_client().get(url, timeout=5.0)
+        if response.status_code == 200:
+            log(f"Server at {url} is available")
+            return True
     except httpx.RequestError as e:
         log(f"Failed to reach server at {url}: {e}", level="error")
         return False
@@ -62,41 +105,30 @@ async def get_status():
 async def get_user_id(credentials: UserInput):
     log(f"Requesting user ID for login: {credentials.login}")
     login_data = {"login": credentials.login}
-    async with httpx.AsyncClient() as client:
-        response = await client.post(f"{SQLITE_URL}/id_request", json=login_data)
-        if response.status_code == 200:
-            user_data = response.json()
-            user_id = user_data.get("user_id")
-            log(f"User ID retrieved for login {credentials.login}: {user_id}")
-            return user_id
-        else:
-            log(f"Failed to retrieve user ID for login {credentials.login}: {response.text}", level="error")
-            raise HTTPException(status_code=response.status_code, detail="Failed to retrieve user ID")
-
-@app.post("/save_matrix")
-async def save_matrix(
-    login: str = Form(...),
-    matrix_file: UploadFile = File(...),
-):
-    log(f"Saving matrix: {matrix_file.filename} for user login: {login}")
+    response = await get_http_client().post(f"{SQLITE_URL}/id_request", json=login_data)
+    if response.status_code == 200:
+        user_data = response.json()
+        user_id = user_data.get("user_id")
+        log(f"User ID retrieved for login {credentials.login}: {user_id}")
+        return user_id
+    else:
+        log(f"Failed to retrieve user ID for login {credentials.login}: {response.text}", level="error")
+        raise HTTPException(status_code=response.status_code, detail="Failed to retrieve user ID")
 
+async def resolve_user_id(login: str) -> int:
     credentials = UserInput(login=login)
     try:
         user_id = await get_user_id(credentials)
         log(f"User ID {user_id} obtained for login {login}")
+        return user_id
     except HTTPException as e:
         log(f"Failed to get user ID for login {login}: {e.detail}", level="error")
         raise HTTPException(status_code=400, detail="Invalid user ID")
 
+
+async def store_matrix(user_id: int, login: str, filename: str, chunks: AsyncIterator[bytes]):
     try:
-        matrix_content = await matrix_file.read()
-        filename = os.path.basename(matrix_file.filename)
-
-        result = await save_matrix_to_db(
-            user_id=user_id,
-            matrix_name=filename,
-            matrix_content=matrix_content,
-        )
+        result = await save_matrix_stream(user_id=user_id, matrix_name=filename, chunks=chunks)
         log(f"{result}")
         if result["message"] == "Matrix already exists, linked with new metadata":
             log(f"Matrix '{filename}' already exists in DB, it has the same filename")
@@ -115,11 +147,45 @@ async def save_matrix(
     except HTTPException as e:
         log(f"HTTP error during matrix save: {e.detail}", level="error")
         raise
+    except ClientDisconnect:
+        log(f"Client disconnected while uploading matrix '{filename}'", level="error")
+        raise HTTPException(status_code=400, detail="Upload interrupted")
     except Exception as e:
         log(f"Unexpected error during matrix save: {e}", level="error")
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
 
 
+async def iter_upload_file(matrix_file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await matrix_file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+@app.post("/save_matrix")
+async def save_matrix(
+    login: str = Form(...),
+    matrix_file: UploadFile = File(...),
+):
+    log(f"Saving matrix: {matrix_file.filename} for user login: {login}")
+    user_id = await resolve_user_id(login)
+    filename = os.path.basename(matrix_file.filename)
+    return await store_matrix(user_id, login, filename, iter_upload_file(matrix_file))
+
+
+@app.put("/upload_matrix")
+async def upload_matrix(login: str, matrix_name: str, request: Request):
+    """
+    Потоковая загрузка матрицы: тело запроса - файл .mtx (в том числе Transfer-Encoding: chunked).
+    Части тела записываются в GridFS по мере поступления, хэш вычисляется инкрементально,
+    поэтому память на загрузку не зависит от размера матрицы.
+    """
+    log(f"Uploading matrix: {matrix_name} for user login: {login}")
+    user_id = await resolve_user_id(login)
+    filename = os.path.basename(matrix_name)
+    if not filename:
+        raise HTTPException(status_code=400, detail="Invalid matrix name")
+    return await store_matrix(user_id, login, filename, request.stream())
+
+
 
 @app.get("/get_matrices_by_user_id/{user_id}")
 async def get_matrices_by_user_id(user_id: int):
@@ -153,30 +219,167 @@ async def list_files():
         log(f"Error fetching files: {e}", level="error")
         raise HTTPException(status_code=500, detail="Error fetching files.")
 
+async def stream_matrix(document, filename: str, request: Request) -> Response:
+    """
+    Потоковая отдача файла матрицы из GridFS с поддержкой Range и ETag (хэш содержимого).
+    """
+    etag = f'"{document["hash"]}"'
+    if etag_matches(etag, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers={"ETag": etag})
+    grid_out = await run_in_threadpool(open_matrix_file, document)
+    log(f"Streaming matrix {filename} ({grid_out.length} bytes)")
+    return stream_grid_file(
+        grid_out, etag, "application/octet-stream", filename,
+        range_header=request.headers.get("range"),
+        if_none_match=request.headers.get("if-none-match"),
+        if_range=request.headers.get("if-range"),
+    )
+
+
 @app.get("/get_matrix_by_matrix_id/{file_id}")
-async def get_matrix_by_matrix_id(file_id: str):
+async def get_matrix_by_matrix_id(file_id: str, request: Request):
     log(f"Fetching matrix by file_id: {file_id}")
-    matrix_data = await get_matrix_from_db(file_id)
-    if not matrix_data:
+    document = await run_in_threadpool(find_matrix_document, file_id=file_id)
+    if document is None:
         log(f"Matrix with file_id {file_id} not found", level="error")
         raise HTTPException(status_code=404, detail="Matrix not found")
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mtx") as temp_file:
-        temp_file.write(matrix_data)
-        temp_file_path = temp_file.name
-    log(f"Matrix with file_id {file_id} sent as file: {temp_file_path}")
-    return FileResponse(temp_file_path, media_type="application/octet-stream", filename=f"{file_id}.mtx")
+    return await stream_matrix(document, f"{file_id}.mtx", request)
+
 
 @app.get("/get_matrix_by_matrix_name")
-async def get_matrix_by_matrix_name(matrix_name: str):
+async def get_matrix_by_matrix_name(matrix_name: str, request: Request):
+    """
+    Возвращает файл матрицы потоком из GridFS. ETag ответа - хэш содержимого матрицы: если клиент
+    передаёт его в If-None-Match и матрица не изменилась, возвращается 304 без чтения файла.
+    Заголовок Range позволяет получить часть файла (206).
+    """
     log(f"Fetching matrix by name: {matrix_name}")
-    matrix = await find_matrix_by_filename(matrix_name)
-    if not matrix:
+    document = await run_in_threadpool(find_matrix_document, matrix_name)
+    if document is None:
+        log(f"Matrix named {matrix_name} not found", level="error")
+        raise HTTPException(status_code=404, detail="Matrix not found")
+    return await stream_matrix(document, matrix_name, request)
+
+
+@app.get("/get_matrix_by_hash")
+async def get_matrix_by_hash(matrix_hash: str, request: Request):
+    """
+    Возвращает файл матрицы по хэшу содержимого - ту версию, для которой вычислен результат,
+    даже если имя матрицы с тех пор указывает на другую загрузку.
+    """
+    log(f"Fetching matrix by hash: {matrix_hash}")
+    document = await run_in_threadpool(find_matrix_document, matrix_hash=matrix_hash)
+    if document is None:
+        log(f"Matrix with hash {matrix_hash} not found", level="error")
+        raise HTTPException(status_code=404, detail="Matrix not found")
+    return await stream_matrix(document, f"{matrix_hash}.mtx", request)
+
+
+@app.get("/get_matrix_binary_by_matrix_name")
+async def get_matrix_binary_by_matrix_name(matrix_name: str, request: Request):
+    """
+    Возвращает матрицу в бинарной форме (application/x-matrix-frame, см. matrix_codec.py):
+    плотная матрица - массив float64, разреженная - массивы CSR, все выровнены для np.frombuffer.
+    ETag, If-None-Match и Range - как у get_matrix_by_matrix_name.
+    """
+    log(f"Fetching binary matrix by name: {matrix_name}")
+    matrix_hash = await run_in_threadpool(find_matrix_hash, matrix_name)
+    if matrix_hash is None:
         log(f"Matrix named {matrix_name} not found", level="error")
         raise HTTPException(status_code=404, detail="Matrix not found")
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mtx") as temp_file:
-        temp_file.write(matrix)
-        temp_file_path = temp_file.name
-    log(f"Matrix {matrix_name} sent as file: {temp_file_path}")
-    return FileResponse(temp_file_path, media_type="application/octet-stream", filename=matrix_name)
+    etag = f'"{matrix_hash}"'
+    if etag_matches(etag, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    grid_out = await run_in_threadpool(open_binary_matrix, matrix_hash)
+    if grid_out is None:
+        # Матрица загружена до появления бинарной формы - создаём её один раз
+        matrix = await find_matrix_by_filename(matrix_name)
+        try:
+            await run_in_threadpool(save_binary_matrix, matrix_hash, matrix)
+        except ValueError as e:
+            log(f"Failed to convert matrix {matrix_name} to binary form: {e}", level="error")
+            raise HTTPException(status_code=422, detail=str(e))
+        grid_out = await run_in_threadpool(open_binary_matrix, matrix_hash)
+    log(f"Streaming binary matrix {matrix_name} ({grid_out.length} bytes)")
+    return stream_grid_file(
+        grid_out, etag, MATRIX_FRAME_CONTENT_TYPE,
+        range_header=request.headers.get("range"),
+        if_range=request.headers.get("if-range"),
+    )
+
+
+@app.get("/get_matrix_hash")
+async def get_matrix_hash(matrix_name: str):
+    """
+    Возвращает хэш содержимого матрицы: по нему control server находит кэшированные результаты разложений.
+    """
+    matrix_hash = await run_in_threadpool(find_matrix_hash, matrix_name)
+    if matrix_hash is None:
+        raise HTTPException(status_code=404, detail="Matrix not found")
+    return {"matrix_name": matrix_name, "hash": matrix_hash}
+
+
+@app.get("/results/{key}")
+async def get_result(key: str, request: Request):
+    """
+    Возвращает результат разложения из кэша в GridFS (JSON) потоком, с поддержкой Range.
+    """
+    grid_out = await run_in_threadpool(open_result, key)
+    if grid_out is None:
+        raise HTTPException(status_code=404, detail="Result not found")
+    return stream_grid_file(
+        grid_out, f'"{key}"', "application/json",
+        range_header=request.headers.get("range"),
+        if_none_match=request.headers.get("if-none-match"),
+        if_range=request.headers.get("if-range"),
+    )
+
+
+@app.put("/results/{key}")
+async def put_result(key: str, request: Request, matrix_hash: str = "", algorithm: str = ""):
+    """
+    Сохраняет результат разложения (тело запроса - JSON) в кэш в GridFS потоком, без чтения в память.
+    """
+    try:
+        size = await save_result_stream(key, request.stream(), {"matrix_hash": matrix_hash, "algorithm": algorithm})
+    except ClientDisconnect:
+        log(f"Client disconnected while uploading result '{key}'", level="error")
+        raise HTTPException(status_code=400, detail="Upload interrupted")
+    return {"message": "Result saved", "key": key, "size": size}
+
+
+@app.put("/artifacts/{artifact_id}")
+async def put_artifact(artifact_id: str, request: Request):
+    """
+    Сохраняет артефакт результата разложения (тело запроса - бинарный кадр) потоком, без чтения в память.
+    """
+    try:
+        size = await save_artifact_stream(artifact_id, request.stream())
+    except ClientDisconnect:
+        log(f"Client disconnected while uploading artifact '{artifact_id}'", level="error")
+        raise HTTPException(status_code=400, detail="Upload interrupted")
+    return {"message": "Artifact saved", "artifact_id": artifact_id, "size": size}
+
+
+@app.get("/artifacts/{artifact_id}")
+async def get_artifact(artifact_id: str, request: Request):
+    """
+    Возвращает артефакт результата разложения потоком, с поддержкой Range и If-None-Match.
+    """
+    grid_out = await run_in_threadpool(open_artifact, artifact_id)
+    if grid_out is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return stream_grid_file(
+        grid_out, f'"{grid_out._id}"', MATRIX_FRAME_CONTENT_TYPE, filename=f"{artifact_id}.mtxf",
+        range_header=request.headers.get("range"),
+        if_none_match=request.headers.get("if-none-match"),
+        if_range=request.headers.get("if-range"),
+    )
+
+
+@app.delete("/artifacts/{artifact_id}")
+async def remove_artifact(artifact_id: str):
+    if not await run_in_threadpool(delete_artifact, artifact_id):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return {"message": "Artifact deleted", "artifact_id": artifact_id}
@@ -2,9 +2,17 @@ import os
 from pymongo import MongoClient
 from gridfs import GridFS
 from logger import log  # Импортируем логгер
+import asyncio
 import hashlib
-from datetime import datetime, timezone
+from io import BytesIO
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Set
+from bson.errors import InvalidId
 from bson.objectid import ObjectId  # Импорт для работы с ObjectId
+import numpy as np
+from scipy import sparse
+from scipy.io import mmread
+from matrix_codec import MATRIX_FRAME_CONTENT_TYPE, encode_frame, pack_matrix
 
 # Получаем URL MongoDB из переменной окружения
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
@@ -14,6 +22,16 @@ client = MongoClient(MONGODB_URL)
 # Создаем базу данных и GridFS
 db = client["mydatabase"]  # Имя базы данных
 grid_fs = GridFS(db)  # GridFS для работы с файлами
+results_fs = GridFS(db, collection="results")  # GridFS для кэша результатов разложений
+binary_fs = GridFS(db, collection="binary")  # GridFS для бинарной формы матриц (по хэшу содержимого)
+artifacts_fs = GridFS(db, collection="artifacts")  # GridFS для больших результатов разложений (бинарные кадры)
+
+# Размер чанка GridFS для загружаемых матриц (по умолчанию в GridFS 255 КБ)
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Время хранения артефактов результатов (в секундах, 0 - без ограничения)
+ARTIFACT_TTL = float(os.getenv("ARTIFACT_TTL", str(7 * 24 * 3600)))
+# Фоновые преобразования загруженных матриц в бинарную форму
+_conversions: Set[asyncio.Task] = set()
 
 
 def list_files_in_db():
@@ -125,64 +143,121 @@ async def get_correct_document(document):
 
 
     
-async def save_matrix_to_db(user_id: int, matrix_name: str, matrix_content: bytes):
+def ensure_indexes():
     """
-    Сохраняет матрицу в базу данных только в случае отсутствия её хэша.
-    Если матрица с таким же хэшем уже существует, добавляет новую запись,
-    указывающую на уже существующие данные.
+    Создаёт индексы по хэшу и имени файла: поиск дубликата при загрузке и поиск матрицы по имени
+    не должны просматривать всю коллекцию fs.files.
+    """
+    db.fs.files.create_index("hash")
+    db.fs.files.create_index("filename")
+    db.artifacts.files.create_index("filename")
+    db.artifacts.files.create_index("uploadDate")
+    db.results.files.create_index("filename")
+
+
+def link_to_existing_matrix(user_id: int, matrix_name: str, existing_matrix: dict) -> dict:
+    """
+    Добавляет запись, указывающую на уже сохранённые данные матрицы с тем же хэшем.
+    """
+    log(f"Matrix with the same hash already exists '{existing_matrix['filename']}', linking user_id {user_id} with matrix name '{matrix_name}'")
+    new_metadata = {
+        "is_original": False,  # Новая матрица не оригинальная
+        "id_of_original_matrix": existing_matrix["_id"],  # ID оригинальной матрицы
+        "user_id": user_id,
+        "filename": matrix_name,  # Новое имя файла
+        "hash": existing_matrix["hash"],  # Существующий хэш
+        "chunkSize": existing_matrix["chunkSize"],  # Размер чанка
+        "length": existing_matrix["length"],  # Длина данных
+        "uploadDate": datetime.now(timezone.utc),  # Новая дата загрузки
+    }
+    # Привязываем новый документ к существующему чанку
+    db.fs.files.insert_one(new_metadata)
+    log(f"Matrix '{matrix_name}' linked to existing data with hash '{existing_matrix['hash']}' successfully")
+    return {
+        "message": "Matrix already exists, linked with new metadata",
+        "user_id": user_id,
+        "existing_filename": existing_matrix["filename"],
+        "matrix_name": matrix_name,
+        "existing_matrix_hash": existing_matrix["hash"],
+    }
+
+
+def convert_stored_matrix(matrix_hash: str, file_id) -> None:
+    """
+    Создаёт бинарную форму уже сохранённой матрицы; ошибка разбора не мешает сохранению файла.
+    """
+    try:
+        save_binary_matrix(matrix_hash, grid_fs.get(file_id).read())
+    except ValueError as e:
+        log(f"Failed to convert matrix {file_id} to binary form: {e}", level="warning")
+
+
+async def save_matrix_stream(user_id: int, matrix_name: str, chunks: AsyncIterator[bytes]):
+    """
+    Сохраняет матрицу, получаемую по частям: части записываются в чанки GridFS по мере поступления,
+    а SHA-256 вычисляется инкрементально, поэтому файл целиком в памяти не хранится.
+    Если после загрузки оказывается, что матрица с таким хэшем уже есть, загруженные чанки
+    удаляются и добавляется запись, указывающая на существующие данные.
     """
     log(f"Saving matrix '{matrix_name}' for user_id {user_id}")
-    matrix_hash = calculate_matrix_hash(matrix_content)
+    hasher = hashlib.sha256()
+    grid_in = grid_fs.new_file(
+        is_original=True,  # Это оригинальная матрица
+        id_of_original_matrix="",  # Оригинальная матрица не существует
+        user_id=user_id,
+        filename=matrix_name,  # Уникальное имя файла
+        chunkSize=UPLOAD_CHUNK_SIZE,
+    )
+
+    def write(data: bytes):
+        hasher.update(data)
+        grid_in.write(data)
 
-    # Проверяем, существует ли уже матрица с таким хэшем
-    existing_matrix = await find_matrix_by_hash(matrix_hash)
-    
-    if existing_matrix:
-        log(f"Matrix with the same hash already exists '{existing_matrix.filename}', linking user_id {user_id} with matrix name '{matrix_name}'")
-        
-        # Добавляем новую запись, привязанную к существующему чанку
-        new_metadata = {
-            "is_original": False,  # Новая матрица не оригинальная
-            "id_of_original_matrix": existing_matrix._id,  # ID оригинальной матрицы
-            "user_id": user_id,
-            "filename": matrix_name,  # Новое имя файла
-            "hash": matrix_hash,      # Существующий хэш
-            "chunkSize": existing_matrix.chunkSize,  # Размер чанка
-            "length": existing_matrix.length,  # Длина данных
-            "uploadDate": datetime.now(timezone.utc),  # Новая дата загрузки
-        }
-
-        # Привязываем новый документ к существующему чанку
-        db.fs.files.insert_one(new_metadata)
-        log(f"Matrix '{matrix_name}' linked to existing data with hash '{matrix_hash}' successfully")
-        
-        return {
-            "message": "Matrix already exists, linked with new metadata",
-            "user_id": user_id,
-            "existing_filename": existing_matrix.filename,
-            "matrix_name": matrix_name,
-            "existing_matrix_hash": existing_matrix.hash,
-        }
-
-    # Если матрица с таким хэшем не найдена, сохраняем новую матрицу
     try:
-        matrix_record = {
-            "is_original": True,  # Это оригинальная матрица
-            "id_of_original_matrix": "",  # Оригинальная матрица не существует
-            "user_id": user_id,
-            "filename": matrix_name,  # Уникальное имя файла
-            "hash": matrix_hash,      # Новый хэш
-        }
-        # Сохраняем данные в GridFS
-        grid_fs.put(matrix_content, **matrix_record)
-
-        log(f"Matrix '{matrix_name}' saved successfully for user_id {user_id}")
-        return {"message": "Matrix saved successfully", "user_id": user_id, "matrix_name": matrix_name}
-    
-    except Exception as e:
+        buffer = bytearray()
+        async for chunk in chunks:
+            buffer += chunk
+            # Записываем целыми чанками GridFS, чтобы не переключаться в поток на каждую мелкую часть
+            if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await asyncio.to_thread(write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await asyncio.to_thread(write, bytes(buffer))
+        matrix_hash = hasher.hexdigest()
+
+        # Проверяем, существует ли уже матрица с таким хэшем
+        existing_matrix = await asyncio.to_thread(db.fs.files.find_one, {"hash": matrix_hash, "is_original": True})
+        if existing_matrix:
+            await asyncio.to_thread(grid_in.abort)
+            return await asyncio.to_thread(link_to_existing_matrix, user_id, matrix_name, existing_matrix)
+
+        grid_in.hash = matrix_hash  # Новый хэш
+        await asyncio.to_thread(grid_in.close)
+    except BaseException as e:
         log(f"Error saving matrix '{matrix_name}' for user_id {user_id}: {e}", level="error")
+        if not grid_in.closed:
+            await asyncio.to_thread(grid_in.abort)
         raise
 
+    # Бинарная форма создаётся один раз после загрузки, в фоне: ответ не ждёт разбора матрицы
+    task = asyncio.create_task(asyncio.to_thread(convert_stored_matrix, matrix_hash, grid_in._id))
+    _conversions.add(task)
+    task.add_done_callback(_conversions.discard)
+    log(f"Matrix '{matrix_name}' saved successfully for user_id {user_id} ({grid_in.length} bytes)")
+    return {"message": "Matrix saved successfully", "user_id": user_id, "matrix_name": matrix_name}
+
+
+async def save_matrix_to_db(user_id: int, matrix_name: str, matrix_content: bytes):
+    """
+    Сохраняет матрицу в базу данных только в случае отсутствия её хэша.
+    Если матрица с таким же хэшем уже существует, добавляет новую запись,
+    указывающую на уже существующие данные.
+    """
+    async def chunks():
+        yield matrix_content
+
+    return await save_matrix_stream(user_id, matrix_name, chunks())
+
 
 async def get_matrix_from_db(file_id):
     """
@@ -253,3 +328,184 @@ async def find_matrix_by_filename(filename: str):
     except Exception as e:
         log(f"Error searching for matrix with filename '{filename}': {e}", level="error")
         raise
+
+
+def find_matrix_hash(filename: str):
+    """
+    Возвращает SHA-256 хэш содержимого матрицы по имени файла (None, если матрица не найдена).
+    Хэш одинаков для всех копий матрицы, загруженных разными пользователями.
+    """
+    document = db.fs.files.find_one({"filename": filename}, {"hash": 1})
+    return None if document is None else document.get("hash")
+
+
+def open_result(key: str):
+    """
+    Открывает последнюю версию результата разложения по ключу кэша для потокового чтения
+    (None, если результата нет).
+    """
+    return results_fs.find_one({"filename": key}, sort=[("uploadDate", -1)])
+
+
+async def save_result_stream(key: str, chunks: AsyncIterator[bytes], metadata: dict) -> int:
+    """
+    Сохраняет результат разложения (JSON), получаемый по частям, под ключом кэша
+    и заменяет предыдущую версию.
+
+    :return: Размер результата в байтах.
+    """
+    try:
+        grid_in = await write_grid_stream(results_fs, chunks, filename=key, contentType="application/json", **metadata)
+    except BaseException as e:
+        log(f"Error saving result '{key}': {e}", level="error")
+        raise
+    await asyncio.to_thread(delete_old_versions, results_fs, key, grid_in._id)
+    log(f"Result '{key}' saved ({grid_in.length} bytes)")
+    return grid_in.length
+
+
+def matrix_to_frame(matrix_content: bytes, matrix_hash: str) -> bytes:
+    """
+    Разбирает файл Matrix Market и кодирует матрицу в бинарный кадр (matrix_codec.py):
+    плотная матрица - массив float64, разреженная - массивы CSR (data, indices, indptr).
+    Массивы выровнены на 8 байт, поэтому читатель получает их через np.frombuffer без копирования.
+
+    :raises ValueError: Если файл не удалось разобрать.
+    """
+    try:
+        matrix = mmread(BytesIO(matrix_content))
+    except Exception as e:
+        raise ValueError(f"Failed to parse the matrix file: {e}") from e
+    if sparse.issparse(matrix):
+        matrix = sparse.csr_matrix(matrix)
+    else:
+        matrix = np.asarray(matrix)
+    arrays = {}
+    descriptor = pack_matrix(matrix, "matrix", arrays)
+    return encode_frame({"hash": matrix_hash, "matrix": descriptor, "shape": list(matrix.shape)}, arrays)
+
+
+def save_binary_matrix(matrix_hash: str, matrix_content: bytes) -> None:
+    """
+    Создаёт и сохраняет бинарную форму матрицы, если её ещё нет.
+    Бинарная форма хранится по хэшу содержимого и общая для всех копий матрицы;
+    читается она потоком через open_binary_matrix.
+    """
+    if binary_fs.exists({"filename": matrix_hash}):
+        return
+    frame = matrix_to_frame(matrix_content, matrix_hash)
+    binary_fs.put(frame, filename=matrix_hash, contentType=MATRIX_FRAME_CONTENT_TYPE,
+                  uploadDate=datetime.now(timezone.utc))
+    log(f"Binary form of matrix {matrix_hash} saved ({len(matrix_content)} -> {len(frame)} bytes)")
+
+
+def find_matrix_document(filename: str = None, file_id: str = None, matrix_hash: str = None):
+    """
+    Возвращает метаданные матрицы (документ fs.files) по имени файла, по идентификатору
+    или по хэшу содержимого.
+    """
+    if matrix_hash is not None:
+        return db.fs.files.find_one({"hash": matrix_hash})
+    if file_id is not None:
+        try:
+            return db.fs.files.find_one({"_id": ObjectId(file_id)})
+        except InvalidId:
+            return None
+    return db.fs.files.find_one({"filename": filename})
+
+
+def open_matrix_file(document):
+    """
+    Открывает содержимое матрицы в GridFS для потокового чтения (GridOut).
+    Для ссылки на оригинальную матрицу (is_original=False) открывается файл оригинала.
+    """
+    if document.get("is_original", True):
+        return grid_fs.get(document["_id"])
+    return grid_fs.get(ObjectId(document["id_of_original_matrix"]))
+
+
+def open_binary_matrix(matrix_hash: str):
+    """
+    Открывает бинарную форму матрицы для потокового чтения (None, если она ещё не создана).
+    """
+    return binary_fs.find_one({"filename": matrix_hash})
+
+
+async def write_grid_stream(fs: GridFS, chunks: AsyncIterator[bytes], **kwargs):
+    """
+    Записывает файл GridFS, получаемый по частям. Части записываются в чанки GridFS по мере
+    поступления, поэтому файл целиком в памяти не хранится; при ошибке недописанный файл удаляется.
+
+    :return: Закрытый GridIn записанного файла.
+    """
+    grid_in = fs.new_file(chunkSize=UPLOAD_CHUNK_SIZE, **kwargs)
+    try:
+        buffer = bytearray()
+        async for chunk in chunks:
+            buffer += chunk
+            if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await asyncio.to_thread(grid_in.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await asyncio.to_thread(grid_in.write, bytes(buffer))
+        await asyncio.to_thread(grid_in.close)
+    except BaseException:
+        if not grid_in.closed:
+            await asyncio.to_thread(grid_in.abort)
+        raise
+    return grid_in
+
+
+def delete_old_versions(fs: GridFS, filename: str, keep_id=None) -> int:
+    """
+    Удаляет все версии файла, кроме keep_id; возвращает число удалённых файлов.
+    """
+    file_ids = [document._id for document in fs.find({"filename": filename}) if document._id != keep_id]
+    for file_id in file_ids:
+        fs.delete(file_id)
+    return len(file_ids)
+
+
+async def save_artifact_stream(artifact_id: str, chunks: AsyncIterator[bytes]) -> int:
+    """
+    Сохраняет артефакт результата (бинарный кадр), получаемый по частям, и заменяет предыдущую версию.
+
+    :return: Размер артефакта в байтах.
+    """
+    try:
+        grid_in = await write_grid_stream(artifacts_fs, chunks, filename=artifact_id, contentType=MATRIX_FRAME_CONTENT_TYPE)
+    except BaseException as e:
+        log(f"Error saving artifact '{artifact_id}': {e}", level="error")
+        raise
+    await asyncio.to_thread(delete_artifact, artifact_id, grid_in._id)
+    log(f"Artifact '{artifact_id}' saved ({grid_in.length} bytes)")
+    return grid_in.length
+
+
+def open_artifact(artifact_id: str):
+    """
+    Открывает последнюю версию артефакта для потокового чтения (None, если артефакта нет).
+    """
+    return artifacts_fs.find_one({"filename": artifact_id}, sort=[("uploadDate", -1)])
+
+
+def delete_artifact(artifact_id: str, keep_id=None) -> int:
+    """
+    Удаляет все версии артефакта, кроме keep_id; возвращает число удалённых файлов.
+    """
+    return delete_old_versions(artifacts_fs, artifact_id, keep_id)
+
+
+def delete_expired_artifacts() -> int:
+    """
+    Удаляет артефакты, сохранённые раньше ARTIFACT_TTL секунд назад.
+    """
+    if ARTIFACT_TTL <= 0:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ARTIFACT_TTL)
+    file_ids = [document["_id"] for document in db.artifacts.files.find({"uploadDate": {"$lt": cutoff}}, {"_id": 1})]
+    for file_id in file_ids:
+        artifacts_fs.delete(file_id)
+    if file_ids:
+        log(f"Removed {len(file_ids)} expired artifacts")
+    return len(file_ids)
@@ -0,0 +1,96 @@
+# streaming.py
+# Потоковая отдача файлов из GridFS: файл читается по чанкам, поэтому память на одну
+# загрузку не зависит от размера файла. Поддерживаются запросы диапазона (Range: bytes=...),
+# условные запросы по ETag (If-None-Match, If-Range) и заголовок Content-Length.
+import re
+from typing import Iterator, Optional, Tuple
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from gridfs import GridOut
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Размер блока чтения по умолчанию совпадает с размером чанка GridFS (255 КБ)
+DEFAULT_READ_SIZE = 255 * 1024
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    if if_none_match is None:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+def parse_range(range_header: Optional[str], length: int) -> Optional[Tuple[int, int]]:
+    """
+    Разбирает заголовок Range с одним диапазоном.
+
+    :return: (начало, конец) включительно или None, если отдаётся весь файл.
+    :raises ValueError: Если диапазон не пересекается с файлом (ответ 416).
+    """
+    if not range_header:
+        return None
+    match = RANGE_PATTERN.match(range_header.strip())
+    if match is None:
+        # Несколько диапазонов или другие единицы - отдаём файл целиком, как допускает RFC 9110
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # bytes=-N: последние N байт
+        start, end = max(length - int(end), 0), length - 1
+    else:
+        start, end = int(start), min(int(end), length - 1) if end else length - 1
+    if start >= length or start > end:
+        raise ValueError(f"Range {range_header} is not satisfiable for {length} bytes")
+    return start, end
+
+
+def iter_grid_file(grid_out: GridOut, start: int, end: int, read_size: int = DEFAULT_READ_SIZE) -> Iterator[bytes]:
+    """
+    Читает байты [start, end] файла GridFS блоками размером с чанк.
+    """
+    try:
+        grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = grid_out.read(min(read_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        grid_out.close()
+
+
+def stream_grid_file(grid_out: GridOut, etag: str, media_type: str, filename: Optional[str] = None,
+                     range_header: Optional[str] = None, if_none_match: Optional[str] = None,
+                     if_range: Optional[str] = None) -> Response:
+    """
+    Формирует потоковый ответ с файлом GridFS (200, 206, 304 или 416).
+    """
+    headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+    if filename is not None:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    if etag_matches(etag, if_none_match):
+        grid_out.close()
+        return Response(status_code=304, headers=headers)
+
+    length = grid_out.length
+    # If-Range: диапазон применяется, только если файл не изменился
+    if if_range is not None and if_range.strip() != etag:
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, length)
+    except ValueError:
+        grid_out.close()
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{length}"})
+
+    if byte_range is None:
+        start, end, status_code = 0, length - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    headers["Content-Length"] = str(max(end - start + 1, 0))
+    read_size = grid_out.chunk_size or DEFAULT_READ_SIZE
+    return StreamingResponse(iter_grid_file(grid_out, start, end, read_size), status_code=status_code,
+                             media_type=media_type, headers=headers)
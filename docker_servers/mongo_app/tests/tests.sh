@@ -100,6 +100,12 @@ curl -X POST "http://localhost:8001/save_matrix" \
     -F "login=johndoe" \
     -F "matrix_file=@$MATRIX_FILE"  # Замените /path/to/your/sample_matrix.mtx на реальный путь к файлу
 
+# Тест /upload_matrix: потоковая загрузка без multipart (тело - сам файл .mtx)
+echo -e "\n\nTest: /upload_matrix"
+curl -X PUT "http://localhost:8001/upload_matrix?login=johndoe&matrix_name=$(basename "$MATRIX_FILE")" \
+    -H "Content-Type: application/octet-stream" \
+    -T "$MATRIX_FILE"
+
 echo -e "\n\nTest: testing connection from Mongo_server to Mongo_db"
 curl -X GET "http://localhost:8001/list_files"
 
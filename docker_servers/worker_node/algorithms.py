@@ -0,0 +1,124 @@
+# algorithms.py
+# Функции разложений, вызываемые в процессах пула (process_pool.py).
+# Модуль не должен иметь побочных эффектов при импорте: его импортируют дочерние процессы.
+import numpy as np
+import scipy.sparse as sp
+import time
+from typing import Any, Dict
+from logger import log  # Используем кастомный логгер
+from decompositions import blocked_ldl, blocked_lu, householder_qr, lu_inverse
+from sparse_decompositions import sparse_cholesky, sparse_ldl, sparse_lu, sparse_qr
+
+
+def lu_decomposition(matrix, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Выполняет LU-разложение матрицы с выбором ведущего элемента.
+    Плотная матрица раскладывается блочным алгоритмом (P·A = L·U),
+    разреженная - SuperLU с упорядочиванием столбцов (P·A·Q = L·U).
+    
+    :param matrix: Квадратная матрица (numpy или scipy.sparse).
+    :param options: Параметры разложения; options["ordering"] - упорядочивание для разреженной матрицы.
+    :return: Словарь с блоками [L, U] и векторами перестановок "permutation" (строки)
+             и "column_permutation" (столбцы, только для разреженной матрицы).
+    """
+    if sp.issparse(matrix):
+        row_perm, col_perm, L, U = sparse_lu(matrix, ordering=options.get("ordering", "COLAMD"))
+        return {"blocks": [L, U], "permutation": row_perm, "column_permutation": col_perm}
+    perm, L, U = blocked_lu(matrix)
+    return {"blocks": [L, U], "permutation": perm}
+
+
+def qr_decomposition(matrix, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Выполняет QR-разложение матрицы.
+    Плотная матрица раскладывается блочным методом Хаусхолдера,
+    разреженная - вращениями Гивенса без явного Q (возвращается только R).
+    
+    :param matrix: Прямоугольная матрица (numpy или scipy.sparse).
+    :param options: Параметры разложения; options["mode"] - "reduced" (по умолчанию) или "complete",
+                    options["ordering"] - упорядочивание столбцов для разреженной матрицы.
+    :return: Словарь с блоками [Q, R] (для разреженной матрицы - [R] и "column_permutation").
+    """
+    log(f"QR decompos function started!")
+    if sp.issparse(matrix):
+        col_perm, R = sparse_qr(matrix, ordering=options.get("ordering", "RCM"))
+        return {"blocks": [R], "column_permutation": col_perm}
+    Q, R = householder_qr(matrix, mode=options.get("mode", "reduced"))
+    return {"blocks": [Q, R]}
+
+
+def ldl_decomposition(matrix, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Выполняет LDLᵀ-разложение симметричной (в том числе знаконеопределённой) матрицы (P·A·Pᵀ = L·D·Lᵀ).
+    Плотная матрица раскладывается блочным алгоритмом с выбором ведущего элемента по Bunch-Kaufman,
+    разреженная - с симметричным упорядочиванием минимальной степени.
+    
+    :param matrix: Симметричная матрица (numpy или scipy.sparse).
+    :param options: Параметры разложения; options["include_transpose"] - добавить L.T в результат,
+                    options["ordering"] - упорядочивание для разреженной матрицы.
+    :return: Словарь с блоками [L, D] (или [L, D, L.T]) и вектором перестановки "permutation";
+             D - компактная матрица 2×n: главная диагональ и внедиагональные элементы блоков 2×2.
+    """
+    if sp.issparse(matrix):
+        perm, L, D = sparse_ldl(matrix, ordering=options.get("ordering", "MMD_AT_PLUS_A"))
+    else:
+        perm, L, D = blocked_ldl(matrix)
+    blocks = [L, D, L.T] if options.get("include_transpose", False) else [L, D]
+    return {"blocks": blocks, "permutation": perm}
+
+
+def cholesky_decomposition(matrix, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Выполняет разложение Холецкого симметричной положительно определённой матрицы.
+    
+    :param matrix: Симметричная положительно определённая матрица (numpy или scipy.sparse).
+    :param options: Параметры разложения; options["ordering"] - упорядочивание для разреженной матрицы.
+    :return: Словарь с блоком [L] (A = L·Lᵀ); для разреженной матрицы - и вектором "permutation".
+    """
+    if sp.issparse(matrix):
+        perm, L = sparse_cholesky(matrix, ordering=options.get("ordering", "MMD_AT_PLUS_A"))
+        return {"blocks": [L], "permutation": perm}
+    try:
+        L = np.linalg.cholesky(matrix)
+    except np.linalg.LinAlgError as e:
+        raise ValueError(f"Matrix must be positive definite for Cholesky decomposition: {e}") from e
+    return {"blocks": [L]}
+
+
+def matrix_inverse(matrix, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Вычисляет обратную матрицу через LU-разложение (см. decompositions.lu_inverse).
+    Разреженная матрица уплотняется: обратная к ней, как правило, плотная.
+
+    :param matrix: Квадратная матрица (numpy или scipy.sparse).
+    :param options: Не используются.
+    :return: Словарь с блоком [A⁻¹] и оценкой числа обусловленности "condition_number" (в норме 1).
+    """
+    if sp.issparse(matrix):
+        matrix = matrix.toarray()
+    inverse, rcond = lu_inverse(matrix)
+    return {"blocks": [inverse], "condition_number": 1.0 / rcond}
+
+
+# Доступные разложения по имени алгоритма
+DECOMPOSITIONS = {
+    "lu": lu_decomposition,
+    "qr": qr_decomposition,
+    "ldl": ldl_decomposition,
+    "cholesky": cholesky_decomposition,
+    "inverse": matrix_inverse,
+}
+
+
+def measure_flop_rate(size: int = 512) -> float:
+    """
+    Измеряет производительность узла на одном процессе: блочное LU случайной матрицы
+    (2/3·n³ операций). Результат передаётся control server'у для оценки времени задач.
+
+    :return: Число операций с плавающей точкой в секунду.
+    """
+    matrix = np.random.default_rng(0).standard_normal((size, size))
+    start = time.perf_counter()
+    blocked_lu(matrix)
+    elapsed = time.perf_counter() - start
+    return 2.0 / 3.0 * size ** 3 / max(elapsed, 1e-9)
@@ -0,0 +1,91 @@
+# heartbeat.py
+# Регистрация worker node в реестре control server'а и периодическая отправка heartbeat
+# с текущим состоянием узла (ядра, свободная память, свободные слоты, загрузка).
+import asyncio
+import os
+import socket
+from typing import Any, Callable, Dict, Optional
+import httpx
+from logger import log  # Используем кастомный логгер
+from http_client import get_http_client
+
+WORKER_HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", "1"))
+
+
+def default_worker_url(port: int) -> str:
+    """
+    Адрес узла по умолчанию: IP-адрес контейнера (пода) и порт сервиса.
+    """
+    try:
+        host = socket.gethostbyname(socket.gethostname())
+    except OSError:
+        host = socket.gethostname()
+    return f"http://{host}:{port}"
+
+
+class ControlServerLink:
+    """
+    Поддерживает регистрацию узла: регистрирует его при запуске, отправляет heartbeat
+    каждые WORKER_HEARTBEAT_INTERVAL секунд, регистрируется повторно, если control server
+    его не знает (например, после перезапуска), и снимает регистрацию при остановке.
+    """
+
+    def __init__(self, control_url: str, name: str, url: str, collect_status: Callable[[], Dict[str, Any]],
+                 interval: float = WORKER_HEARTBEAT_INTERVAL):
+        self.control_url = control_url.rstrip("/")
+        self.name = name
+        self.url = url
+        self.collect_status = collect_status
+        self.interval = interval
+        self._registered = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def _send(self) -> None:
+        client = get_http_client()
+        status = self.collect_status()
+        if not self._registered:
+            response = await client.post(
+                f"{self.control_url}/workers/register",
+                json={"name": self.name, "url": self.url, "status": status},
+            )
+            response.raise_for_status()
+            self._registered = True
+            log(f"Registered as {self.name} ({self.url}) at {self.control_url}")
+            return
+        response = await client.post(f"{self.control_url}/workers/{self.name}/heartbeat", json=status)
+        if response.status_code == 404:
+            log("Control server does not know this worker, registering again", level="warning")
+            self._registered = False
+            await self._send()
+            return
+        response.raise_for_status()
+
+    async def _run(self) -> None:
+        failing = False
+        while True:
+            try:
+                await self._send()
+                failing = False
+            except httpx.HTTPError as e:
+                if not failing:
+                    log(f"Heartbeat to {self.control_url} failed: {e}", level="warning")
+                failing = True
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._registered:
+            try:
+                await get_http_client().delete(f"{self.control_url}/workers/{self.name}", timeout=2.0)
+                log(f"Deregistered {self.name} from {self.control_url}")
+            except httpx.HTTPError as e:
+                log(f"Failed to deregister from {self.control_url}: {e}", level="warning")
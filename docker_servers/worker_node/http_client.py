@@ -0,0 +1,106 @@
+# http_client.py
+# Общий HTTP-клиент сервиса: один пул соединений на процесс вместо нового
+# httpx.AsyncClient (и нового TCP-соединения) на каждый запрос к соседним сервисам.
+# Клиент создаётся и закрывается в lifespan приложения.
+import os
+from typing import AsyncIterator, Mapping, Optional
+import httpx
+from fastapi.responses import StreamingResponse
+from logger import log  # Используем кастомный логгер
+
+# Параметры пула соединений
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# Таймауты по умолчанию (в секундах); долгие запросы задают свой таймаут явно
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+# HTTP/2 (требует пакет h2; используется только с серверами, которые его поддерживают)
+HTTP2 = os.getenv("HTTP2", "false").lower() in ("1", "true", "yes")
+
+# Заголовки запроса и ответа, которые stream_proxy передаёт без изменений (диапазоны и условные запросы);
+# тело передаётся как есть (aiter_raw), поэтому вместе с ним передаётся и Content-Encoding
+PROXY_REQUEST_HEADERS = ("range", "if-none-match", "if-range")
+PROXY_RESPONSE_HEADERS = (
+    "content-type", "content-length", "content-encoding", "content-range", "accept-ranges", "etag", "content-disposition",
+)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """
+    Создаёт общий клиент с пулом соединений и keep-alive.
+    """
+    global _client
+    http2 = HTTP2 and _http2_available()
+    if HTTP2 and not http2:
+        log("HTTP2 is enabled but the 'h2' package is not installed; falling back to HTTP/1.1", level="warning")
+    _client = httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    )
+    log(f"HTTP client started (max_connections={HTTP_MAX_CONNECTIONS}, http2={http2})")
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        log("HTTP client closed")
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Возвращает общий клиент сервиса.
+
+    :raises RuntimeError: Если клиент не создан (приложение запущено без lifespan).
+    """
+    if _client is None:
+        raise RuntimeError("HTTP client is not started.")
+    return _client
+
+
+async def iter_upstream(response: httpx.Response) -> AsyncIterator[bytes]:
+    """
+    Отдаёт тело потокового ответа соседнего сервиса и закрывает его в любом случае:
+    и после последнего фрагмента, и при разрыве соединения клиентом посреди передачи
+    (фоновая задача StreamingResponse в этом случае не выполняется, и соединение пула утекло бы).
+    """
+    try:
+        async for chunk in response.aiter_raw():
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+async def stream_proxy(url: str, request_headers: Mapping[str, str], timeout: Optional[httpx.Timeout] = None) -> StreamingResponse:
+    """
+    Отдаёт ответ GET-запроса к соседнему сервису потоком, не собирая тело в памяти.
+    Заголовки Range, If-None-Match и If-Range передаются дальше, поэтому код ответа
+    (200, 206, 304, 404, 416) и заголовки Content-Range, Content-Length и ETag сохраняются.
+    """
+    client = get_http_client()
+    headers = {name: request_headers[name] for name in PROXY_REQUEST_HEADERS if name in request_headers}
+    request = client.build_request("GET", url, headers=headers, timeout=timeout or client.timeout)
+    response = await client.send(request, stream=True)
+    return StreamingResponse(
+        iter_upstream(response),
+        status_code=response.status_code,
+        headers={name: response.headers[name] for name in PROXY_RESPONSE_HEADERS if name in response.headers},
+    )
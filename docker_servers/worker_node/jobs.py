@@ -0,0 +1,161 @@
+# jobs.py
+import asyncio
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Состояния задачи
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+
+@dataclass
+class Job:
+    job_id: str
+    algorithm: str
+    options: Dict[str, Any]
+    input_matrix: Any = None  # Исходная матрица для ответа в JSON (только для JSON-запросов)
+    status: str = JOB_RUNNING
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    time_taken: float = 0.0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    # Ожидающие завершения задачи корутины (long-poll): пары (цикл событий, future)
+    waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = field(default_factory=list, repr=False)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "algorithm": self.algorithm,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "time_taken": round(self.time_taken, 3),
+            "error": self.error,
+        }
+
+
+def _resolve_waiter(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class JobSlotsBusy(Exception):
+    """Все слоты узла заняты."""
+
+
+class JobTable:
+    """
+    Потокобезопасная таблица задач узла с ограничением числа одновременно
+    выполняемых задач и удалением завершённых результатов по истечении TTL.
+    """
+
+    def __init__(self, max_jobs: int, result_ttl: float):
+        self.max_jobs = max(1, max_jobs)
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _running_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == JOB_RUNNING)
+
+    def create(self, algorithm: str, options: Dict[str, Any], input_matrix: Any = None) -> Job:
+        """
+        Занимает слот под новую задачу.
+
+        :raises JobSlotsBusy: Если все слоты заняты.
+        """
+        with self._lock:
+            self._evict_expired()
+            if self._running_count() >= self.max_jobs:
+                raise JobSlotsBusy(f"All {self.max_jobs} job slots are busy.")
+            job = Job(job_id=uuid.uuid4().hex, algorithm=algorithm, options=options, input_matrix=input_matrix)
+            self._jobs[job.job_id] = job
+            return job
+
+    def finish(self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None,
+               time_taken: float = 0.0, status: Optional[str] = None) -> None:
+        """
+        Сохраняет результат (или ошибку) задачи и освобождает её слот.
+        Если status не указан, он определяется по наличию ошибки.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.result = result
+            job.error = error
+            job.status = status or (JOB_FAILED if error is not None else JOB_DONE)
+            job.time_taken = time_taken
+            job.finished_at = time.time()
+            waiters, job.waiters = job.waiters, []
+        # Будим ожидающие корутины в их циклах событий (finish вызывается из потока задачи)
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve_waiter, future)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """
+        Ожидает завершения задачи не дольше timeout секунд без опроса.
+
+        :return: Задача (в любом состоянии) или None, если она не найдена.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != JOB_RUNNING:
+                return job
+            future = loop.create_future()
+            job.waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if (loop, future) in job.waiters:
+                    job.waiters.remove((loop, future))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._evict_expired()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Запрашивает отмену выполняющейся задачи. Слот освобождается,
+        когда поток задачи завершит процесс пула и вызовет finish.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status == JOB_RUNNING:
+                job.cancel_event.set()
+            return job
+
+    def remove(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.pop(job_id, None)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._evict_expired()
+            return [job.summary() for job in self._jobs.values()]
+
+    def slots(self) -> Dict[str, int]:
+        with self._lock:
+            self._evict_expired()
+            running = self._running_count()
+            return {"active_jobs": running, "max_jobs": self.max_jobs, "free_slots": self.max_jobs - running}
@@ -1,257 +1,443 @@
 # main.py
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 import threading
 import os
-import queue
-from typing import List
+from typing import Any, Dict, List, Optional
 import numpy as np
+import scipy.sparse as sp
 from logger import log  # Используем кастомный логгер
+from algorithms import DECOMPOSITIONS, measure_flop_rate
+from matrix_codec import MATRIX_FRAME_CONTENT_TYPE, decode_frame, encode_frame, iter_frame, pack_matrix, unpack_matrix
+from jobs import JOB_CANCELLED, JOB_FAILED, JOB_RUNNING, Job, JobSlotsBusy, JobTable
+from process_pool import DecompositionProcessPool, JobCancelled, JobTimeout
+from http_client import close_http_client, start_http_client
+from heartbeat import ControlServerLink, default_worker_url
+from tiles import TILE_OPERATIONS, TileStore
+import socket
 import time
 import psutil  # Для мониторинга загрузки ресурсов
 import asyncio
 
 WORKER_NODE_CONTROL_SERVER_URL = os.getenv("WORKER_NODE_CONTROL_SERVER_URL")
-app = FastAPI()
+# Имя и адрес, под которыми узел регистрируется в control server
+WORKER_NODE_NAME = os.getenv("WORKER_NODE_NAME", socket.gethostname())
+WORKER_NODE_URL = os.getenv("WORKER_NODE_URL") or default_worker_url(int(os.getenv("WORKER_NODE_PORT", "8000")))
 
-# Используем для управления состоянием задачи
-processing_task_active = False
-task_lock = threading.Lock()  # Для потокобезопасного доступа к переменной
-# Очередь для хранения результата
-result_queue = queue.Queue()
+# Число одновременно выполняемых задач (по умолчанию - по одной на физическое ядро)
+WORKER_MAX_JOBS = int(os.getenv("WORKER_MAX_JOBS", psutil.cpu_count(logical=False) or 1))
+# Время хранения результата завершённой задачи (в секундах)
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "600"))
+# Максимальное время выполнения задачи по умолчанию (в секундах)
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "1800"))
+# Максимальное время ожидания результата в одном запросе GET /jobs/{job_id}?wait=... (в секундах)
+JOB_MAX_WAIT = float(os.getenv("JOB_MAX_WAIT", "60"))
+# Период проверки сессий с тайлами, брошенных control server'ом (в секундах)
+TILE_SESSION_CHECK_INTERVAL = float(os.getenv("TILE_SESSION_CHECK_INTERVAL", "30"))
 
-algorithm_gl = ''
-matrix_name_gl = ''
-time_taken_gl = 0
+# Таблица задач узла
+job_table = JobTable(max_jobs=WORKER_MAX_JOBS, result_ttl=JOB_RESULT_TTL)
+# Пул процессов для вычислений (по процессу на слот)
+process_pool = DecompositionProcessPool(size=WORKER_MAX_JOBS)
+# Тайлы распределённых LU-разложений (см. tiles.py)
+tile_store = TileStore()
+# Производительность узла на одну задачу (FLOP/s), измеряется при запуске
+flop_rate: Optional[float] = None
 
-# Модель данных для входного JSON
+
+def collect_status() -> Dict[str, Any]:
+    """
+    Собирает состояние узла: занятость слотов, ядра, память и загрузку CPU (без блокирующих замеров).
+    """
+    memory_info = psutil.virtual_memory()  # Информация о памяти
+    slots = job_table.slots()
+    return {
+        "is_running": slots["free_slots"] == 0,
+        **slots,
+        "cores": psutil.cpu_count(logical=False) or 1,
+        "flop_rate": flop_rate,
+        "tiles": tile_store.snapshot(),
+        "memory_available": memory_info.available,  # Свободная память в байтах
+        "WORKER_CONTROL_URL": WORKER_NODE_CONTROL_SERVER_URL,
+        "load": {
+            # Загрузка CPU в процентах с момента предыдущего вызова
+            "cpu": psutil.cpu_percent(interval=None),
+            "memory": memory_info.percent,  # Использование памяти в процентах
+        },
+    }
+
+
+async def expire_tile_sessions():
+    while True:
+        await asyncio.sleep(TILE_SESSION_CHECK_INTERVAL)
+        try:
+            close_expired_tile_sessions()
+        except Exception as e:
+            log(f"Failed to close expired tile sessions: {e}", level="warning")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global flop_rate
+    process_pool.start()
+    flop_rate = await run_in_threadpool(measure_flop_rate)
+    log(f"Measured compute rate: {flop_rate / 1e9:.2f} GFLOP/s per job")
+    psutil.cpu_percent(interval=None)  # Первый вызов задаёт точку отсчёта для неблокирующих замеров
+    await start_http_client()
+    control_link = None
+    if WORKER_NODE_CONTROL_SERVER_URL:
+        control_link = ControlServerLink(WORKER_NODE_CONTROL_SERVER_URL, WORKER_NODE_NAME, WORKER_NODE_URL, collect_status)
+        control_link.start()
+    # Слоты сессий, брошенных control server'ом (например, при его падении), освобождаются по TTL
+    tile_task = asyncio.create_task(expire_tile_sessions())
+    yield
+    tile_task.cancel()
+    if control_link is not None:
+        await control_link.stop()
+    await close_http_client()
+    process_pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Разреженная матрица в формате CSR
+class SparseMatrix(BaseModel):
+    shape: List[int]
+    data: List[float]
+    indices: List[int]
+    indptr: List[int]
+
+# Модель данных для входного JSON: плотная матрица (input_matrix) или разреженная (sparse_matrix)
 class DecompositionRequest(BaseModel):
-    input_matrix: List[List[float]]
+    input_matrix: Optional[List[List[float]]] = None
+    sparse_matrix: Optional[SparseMatrix] = None
     algorithm: str
+    options: Dict[str, Any] = {}
+    timeout: Optional[float] = None  # Максимальное время выполнения (в секундах)
 
 
-def lu_decomposition(matrix: np.ndarray) -> List[np.ndarray]:
+def is_symmetric(matrix) -> bool:
     """
-    Выполняет LU-разложение матрицы без использования встроенных функций NumPy для LU.
-    
-    :param matrix: Квадратная матрица.
-    :return: Список из двух матриц [L, U], где L - нижняя треугольная, U - верхняя треугольная.
+    Проверяет симметричность плотной или разреженной матрицы.
     """
-    global processing_task_active, time_taken_gl
-    start = time.time()
-    time.sleep(0.1)
-    n = matrix.shape[0]
-    L = np.zeros((n, n))
-    U = np.zeros((n, n))
-    
-    for i in range(n):
-        # Вычисление элементов матрицы U
-        for j in range(i, n):
-            U[i, j] = matrix[i, j] - sum(L[i, k] * U[k, j] for k in range(i))
-        
-        # Вычисление элементов матрицы L
-        for j in range(i, n):
-            if i == j:
-                L[j, i] = 1  # Диагональные элементы L равны 1
-            else:
-                L[j, i] = (matrix[j, i] - sum(L[j, k] * U[k, i] for k in range(i))) / U[i, i]
-    
-    with task_lock:
-        processing_task_active = False
-    end = time.time()
-    time_taken_gl = (end - start)
-    result_queue.put([L, U])
-    
+    if sp.issparse(matrix):
+        return abs(matrix - matrix.T).max() <= 1e-8 * max(abs(matrix).max(), 1.0)
+    return np.allclose(matrix, matrix.T)
 
 
-def qr_decomposition(matrix: np.ndarray) -> List[np.ndarray]:
+def serialize_block(block) -> Any:
     """
-    Выполняет QR-разложение матрицы без использования встроенных функций NumPy для QR.
-    
-    :param matrix: Прямоугольная матрица.
-    :return: Список из двух матриц [Q, R], где Q - ортогональная, R - верхняя треугольная.
+    Преобразует блок результата в JSON: плотный - во вложенные списки, разреженный - в словарь CSR.
     """
-    log(f"QR decompos function started!")
-    global processing_task_active, time_taken_gl
-    start = time.time()
-    time.sleep(6)
-    m, n = matrix.shape
-    Q = np.zeros((m, m))  # Ортогональная матрица
-    R = np.zeros((m, n))  # Верхняя треугольная матрица
-    A = matrix.copy()
-    
-    for i in range(n):
-        # Вычисляем норму столбца
-        norm = np.linalg.norm(A[:, i])
-        
-        # Вектор Q[:, i] - нормированный столбец
-        Q[:, i] = A[:, i] / norm
-        
-        # Обновляем матрицу R
-        for j in range(i, n):
-            R[i, j] = np.dot(Q[:, i], A[:, j])
-        
-        # Обновляем матрицу A, вычитая проекцию
-        for j in range(i + 1, n):
-            A[:, j] -= Q[:, i] * R[i, j]
-            
-    with task_lock:
-        processing_task_active = False
-        
-    end = time.time()
-    time_taken_gl = (end - start)
-    result_queue.put([Q[:, :n], R[:n, :]])
-    
+    if sp.issparse(block):
+        block = block.tocsr()
+        return {
+            "format": "csr",
+            "shape": list(block.shape),
+            "data": block.data.tolist(),
+            "indices": block.indices.tolist(),
+            "indptr": block.indptr.tolist(),
+        }
+    return block.tolist()
 
 
-def ldl_decomposition(matrix: np.ndarray) -> List[np.ndarray]:
+def run_decomposition(job_id: str, algorithm: str, matrix, options: Dict[str, Any], timeout: float, cancel_event: threading.Event):
     """
-    Выполняет LDL-разложение симметричной положительно определённой матрицы.
-    
-    :param matrix: Симметричная положительно определённая матрица.
-    :return: Список из двух матриц [L, D], где L - нижняя треугольная с единицами на диагонали, D - диагональная.
+    Передаёт разложение в пул процессов и сохраняет результат (или ошибку) в таблице задач.
+    Поток только ожидает процесс пула, поэтому не конкурирует за GIL с обработкой запросов.
     """
-    global processing_task_active, time_taken_gl
     start = time.time()
-    time.sleep(0.1)
-    if not np.allclose(matrix, matrix.T):
-        raise ValueError("Matrix must be symmetric for LDL decomposition.")
-
-    n = matrix.shape[0]
-    L = np.eye(n)  # Нижняя треугольная матрица с единицами на диагонали
-    D = np.zeros(n)  # Диагональная матрица (как вектор)
-
-    for i in range(n):
-        # Вычисляем диагональный элемент D
-        D[i] = matrix[i, i] - sum(L[i, k] ** 2 * D[k] for k in range(i))
-
-        # Вычисляем элементы нижней треугольной матрицы L
-        for j in range(i + 1, n):
-            L[j, i] = (matrix[j, i] - sum(L[j, k] * L[i, k] * D[k] for k in range(i))) / D[i]
-
-    D_matrix = np.diag(D)  # Преобразуем в диагональную матрицу для удобства
-    
-    with task_lock:
-        processing_task_active = False
-        
+    result, error, status, time_taken = None, None, None, 0.0
+    try:
+        result, time_taken = process_pool.run(algorithm, matrix, options, timeout=timeout, cancel_event=cancel_event)
+    except JobCancelled as e:
+        log(f"Job {job_id} cancelled", level="warning")
+        error, status = str(e), JOB_CANCELLED
+    except JobTimeout as e:
+        log(f"Job {job_id} timed out: {e}", level="error")
+        error = str(e)
+    except Exception as e:
+        log(f"Error during decomposition {job_id}: {e}", level="error")
+        error = str(e)
     end = time.time()
-    time_taken_gl = (end - start)
-    result_queue.put([L, D_matrix, L.T])
+    job_table.finish(job_id, result=result, error=error, time_taken=time_taken or end - start, status=status)
+    log(f"Job {job_id} finished in {end - start:.3f}s")
+
+
+def build_job_response(job: Job, accept: Optional[str]) -> Response:
+    """
+    Формирует ответ с результатом завершённой задачи: JSON или бинарный кадр (если его запросил клиент).
+    Длина кадра известна заранее (Content-Length), поэтому control server может решить,
+    сохранить ли результат как артефакт, не читая его целиком.
+    """
+    result = job.result
+    if accept and MATRIX_FRAME_CONTENT_TYPE in accept:
+        arrays = {}
+        meta = {
+            "job_id": job.job_id,
+            "algorithm": job.algorithm,
+            "result": [pack_matrix(block, f"result.{i}", arrays) for i, block in enumerate(result["blocks"])],
+            "time_taken": round(job.time_taken, 3),
+        }
+        for key in ("permutation", "column_permutation"):
+            if key in result:
+                meta[key] = pack_matrix(result[key], key, arrays)
+        if "condition_number" in result:
+            meta["condition_number"] = result["condition_number"]
+        # Кадр отдаётся по частям: большие результаты не копируются в один буфер
+        length, chunks = iter_frame(meta, arrays)
+        return StreamingResponse(chunks, media_type=MATRIX_FRAME_CONTENT_TYPE, headers={"Content-Length": str(length)})
 
+    # Формирование ответа
+    response = {
+        "job_id": job.job_id,
+        "input_matrix": job.input_matrix,
+        "algorithm": job.algorithm,
+        "result": [serialize_block(block) for block in result["blocks"]],
+        "time_taken": round(job.time_taken, 3)
+    }
+    for key in ("permutation", "column_permutation"):
+        if key in result:
+            response[key] = result[key].tolist()
+    if "condition_number" in result:
+        response["condition_number"] = result["condition_number"]
+    return JSONResponse(content=response)
 
 
 # Маршрут для обработки запросов
 @app.post("/process_task")
-async def process_task(request: DecompositionRequest):
-    
-    # Очистка очереди перед запуском новой задачи
-    while not result_queue.empty():
-        result_queue.get()
-    
-    # # Установка флага начала обработки
-    global processing_task_active, matrix_name_gl, algorithm_gl
-    
-    with task_lock:
-        if processing_task_active:
-            raise HTTPException(status_code=400, detail="Task is already running.")
-        log(f"makin processing_task_active = True from process_task")
-        processing_task_active = True
-    
-    log(f"Starting to process... {processing_task_active}")
-    
+async def process_task(http_request: Request):
+    """
+    Запускает разложение матрицы и возвращает идентификатор задачи (job_id).
+    Тело запроса - JSON (DecompositionRequest) или бинарный кадр
+    (Content-Type: application/x-matrix-frame) с метаданными algorithm, options
+    и матрицей, которая декодируется в NumPy без копирования.
+    Результат забирается через GET /jobs/{job_id}.
+    """
+    frame_matrix = None
+    try:
+        if http_request.headers.get("content-type", "").startswith(MATRIX_FRAME_CONTENT_TYPE):
+            meta, arrays = decode_frame(await http_request.body())
+            request = DecompositionRequest(algorithm=meta["algorithm"], options=meta.get("options", {}), timeout=meta.get("timeout"))
+            frame_matrix = unpack_matrix(meta["matrix"], arrays)
+        else:
+            request = DecompositionRequest.model_validate(await http_request.json())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except (ValueError, KeyError) as e:
+        log(f"Error reading request body: {e}", level="error")
+        raise HTTPException(status_code=400, detail=f"Invalid request body: {e}")
+
     input_matrix = request.input_matrix
     algorithm = request.algorithm.lower()
-    algorithm_gl = algorithm
-    matrix_name_gl = input_matrix
 
-    # Преобразование матрицы в формат numpy
+    # Преобразование матрицы в формат numpy (или scipy.sparse для разреженной)
     try:
-        matrix = np.array(input_matrix)
-        if matrix.shape[0] != matrix.shape[1]:
+        if frame_matrix is not None:
+            matrix = frame_matrix
+        elif request.sparse_matrix is not None:
+            sparse_matrix = request.sparse_matrix
+            matrix = sp.csr_matrix(
+                (sparse_matrix.data, sparse_matrix.indices, sparse_matrix.indptr),
+                shape=tuple(sparse_matrix.shape),
+            )
+        elif input_matrix is not None:
+            matrix = np.array(input_matrix)
+        else:
+            raise ValueError("Either input_matrix or sparse_matrix must be provided.")
+        # QR допускает прямоугольные матрицы, остальные разложения - только квадратные
+        if algorithm != "qr" and matrix.shape[0] != matrix.shape[1]:
             raise ValueError("Matrix must be square.")
+        if algorithm in ("ldl", "cholesky") and not is_symmetric(matrix):
+            raise ValueError(f"Matrix must be symmetric for {algorithm.upper()} decomposition.")
     except Exception as e:
-        processing_task_active = False
         log(f"Error processing input matrix: {e}", level="error")
         raise HTTPException(status_code=400, detail=f"Invalid input matrix: {e}")
 
-    # Выбор функции разложения
-    decomposition_func = {
-        "lu": lu_decomposition,
-        "qr": qr_decomposition,
-        "ldl": ldl_decomposition
-    }.get(algorithm)
-
-    if decomposition_func is None:
-        processing_task_active = False
+    if algorithm not in DECOMPOSITIONS:
         log(f"Unsupported algorithm: {algorithm}", level="error")
         raise HTTPException(status_code=400, detail=f"Unsupported algorithm: {algorithm}")
 
-    # Выполнение разложения с измерением времени
+    if algorithm == "qr" and request.options.get("mode", "reduced") not in ("reduced", "complete"):
+        log(f"Unsupported QR mode: {request.options.get('mode')}", level="error")
+        raise HTTPException(status_code=400, detail=f"Unsupported QR mode: {request.options.get('mode')}")
+
+    # Занимаем слот в таблице задач
+    try:
+        echo = input_matrix if request.sparse_matrix is None else request.sparse_matrix.model_dump()
+        job = job_table.create(algorithm, request.options, input_matrix=echo)
+    except JobSlotsBusy as e:
+        log(f"Rejecting task: {e}", level="warning")
+        raise HTTPException(status_code=503, detail=str(e))
+
+    # Выполнение разложения в пуле процессов; поток ожидает результат, таймаут и отмену
     try:
-        log(f"Starting {algorithm.upper()} decomposition in a separate thread.")
-        # Запуск задачи в отдельном потоке
-        thread = threading.Thread(target=decomposition_func,args=(matrix,), daemon=True)
+        log(f"Starting {algorithm.upper()} decomposition {job.job_id} in the process pool.")
+        timeout = request.timeout or JOB_TIMEOUT
+        thread = threading.Thread(
+            target=run_decomposition,
+            args=(job.job_id, algorithm, matrix, request.options, timeout, job.cancel_event),
+            daemon=True,
+        )
         thread.start()
     except Exception as e:
-        processing_task_active = False
+        job_table.finish(job.job_id, error=str(e))
         log(f"Error during {algorithm.upper()} decomposition: {e}", level="error")
         raise HTTPException(status_code=500, detail=f"Error during decomposition: {e}")
 
-    return {"message": "Task started"}
+    return {"message": "Task started", "job_id": job.job_id}
 
 
-@app.get("/get_result")
-def get_result():
+@app.get("/jobs")
+def list_jobs():
     """
-    Возвращает результат выполнения задачи, если он доступен.
+    Возвращает список задач узла (без результатов).
     """
-    global processing_task_active, matrix_name_gl, algorithm_gl, time_taken_gl
-    
-    if result_queue.empty() or processing_task_active == True:
-        raise HTTPException(status_code=404, detail=f"Result not ready yet - {result_queue.empty() , processing_task_active}")
+    return {"jobs": job_table.list(), **job_table.slots()}
 
-    # Извлекаем результат из очереди
-    result = result_queue.get()
 
-        # Формирование ответа
-    response = {
-        "input_matrix": matrix_name_gl,
-        "algorithm": algorithm_gl,
-        "result": [block.tolist() for block in result],
-        "time_taken": round(time_taken_gl, 3)
-    }
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0.0, accept: Optional[str] = Header(default=None)):
+    """
+    Возвращает результат задачи, если он готов (200), или её состояние (202), если она ещё выполняется.
+    С параметром wait запрос удерживается до завершения задачи, но не дольше wait секунд
+    (и не дольше JOB_MAX_WAIT) - long-poll вместо частого опроса.
+    Если клиент указал Accept: application/x-matrix-frame, результат отдаётся бинарным кадром.
+    Результат хранится до истечения JOB_RESULT_TTL или до DELETE /jobs/{job_id}.
+    """
+    if wait > 0:
+        job = await job_table.wait(job_id, min(wait, JOB_MAX_WAIT))
+    else:
+        job = job_table.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if job.status == JOB_RUNNING:
+        return JSONResponse(status_code=202, content=job.summary())
+    if job.status == JOB_CANCELLED:
+        raise HTTPException(status_code=410, detail=f"Job {job_id} was cancelled")
+    if job.status == JOB_FAILED:
+        log(f"Job {job_id} failed: {job.error}", level="error")
+        raise HTTPException(status_code=422, detail=f"Decomposition failed: {job.error}")
+
+    # Сериализация больших результатов выполняется вне цикла событий
+    return await run_in_threadpool(build_job_response, job, accept)
 
-    log(f"Task ended...{processing_task_active}")
-    processing_task_active = False
-    return response
+
+@app.delete("/jobs/{job_id}")
+def delete_job(job_id: str):
+    """
+    Удаляет завершённую задачу и её результат из таблицы.
+    Выполняющаяся задача отменяется: её процесс в пуле завершается и заменяется новым.
+    Сессия с тайлами (тоже занимает слот в таблице задач) закрывается, как DELETE /tiles/{session_id}.
+    """
+    job = job_table.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if release_tile_session(job_id):
+        log(f"Tile session {job_id} closed")
+        return {"message": "Tile session closed", "job_id": job_id}
+    if job.status == JOB_RUNNING:
+        job_table.cancel(job_id)
+        log(f"Job {job_id} cancellation requested")
+        return JSONResponse(status_code=202, content={"message": "Job cancellation requested", "job_id": job_id})
+    job_table.remove(job_id)
+    log(f"Job {job_id} removed")
+    return {"message": "Job removed", "job_id": job_id}
 
 
 @app.get("/status")
 async def get_status():
     """
-    Возвращает состояние сервиса, включая загруженность CPU, использование памяти и статус.
+    Возвращает состояние сервиса, включая загруженность CPU, использование памяти и занятость слотов.
     """
-    global processing_task_active
     try:
-        with task_lock:
-            # Получение данных о CPU и памяти
-            cpu_usage = psutil.cpu_percent(interval=0.1)  # Загрузка CPU в процентах
-            memory_info = psutil.virtual_memory()  # Информация о памяти
-            memory_usage = memory_info.percent  # Использование памяти в процентах
-            # Проверка выполнения задачи
-            is_running = processing_task_active
-            
-            # Формирование ответа
-            status_info = {
-                "is_running": is_running,
-                "WORKER_CONTROL_URL": WORKER_NODE_CONTROL_SERVER_URL,
-                "load": {
-                    "cpu": cpu_usage,
-                    "memory": memory_usage
-                }
-            }
-            log(f"Status check: {status_info}")
-            return status_info
+        status_info = collect_status()
+        log(f"Status check: {status_info}", level="debug")
+        return status_info
     except Exception as e:
         log(f"Error retrieving status: {e}", level="error")
-        raise HTTPException(status_code=500, detail=f"Error retrieving status: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error retrieving status: {e}")
+
+
+def release_tile_session(session_id: str) -> bool:
+    """
+    Удаляет сессию с тайлами и освобождает её слот в таблице задач (False, если сессии нет).
+    """
+    if not tile_store.drop(session_id):
+        return False
+    job_table.finish(session_id)
+    job_table.remove(session_id)
+    return True
+
+
+def close_expired_tile_sessions() -> None:
+    """
+    Освобождает слоты сессий с тайлами, к которым control server давно не обращался.
+    """
+    for session_id in tile_store.expired():
+        log(f"Tile session {session_id} expired", level="warning")
+        job_table.finish(session_id, error="Tile session expired")
+        job_table.remove(session_id)
+
+
+@app.post("/tiles")
+def open_tile_session():
+    """
+    Открывает сессию для тайлов распределённого LU-разложения.
+    Сессия занимает слот узла, пока её не удалит control server (DELETE /tiles/{session_id})
+    или пока она не истечёт (TILE_SESSION_TTL без обращений).
+    """
+    close_expired_tile_sessions()
+    try:
+        job = job_table.create("lu_tiles", {})
+    except JobSlotsBusy as e:
+        log(f"Rejecting tile session: {e}", level="warning")
+        raise HTTPException(status_code=503, detail=str(e))
+    tile_store.open(job.job_id)
+    log(f"Tile session {job.job_id} opened")
+    return {"session_id": job.job_id}
+
+
+@app.post("/tiles/{session_id}/{operation}")
+async def run_tile_operation(session_id: str, operation: str, http_request: Request):
+    """
+    Выполняет операцию над тайлами сессии (см. tiles.TILE_OPERATIONS).
+    Тело запроса и ответ - бинарные кадры application/x-matrix-frame.
+    """
+    if operation not in TILE_OPERATIONS:
+        raise HTTPException(status_code=404, detail=f"Unsupported tile operation: {operation}")
+    session = tile_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Tile session {session_id} not found")
+    try:
+        meta, arrays = decode_frame(await http_request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid request body: {e}")
+
+    def run():
+        with session.lock:
+            meta_out, arrays_out = TILE_OPERATIONS[operation](session, meta, arrays)
+        return encode_frame(meta_out, arrays_out)
+
+    try:
+        # Вычисления (BLAS) и кодирование выполняются вне цикла событий
+        body = await run_in_threadpool(run)
+    except (KeyError, IndexError, ValueError) as e:
+        log(f"Tile operation {operation} failed in session {session_id}: {e}", level="error")
+        raise HTTPException(status_code=422, detail=f"Tile operation {operation} failed: {e}")
+    return Response(content=body, media_type=MATRIX_FRAME_CONTENT_TYPE)
+
+
+@app.delete("/tiles/{session_id}")
+def close_tile_session(session_id: str):
+    """
+    Удаляет сессию с тайлами и освобождает её слот.
+    """
+    if not release_tile_session(session_id):
+        raise HTTPException(status_code=404, detail=f"Tile session {session_id} not found")
+    log(f"Tile session {session_id} closed")
+    return {"message": "Tile session closed", "session_id": session_id}
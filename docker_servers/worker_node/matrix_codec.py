@@ -0,0 +1,173 @@
+# matrix_codec.py
+# Бинарный формат матриц: хранение в MongoDB и передача между worker node control server и worker nodes.
+#
+# Кадр: b"MTXF" | uint32 LE длина заголовка | JSON-заголовок | выравнивание до 8 байт | буферы массивов.
+# Заголовок содержит произвольные метаданные ("meta") и описание массивов
+# (имя, dtype, shape, смещение, длина). Все массивы - little-endian, выровнены на 8 байт,
+# поэтому декодирование выполняется через np.frombuffer без копирования.
+import json
+import struct
+import numpy as np
+import scipy.sparse as sp
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+MATRIX_FRAME_CONTENT_TYPE = "application/x-matrix-frame"
+FRAME_MAGIC = b"MTXF"
+FRAME_ALIGNMENT = 8
+# Размер части при потоковом кодировании кадра (iter_frame)
+FRAME_CHUNK_SIZE = 1024 * 1024
+
+
+def _padding(size: int) -> int:
+    return (-size) % FRAME_ALIGNMENT
+
+
+def _little_endian(array: np.ndarray) -> np.ndarray:
+    array = np.ascontiguousarray(array)
+    if array.dtype.byteorder == ">":
+        array = array.astype(array.dtype.newbyteorder("<"))
+    return array
+
+
+def _frame_head(meta: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> Tuple[bytes, Dict[str, np.ndarray]]:
+    """
+    Возвращает начало кадра (сигнатура, заголовок, выравнивание) и массивы в порядке записи.
+    """
+    prepared = {name: _little_endian(array) for name, array in arrays.items()}
+    descriptors = []
+    offset = 0
+    for name, array in prepared.items():
+        descriptors.append({
+            "name": name,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+            "nbytes": array.nbytes,
+        })
+        offset += array.nbytes + _padding(array.nbytes)
+
+    header = json.dumps({"meta": meta, "arrays": descriptors}).encode("utf-8")
+    prefix = FRAME_MAGIC + struct.pack("<I", len(header))
+    return prefix + header + b"\0" * _padding(len(prefix) + len(header)), prepared
+
+
+def encode_frame(meta: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> bytes:
+    """
+    Кодирует метаданные и именованные массивы в бинарный кадр.
+
+    :param meta: JSON-сериализуемые метаданные.
+    :param arrays: Массивы NumPy по именам.
+    :return: Байты кадра.
+    """
+    head, prepared = _frame_head(meta, arrays)
+    parts = [head]
+    for array in prepared.values():
+        parts.append(array.tobytes())
+        parts.append(b"\0" * _padding(array.nbytes))
+    return b"".join(parts)
+
+
+def iter_frame(meta: Dict[str, Any], arrays: Dict[str, np.ndarray],
+               chunk_size: int = FRAME_CHUNK_SIZE) -> Tuple[int, Iterator[bytes]]:
+    """
+    Кодирует кадр по частям для потоковой передачи: массивы не копируются целиком,
+    в памяти одновременно находится не больше одной части размером chunk_size.
+
+    :return: Кортеж (длина кадра в байтах, итератор частей кадра).
+    """
+    head, prepared = _frame_head(meta, arrays)
+    length = len(head) + sum(array.nbytes + _padding(array.nbytes) for array in prepared.values())
+
+    def chunks() -> Iterator[bytes]:
+        yield head
+        for array in prepared.values():
+            data = memoryview(array.reshape(-1)).cast("B")
+            for start in range(0, len(data), chunk_size):
+                yield bytes(data[start:start + chunk_size])
+            if _padding(array.nbytes):
+                yield b"\0" * _padding(array.nbytes)
+
+    return length, chunks()
+
+
+def decode_frame(body: bytes) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """
+    Декодирует бинарный кадр. Массивы ссылаются на буфер body без копирования (только чтение).
+
+    :param body: Байты кадра.
+    :return: Кортеж (meta, arrays).
+    """
+    if len(body) < 8 or body[:4] != FRAME_MAGIC:
+        raise ValueError("Invalid matrix frame: bad magic.")
+    (header_length,) = struct.unpack_from("<I", body, 4)
+    header_end = 8 + header_length
+    if header_end > len(body):
+        raise ValueError("Invalid matrix frame: truncated header.")
+    header = json.loads(bytes(body[8:header_end]).decode("utf-8"))
+    data_start = header_end + _padding(header_end)
+
+    buffer = memoryview(body)
+    arrays = {}
+    for descriptor in header["arrays"]:
+        dtype = np.dtype(descriptor["dtype"])
+        start = data_start + descriptor["offset"]
+        if start + descriptor["nbytes"] > len(body):
+            raise ValueError(f"Invalid matrix frame: array '{descriptor['name']}' is truncated.")
+        count = descriptor["nbytes"] // dtype.itemsize
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=start)
+        arrays[descriptor["name"]] = array.reshape(descriptor["shape"])
+    return header["meta"], arrays
+
+
+def decode_frame_meta(prefix: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Разбирает метаданные по началу кадра (например, при потоковой передаче).
+
+    :param prefix: Первые байты кадра.
+    :return: meta или None, если заголовок получен ещё не полностью.
+    """
+    if len(prefix) >= 4 and prefix[:4] != FRAME_MAGIC:
+        raise ValueError("Invalid matrix frame: bad magic.")
+    if len(prefix) < 8:
+        return None
+    (header_length,) = struct.unpack_from("<I", prefix, 4)
+    if len(prefix) < 8 + header_length:
+        return None
+    return json.loads(bytes(prefix[8:8 + header_length]).decode("utf-8"))["meta"]
+
+
+def pack_matrix(matrix, name: str, arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """
+    Добавляет плотную или разреженную (CSR) матрицу в словарь массивов кадра.
+
+    :param matrix: Матрица numpy или scipy.sparse.
+    :param name: Префикс имён массивов.
+    :param arrays: Словарь массивов кадра (дополняется).
+    :return: Описание матрицы для метаданных.
+    """
+    if sp.issparse(matrix):
+        matrix = matrix.tocsr()
+        for part in ("data", "indices", "indptr"):
+            arrays[f"{name}.{part}"] = getattr(matrix, part)
+        return {"format": "csr", "shape": list(matrix.shape), "name": name}
+    arrays[name] = np.asarray(matrix)
+    return {"format": "dense", "name": name}
+
+
+def unpack_matrix(descriptor: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    """
+    Восстанавливает матрицу по описанию из метаданных кадра.
+
+    :param descriptor: Описание, созданное pack_matrix.
+    :param arrays: Массивы кадра.
+    :return: Матрица numpy или scipy.sparse CSR.
+    """
+    name = descriptor["name"]
+    if descriptor["format"] == "csr":
+        return sp.csr_matrix(
+            (arrays[f"{name}.data"], arrays[f"{name}.indices"], arrays[f"{name}.indptr"]),
+            shape=tuple(descriptor["shape"]),
+        )
+    if descriptor["format"] == "dense":
+        return arrays[name]
+    raise ValueError(f"Unsupported matrix format: {descriptor['format']}")
@@ -0,0 +1,203 @@
+# process_pool.py
+# Постоянный пул процессов для разложений: вычисления не держат GIL основного процесса,
+# а каждая задача может использовать отдельное ядро.
+# Матрица передаётся в процесс через разделяемую память (multiprocessing.shared_memory),
+# без сериализации; результат возвращается через Pipe.
+import multiprocessing as mp
+import threading
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import scipy.sparse as sp
+from logger import log  # Используем кастомный логгер
+
+# Интервал проверки отмены и таймаута (в секундах)
+POLL_INTERVAL = 0.1
+
+
+class JobCancelled(Exception):
+    """Задача отменена клиентом."""
+
+
+class JobTimeout(Exception):
+    """Задача не уложилась в отведённое время."""
+
+
+def _share_matrix(matrix) -> Tuple[SharedMemory, Dict[str, Any]]:
+    """
+    Копирует плотную или разреженную (CSR) матрицу в новый сегмент разделяемой памяти.
+
+    :return: Кортеж (сегмент, описание массивов в сегменте).
+    """
+    if sp.issparse(matrix):
+        matrix = matrix.tocsr()
+        parts = {"data": matrix.data, "indices": matrix.indices, "indptr": matrix.indptr}
+        descriptor = {"format": "csr", "shape": list(matrix.shape), "parts": []}
+    else:
+        parts = {"matrix": np.asarray(matrix, dtype=np.float64)}
+        descriptor = {"format": "dense", "shape": list(parts["matrix"].shape), "parts": []}
+
+    offset = 0
+    for name, array in parts.items():
+        descriptor["parts"].append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+        offset += array.nbytes + (-array.nbytes) % 8
+    shm = SharedMemory(create=True, size=max(offset, 1))
+    for part in descriptor["parts"]:
+        array = parts[part["name"]]
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, offset=part["offset"])[...] = array
+    return shm, descriptor
+
+
+def _attach_matrix(shm: SharedMemory, descriptor: Dict[str, Any]):
+    """
+    Строит матрицу поверх сегмента разделяемой памяти без копирования.
+    """
+    parts = {
+        part["name"]: np.ndarray(part["shape"], dtype=np.dtype(part["dtype"]), buffer=shm.buf, offset=part["offset"])
+        for part in descriptor["parts"]
+    }
+    if descriptor["format"] == "csr":
+        return sp.csr_matrix((parts["data"], parts["indices"], parts["indptr"]), shape=tuple(descriptor["shape"]))
+    return parts["matrix"]
+
+
+def _worker_main(conn) -> None:
+    """
+    Цикл процесса пула: получает задачу (алгоритм, параметры, сегмент с матрицей),
+    выполняет разложение и отправляет результат обратно.
+    """
+    from algorithms import DECOMPOSITIONS
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        algorithm, options, shm_name, descriptor = task
+        shm = SharedMemory(name=shm_name)
+        try:
+            matrix = _attach_matrix(shm, descriptor)
+            start = time.time()
+            result = DECOMPOSITIONS[algorithm](matrix, options)
+            conn.send(("ok", result, time.time() - start))
+        except Exception as e:
+            conn.send(("error", str(e), 0.0))
+        finally:
+            matrix = result = None
+            try:
+                shm.close()
+            except BufferError:
+                # Результат ещё ссылается на сегмент - его освободит сборщик мусора
+                pass
+
+
+class _PoolProcess:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class DecompositionProcessPool:
+    """
+    Постоянный пул процессов фиксированного размера. Процесс, выполнявший
+    отменённую или просроченную задачу, завершается и заменяется новым.
+    """
+
+    def __init__(self, size: int, start_method: str = "forkserver"):
+        self.size = max(1, size)
+        self._context = mp.get_context(start_method)
+        self._lock = threading.Lock()
+        self._idle: List[_PoolProcess] = []
+        self._all: List[_PoolProcess] = []
+
+    def start(self) -> None:
+        with self._lock:
+            for _ in range(self.size):
+                process = _PoolProcess(self._context)
+                self._idle.append(process)
+                self._all.append(process)
+        log(f"Started process pool with {self.size} processes")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            processes, self._all, self._idle = self._all, [], []
+        for process in processes:
+            process.stop()
+        log("Process pool stopped")
+
+    def _acquire(self) -> _PoolProcess:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            # Все процессы заняты (размер пула меньше числа слотов) - добавляем ещё один
+            process = _PoolProcess(self._context)
+            self._all.append(process)
+            return process
+
+    def _release(self, process: _PoolProcess) -> None:
+        with self._lock:
+            self._idle.append(process)
+
+    def _replace(self, process: _PoolProcess) -> None:
+        process.stop(kill=True)
+        with self._lock:
+            self._all.remove(process)
+            replacement = _PoolProcess(self._context)
+            self._all.append(replacement)
+            self._idle.append(replacement)
+
+    def run(self, algorithm: str, matrix, options: Dict[str, Any],
+            timeout: Optional[float] = None, cancel_event: Optional[threading.Event] = None) -> Tuple[Dict[str, Any], float]:
+        """
+        Выполняет разложение в процессе пула. Блокирует вызывающий поток до результата.
+
+        :param algorithm: Имя алгоритма из algorithms.DECOMPOSITIONS.
+        :param matrix: Матрица numpy или scipy.sparse.
+        :param options: Параметры разложения.
+        :param timeout: Максимальное время выполнения (в секундах), None - без ограничения.
+        :param cancel_event: Событие отмены задачи.
+        :return: Кортеж (результат, время вычисления в секундах).
+        :raises JobCancelled: Если задача отменена.
+        :raises JobTimeout: Если истёк таймаут.
+        :raises ValueError: Если разложение завершилось ошибкой.
+        """
+        shm, descriptor = _share_matrix(matrix)
+        process = self._acquire()
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            process.conn.send((algorithm, options, shm.name, descriptor))
+            while not process.conn.poll(POLL_INTERVAL):
+                if cancel_event is not None and cancel_event.is_set():
+                    self._replace(process)
+                    raise JobCancelled("Job was cancelled.")
+                if deadline is not None and time.monotonic() > deadline:
+                    self._replace(process)
+                    raise JobTimeout(f"Job exceeded the timeout of {timeout} s.")
+                if not process.process.is_alive():
+                    self._replace(process)
+                    raise RuntimeError("Worker process terminated unexpectedly.")
+            status, payload, time_taken = process.conn.recv()
+            self._release(process)
+        finally:
+            shm.close()
+            shm.unlink()
+
+        if status == "error":
+            raise ValueError(payload)
+        return payload, time_taken
@@ -0,0 +1,157 @@
+# sparse_decompositions.py
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+from scipy.sparse.linalg import splu
+from typing import Tuple
+
+# Упорядочивания, которые понимает SuperLU (scipy.sparse.linalg.splu)
+SUPERLU_ORDERINGS = ("COLAMD", "MMD_AT_PLUS_A", "MMD_ATA", "NATURAL")
+# Упорядочивания столбцов для разреженного QR
+QR_ORDERINGS = ("RCM", "NATURAL")
+
+
+def _inverse_permutation(perm: np.ndarray) -> np.ndarray:
+    inverse = np.empty_like(perm)
+    inverse[perm] = np.arange(perm.shape[0])
+    return inverse
+
+
+def _check_square(A: sp.spmatrix, name: str) -> None:
+    if A.shape[0] != A.shape[1]:
+        raise ValueError(f"Matrix must be square for {name} decomposition.")
+
+
+def _symmetric_lu(A: sp.spmatrix, ordering: str):
+    """
+    LU-разложение симметричной матрицы без численного выбора ведущего элемента:
+    SuperLU в симметричном режиме применяет одинаковую перестановку к строкам и столбцам,
+    поэтому U = D·Lᵀ.
+    """
+    _check_square(A, "symmetric")
+    if ordering not in SUPERLU_ORDERINGS:
+        raise ValueError(f"Unsupported ordering: {ordering}")
+    if abs(A - A.T).max() > 1e-8 * max(abs(A).max(), 1.0):
+        raise ValueError("Matrix must be symmetric for LDL/Cholesky decomposition.")
+    try:
+        lu = splu(A.tocsc(), permc_spec=ordering, diag_pivot_thresh=0.0, options={"SymmetricMode": True})
+    except RuntimeError as e:
+        raise ValueError(f"Sparse factorization failed: {e}") from e
+    if not np.array_equal(lu.perm_r, lu.perm_c):
+        raise ValueError("Symmetric factorization required numerical pivoting; use dense LDL instead.")
+    perm = _inverse_permutation(lu.perm_c)
+    return perm, lu.L.tocsr(), lu.U.diagonal()
+
+
+def sparse_lu(matrix: sp.spmatrix, ordering: str = "COLAMD") -> Tuple[np.ndarray, np.ndarray, sp.csr_matrix, sp.csr_matrix]:
+    """
+    Разреженное LU-разложение (SuperLU) с упорядочиванием столбцов, уменьшающим заполнение.
+
+    :param matrix: Квадратная разреженная матрица.
+    :param ordering: Упорядочивание столбцов: "COLAMD", "MMD_AT_PLUS_A", "MMD_ATA" или "NATURAL".
+    :return: Кортеж (row_perm, col_perm, L, U) такой, что A[row_perm][:, col_perm] = L·U;
+             L и U - разреженные матрицы CSR.
+    """
+    A = sp.csc_matrix(matrix, dtype=np.float64)
+    _check_square(A, "LU")
+    if ordering not in SUPERLU_ORDERINGS:
+        raise ValueError(f"Unsupported ordering: {ordering}")
+    try:
+        lu = splu(A, permc_spec=ordering)
+    except RuntimeError as e:
+        raise ValueError(f"Sparse factorization failed: {e}") from e
+    return _inverse_permutation(lu.perm_r), _inverse_permutation(lu.perm_c), lu.L.tocsr(), lu.U.tocsr()
+
+
+def sparse_ldl(matrix: sp.spmatrix, ordering: str = "MMD_AT_PLUS_A") -> Tuple[np.ndarray, sp.csr_matrix, np.ndarray]:
+    """
+    Разреженное LDLᵀ-разложение симметричной матрицы с симметричным упорядочиванием
+    минимальной степени. В отличие от плотного варианта используются только блоки 1×1.
+
+    :param matrix: Симметричная разреженная матрица.
+    :param ordering: Упорядочивание (по умолчанию минимальная степень по A + Aᵀ).
+    :return: Кортеж (perm, L, D) такой, что A[perm][:, perm] = L·D·Lᵀ;
+             L - разреженная CSR, D - компактная матрица 2×n (диагональ и нулевая поддиагональ).
+    """
+    perm, L, d = _symmetric_lu(sp.csc_matrix(matrix, dtype=np.float64), ordering)
+    return perm, L, np.vstack((d, np.zeros_like(d)))
+
+
+def sparse_cholesky(matrix: sp.spmatrix, ordering: str = "MMD_AT_PLUS_A") -> Tuple[np.ndarray, sp.csr_matrix]:
+    """
+    Разреженное разложение Холецкого симметричной положительно определённой матрицы.
+
+    :param matrix: Симметричная положительно определённая разреженная матрица.
+    :param ordering: Упорядочивание (по умолчанию минимальная степень по A + Aᵀ).
+    :return: Кортеж (perm, L) такой, что A[perm][:, perm] = L·Lᵀ; L - разреженная CSR.
+    """
+    perm, L, d = _symmetric_lu(sp.csc_matrix(matrix, dtype=np.float64), ordering)
+    if np.any(d <= 0.0):
+        raise ValueError("Matrix must be positive definite for Cholesky decomposition.")
+    return perm, (L @ sp.diags(np.sqrt(d))).tocsr()
+
+
+def sparse_qr(matrix: sp.spmatrix, ordering: str = "RCM") -> Tuple[np.ndarray, sp.csr_matrix]:
+    """
+    Разреженное QR-разложение без явного Q (Q-less) построчными вращениями Гивенса.
+
+    Столбцы предварительно упорядочиваются обратным алгоритмом Катхилла-Макки по
+    шаблону AᵀA, что сужает профиль R. Хранятся только ненулевые элементы строк R.
+
+    :param matrix: Прямоугольная разреженная матрица m×n.
+    :param ordering: Упорядочивание столбцов: "RCM" или "NATURAL".
+    :return: Кортеж (col_perm, R) такой, что A[:, col_perm] = Q·R и Rᵀ·R = (A[:, col_perm])ᵀ·A[:, col_perm];
+             R - верхняя треугольная n×n в формате CSR.
+    """
+    A = sp.csr_matrix(matrix, dtype=np.float64)
+    m, n = A.shape
+    if ordering not in QR_ORDERINGS:
+        raise ValueError(f"Unsupported ordering: {ordering}")
+    if ordering == "RCM":
+        pattern = sp.csr_matrix((np.ones_like(A.data), A.indices, A.indptr), shape=A.shape)
+        col_perm = reverse_cuthill_mckee((pattern.T @ pattern).tocsr(), symmetric_mode=True).astype(np.int64)
+    else:
+        col_perm = np.arange(n)
+
+    A = A[:, col_perm].tocsr()
+    A.eliminate_zeros()
+    A.sort_indices()
+    # Строки с более ранним первым ненулевым столбцом обрабатываются первыми
+    leading = np.array([A.indices[A.indptr[i]] if A.indptr[i] < A.indptr[i + 1] else n for i in range(m)])
+    R_rows = [None] * n  # R_rows[j] = (индексы, значения) строки R с ведущим столбцом j
+
+    for i in np.argsort(leading, kind="stable"):
+        idx = A.indices[A.indptr[i]:A.indptr[i + 1]].copy()
+        val = A.data[A.indptr[i]:A.indptr[i + 1]].copy()
+        while idx.size:
+            j = idx[0]
+            if R_rows[j] is None:
+                R_rows[j] = (idx, val)
+                break
+            r_idx, r_val = R_rows[j]
+            union = np.union1d(r_idx, idx)
+            r = np.zeros(union.shape[0])
+            x = np.zeros(union.shape[0])
+            r[np.searchsorted(union, r_idx)] = r_val
+            x[np.searchsorted(union, idx)] = val
+            # Вращение Гивенса, обнуляющее ведущий элемент строки x
+            h = np.hypot(r[0], x[0])
+            c, s = r[0] / h, x[0] / h
+            r, x = c * r + s * x, c * x - s * r
+            x[0] = 0.0
+            R_rows[j] = (union, r)
+            nonzero = x != 0.0
+            idx, val = union[nonzero], x[nonzero]
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    indices, data = [], []
+    for j, row in enumerate(R_rows):
+        if row is not None:
+            indices.append(row[0])
+            data.append(row[1])
+        indptr[j + 1] = indptr[j] + (row[0].shape[0] if row is not None else 0)
+    R = sp.csr_matrix(
+        (np.concatenate(data) if data else np.zeros(0), np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64), indptr),
+        shape=(n, n),
+    )
+    return col_perm, R
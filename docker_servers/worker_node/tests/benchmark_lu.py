@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from decompositions import blocked_lu
+
+
+def loop_lu(matrix):
+    """
+    Прежняя реализация LU-разложения на циклах Python (без выбора ведущего элемента).
+    Оставлена только для сравнения скорости.
+
+    Args:
+        matrix (np.ndarray): Квадратная матрица.
+
+    Returns:
+        tuple: Матрицы (L, U).
+    """
+    n = matrix.shape[0]
+    L = np.zeros((n, n))
+    U = np.zeros((n, n))
+    for i in range(n):
+        for j in range(i, n):
+            U[i, j] = matrix[i, j] - sum(L[i, k] * U[k, j] for k in range(i))
+        for j in range(i, n):
+            if i == j:
+                L[j, i] = 1
+            else:
+                L[j, i] = (matrix[j, i] - sum(L[j, k] * U[k, i] for k in range(i))) / U[i, i]
+    return L, U
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [50, 100, 200, 400]
+    print(f"{'n':>6} {'loop, s':>10} {'blocked, s':>11} {'speedup':>9} {'residual':>10}")
+    for n in sizes:
+        # Диагональное преобладание - чтобы цикл без выбора ведущего элемента был устойчив
+        matrix = np.random.rand(n, n) + n * np.eye(n)
+        loop_time, _ = measure(loop_lu, matrix)
+        blocked_time, (perm, L, U) = measure(blocked_lu, matrix)
+        residual = np.linalg.norm(matrix[perm] - L @ U) / np.linalg.norm(matrix)
+        print(f"{n:>6} {loop_time:>10.3f} {blocked_time:>11.4f} {loop_time / blocked_time:>8.0f}x {residual:>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import numpy as np
+from scipy.io import mmread
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from decompositions import householder_qr
+
+DEFAULT_MATRIX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "main_server", "tests", "Matrix_FIDAP005.mtx")
+
+
+def gram_schmidt_qr(matrix):
+    """
+    Прежняя реализация QR-разложения классическим методом Грама-Шмидта.
+    Оставлена только для сравнения скорости и потери ортогональности.
+
+    Args:
+        matrix (np.ndarray): Матрица m×n.
+
+    Returns:
+        tuple: Матрицы (Q, R).
+    """
+    m, n = matrix.shape
+    Q = np.zeros((m, m))
+    R = np.zeros((m, n))
+    A = matrix.astype(np.float64).copy()
+    for i in range(n):
+        Q[:, i] = A[:, i] / np.linalg.norm(A[:, i])
+        for j in range(i, n):
+            R[i, j] = np.dot(Q[:, i], A[:, j])
+        for j in range(i + 1, n):
+            A[:, j] -= Q[:, i] * R[i, j]
+    return Q[:, :n], R[:n, :]
+
+
+def report(name, func, matrix):
+    start = time.perf_counter()
+    Q, R = func(matrix)
+    elapsed = time.perf_counter() - start
+    orthogonality = np.linalg.norm(Q.T @ Q - np.eye(Q.shape[1]))
+    residual = np.linalg.norm(matrix - Q @ R) / np.linalg.norm(matrix)
+    print(f"{name:>14} {elapsed:>10.4f} {orthogonality:>14.2e} {residual:>10.2e}")
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MATRIX_PATH
+    matrix = mmread(path)
+    matrix = matrix if isinstance(matrix, np.ndarray) else matrix.toarray()
+    print(f"{os.path.basename(path)}: {matrix.shape}, cond = {np.linalg.cond(matrix):.2e}")
+    print(f"{'method':>14} {'time, s':>10} {'||QᵀQ - I||':>14} {'residual':>10}")
+    report("gram-schmidt", gram_schmidt_qr, matrix)
+    report("householder", householder_qr, matrix)
+
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    matrix = np.random.rand(n, n)
+    print(f"\nrandom: {matrix.shape}")
+    report("gram-schmidt", gram_schmidt_qr, matrix)
+    report("householder", householder_qr, matrix)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,14 +27,16 @@ echo "Started."
 
 
 # Тестирование другого разложения (например QR)
-curl -s  -X 'POST' \
+RESPONSE=$(curl -s  -X 'POST' \
 'http://127.0.0.1:8000/process_task' \
 -H 'Content-Type: application/json' \
 -d '{
 "input_matrix": [[ 1,2 ], [3, 4]]
 ,
 "algorithm": "qr"
-}'
+}')
+echo "$RESPONSE"
+JOB_ID=$(echo "$RESPONSE" | sed -n 's/.*"job_id":"\([^"]*\)".*/\1/p')
 
 echo -e "\n"
 
@@ -52,7 +54,7 @@ echo -e "\n"
 
 
 curl -s  -X 'GET' \
-'http://127.0.0.1:8000/get_result' 
+"http://127.0.0.1:8000/jobs/$JOB_ID" 
 
 echo -e "\n"
 
@@ -68,19 +70,70 @@ echo -e "\n"
 sleep 4
 
 curl -s  -X 'GET' \
-'http://127.0.0.1:8000/get_result' 
+"http://127.0.0.1:8000/jobs/$JOB_ID" 
 
 # 6. Отправить запрос на /status во время выполнения задачи
 echo "Checking server status during the task execution..."
 
 curl -s  -X 'GET' \
-'http://127.0.0.1:8000/get_result' 
+"http://127.0.0.1:8000/jobs/$JOB_ID" 
 
 echo -e "\n"
 
 curl -s -X 'GET' \
 'http://127.0.0.1:8000/status'
 
+echo -e "\n"
+
+# Список задач узла и удаление полученного результата
+curl -s -X 'GET' \
+'http://127.0.0.1:8000/jobs'
+
+echo -e "\n"
+
+curl -s -X 'DELETE' \
+"http://127.0.0.1:8000/jobs/$JOB_ID"
+
+
+echo -e "\n"
+
+# 7. Полное (complete) QR-разложение прямоугольной матрицы
+echo "Sending a complete-mode QR task for a rectangular matrix..."
+RESPONSE=$(curl -s  -X 'POST' \
+'http://127.0.0.1:8000/process_task' \
+-H 'Content-Type: application/json' \
+-d '{
+"input_matrix": [[ 1,2 ], [3, 4], [5, 6]]
+,
+"algorithm": "qr",
+"options": {"mode": "complete"}
+}')
+echo "$RESPONSE"
+JOB_ID=$(echo "$RESPONSE" | sed -n 's/.*"job_id":"\([^"]*\)".*/\1/p')
+
+echo -e "\n"
+
+# Long-poll: ответ приходит сразу после завершения задачи (не позже чем через 30 секунд)
+curl -s  -X 'GET' \
+"http://127.0.0.1:8000/jobs/$JOB_ID?wait=30" 
+
+echo -e "\n"
+
+# Отмена выполняющейся задачи: DELETE возвращает 202, затем GET - 410
+RESPONSE=$(curl -s -X 'POST' \
+'http://127.0.0.1:8000/process_task' \
+-H 'Content-Type: application/json' \
+-d '{
+"input_matrix": [[4, 1], [1, 3]],
+"algorithm": "lu",
+"timeout": 60
+}')
+JOB_ID=$(echo "$RESPONSE" | sed -n 's/.*"job_id":"\([^"]*\)".*/\1/p')
+curl -s -X 'DELETE' "http://127.0.0.1:8000/jobs/$JOB_ID"
+echo -e "\n"
+sleep 1
+curl -s -X 'GET' "http://127.0.0.1:8000/jobs/$JOB_ID"
+
 
 
 
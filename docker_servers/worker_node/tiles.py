@@ -0,0 +1,168 @@
+# tiles.py
+# Хранилище блоков (тайлов) матрицы для распределённого LU-разложения.
+# Control server раскладывает матрицу по узлам в двумерной блочно-циклической схеме:
+# каждый узел хранит свои тайлы между шагами разложения и выполняет над ними операции
+# шага (обмен строк после выбора ведущих элементов, TRSM для строки U, GEMM-обновление хвоста),
+# поэтому по сети на каждом шаге передаются только панель и строка U, а не вся матрица.
+# Сессия хранилища удаляется control server'ом по завершении или по истечении TILE_SESSION_TTL.
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+from scipy.linalg import solve_triangular
+from decompositions import panel_lu
+from matrix_codec import pack_matrix, unpack_matrix
+
+# Время хранения сессии без обращений (в секундах)
+TILE_SESSION_TTL = float(os.getenv("TILE_SESSION_TTL", "600"))
+
+Tile = Tuple[int, int]
+
+
+@dataclass
+class TileSession:
+    session_id: str
+    tiles: Dict[Tile, np.ndarray] = field(default_factory=dict)
+    last_used: float = field(default_factory=time.monotonic)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(tile.nbytes for tile in self.tiles.values())
+
+
+class TileStore:
+    """
+    Потокобезопасное хранилище сессий с тайлами. Операции над одной сессией выполняются по очереди.
+    """
+
+    def __init__(self, ttl: float = TILE_SESSION_TTL):
+        self.ttl = ttl
+        self._sessions: Dict[str, TileSession] = {}
+        self._lock = threading.Lock()
+
+    def open(self, session_id: str) -> TileSession:
+        with self._lock:
+            session = self._sessions[session_id] = TileSession(session_id)
+            return session
+
+    def get(self, session_id: str):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.monotonic()
+            return session
+
+    def drop(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def expired(self) -> List[str]:
+        """
+        Удаляет сессии без обращений дольше ttl и возвращает их идентификаторы.
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [sid for sid, session in self._sessions.items() if now - session.last_used > self.ttl]
+            for session_id in expired:
+                del self._sessions[session_id]
+        return expired
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {"sessions": len(sessions), "tiles": sum(len(s.tiles) for s in sessions), "size": sum(s.nbytes for s in sessions)}
+
+
+def _pack_tiles(items: List[Dict[str, Any]], key: str, arrays: Dict[str, np.ndarray]) -> None:
+    for n, item in enumerate(items):
+        item[key] = pack_matrix(item[key], f"{key}.{n}", arrays)
+
+
+def store_tiles(session: TileSession, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    """
+    Сохраняет тайлы: meta["tiles"] - список {"i", "j", "tile"}.
+    """
+    for item in meta["tiles"]:
+        # Массивы кадра доступны только для чтения - тайлы изменяются на месте, поэтому копируются
+        session.tiles[(item["i"], item["j"])] = np.array(unpack_matrix(item["tile"], arrays), dtype=np.float64)
+    return {"stored": len(meta["tiles"])}, {}
+
+
+def fetch_tiles(session: TileSession, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    """
+    Возвращает тайлы meta["tiles"] (список пар [i, j]); при meta["drop"] удаляет их из сессии.
+    """
+    result, out = [], {}
+    for i, j in meta["tiles"]:
+        tile = session.tiles.pop((i, j)) if meta.get("drop") else session.tiles[(i, j)]
+        result.append({"i": i, "j": j, "tile": tile})
+    _pack_tiles(result, "tile", out)
+    return {"tiles": result}, out
+
+
+def factor_panel(session: TileSession, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    """
+    Раскладывает панель meta["panel"] (см. decompositions.panel_lu); тайлы сессии не используются.
+    """
+    perm, lu = panel_lu(unpack_matrix(meta["panel"], arrays))
+    out = {}
+    return {"perm": pack_matrix(perm, "perm", out), "panel": pack_matrix(lu, "panel", out)}, out
+
+
+def gather_rows(session: TileSession, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    """
+    Возвращает строки тайлов: meta["rows"] - список {"i", "j", "local"} (номера строк внутри тайла).
+    """
+    result, out = [], {}
+    for item in meta["rows"]:
+        tile = session.tiles[(item["i"], item["j"])]
+        result.append({"i": item["i"], "j": item["j"], "values": tile[item["local"]]})
+    _pack_tiles(result, "values", out)
+    return {"rows": result}, out
+
+
+def update_rows(session: TileSession, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    """
+    Шаг k после разложения панели: записывает переставленные строки (meta["rows"] - {"i", "j", "local", "values"}),
+    затем решает L_kk·U_kj = A_kj для тайлов строки k (meta["trsm"] - номера столбцов j) и возвращает
+    готовые тайлы U_kj, удаляя их из сессии: они больше не изменяются.
+    """
+    for item in meta["rows"]:
+        session.tiles[(item["i"], item["j"])][item["local"]] = unpack_matrix(item["values"], arrays)
+    result, out = [], {}
+    if meta.get("trsm"):
+        k = meta["k"]
+        L_kk = unpack_matrix(meta["l_kk"], arrays)
+        for j in meta["trsm"]:
+            tile = solve_triangular(L_kk, session.tiles.pop((k, j)), lower=True, unit_diagonal=True, check_finite=False)
+            result.append({"j": j, "tile": tile})
+    _pack_tiles(result, "tile", out)
+    return {"u": result}, out
+
+
+def update_trailing(session: TileSession, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    """
+    GEMM-обновление хвоста: A_ij -= L_ik·U_kj для всех тайлов сессии с i из meta["l"] и j из meta["u"].
+    """
+    L = {item["i"]: unpack_matrix(item["tile"], arrays) for item in meta["l"]}
+    U = {item["j"]: unpack_matrix(item["tile"], arrays) for item in meta["u"]}
+    updated = 0
+    for (i, j), tile in session.tiles.items():
+        if i in L and j in U:
+            tile -= L[i] @ U[j]
+            updated += 1
+    return {"updated": updated}, {}
+
+
+# Операции над тайлами по имени (POST /tiles/{session_id}/{operation})
+TILE_OPERATIONS: Dict[str, Callable[[TileSession, Dict[str, Any], Dict[str, np.ndarray]], Tuple[Dict[str, Any], Dict[str, np.ndarray]]]] = {
+    "store": store_tiles,
+    "fetch": fetch_tiles,
+    "panel": factor_panel,
+    "rows": gather_rows,
+    "update": update_rows,
+    "gemm": update_trailing,
+}
@@ -0,0 +1,317 @@
+# distributed_lu.py
+# Распределённое LU-разложение больших плотных матриц на нескольких worker nodes.
+# Матрица делится на тайлы block_size×block_size, которые раскладываются по узлам
+# в двумерной блочно-циклической схеме (узлы образуют сетку Pr×Pc, тайл (i, j) хранится
+# на узле (i mod Pr, j mod Pc)) и остаются там до конца разложения (см. worker_node/tiles.py).
+# Шаг k right-looking алгоритма выполняется как граф операций:
+#   1. панель (столбец тайлов k) собирается с узлов и раскладывается на одном узле
+#      с частичным выбором ведущего элемента по всем строкам;
+#   2. перестановка строк применяется к хвосту: строки обмениваются через control server,
+#      затем узлы строки k решают L_kk·U_kj = A_kj (TRSM);
+#   3. все узлы параллельно обновляют свои тайлы хвоста A_ij -= L_ik·U_kj (GEMM).
+# По сети на шаге передаются только панель, переставляемые строки и строка U, поэтому
+# время основной части разложения (GEMM, ~2/3·n³ операций) делится между узлами.
+import asyncio
+import math
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+import numpy as np
+from scipy import sparse
+from fastapi.concurrency import run_in_threadpool
+from logger import log  # Используем кастомный логгер
+from http_client import get_http_client
+from matrix_codec import MATRIX_FRAME_CONTENT_TYPE, decode_frame, encode_frame, pack_matrix, unpack_matrix
+
+# Размер матрицы, начиная с которого LU раскладывается распределённо (если параметр distributed не задан)
+DISTRIBUTED_LU_MIN_SIZE = int(os.getenv("DISTRIBUTED_LU_MIN_SIZE", "8192"))
+# Максимальное число узлов в одном разложении
+DISTRIBUTED_LU_MAX_WORKERS = int(os.getenv("DISTRIBUTED_LU_MAX_WORKERS", "16"))
+# Размер тайла
+DISTRIBUTED_LU_BLOCK_SIZE = int(os.getenv("DISTRIBUTED_LU_BLOCK_SIZE", "512"))
+# Максимальный размер одного запроса при раздаче тайлов (в байтах)
+DISTRIBUTED_LU_BATCH_BYTES = int(os.getenv("DISTRIBUTED_LU_BATCH_BYTES", str(64 * 1024 * 1024)))
+# Максимальное время выполнения одной операции на узле (в секундах)
+DISTRIBUTED_LU_TIMEOUT = float(os.getenv("DISTRIBUTED_LU_TIMEOUT", "600"))
+
+
+class DistributedLUError(Exception):
+    """Узел недоступен или не выполнил операцию над тайлами."""
+
+
+def should_distribute(matrix, algorithm: str, options: Dict[str, Any]) -> bool:
+    """
+    Определяет, раскладывать ли матрицу распределённо: только плотное LU;
+    options["distributed"] задаёт режим явно, иначе он выбирается по размеру матрицы.
+    """
+    if algorithm != "lu" or sparse.issparse(matrix):
+        return False
+    if options.get("distributed") is not None:
+        return bool(options["distributed"])
+    return matrix.shape[0] >= DISTRIBUTED_LU_MIN_SIZE
+
+
+def process_grid(count: int) -> Tuple[int, int]:
+    """
+    Сетка узлов Pr×Pc (Pr ≤ Pc), близкая к квадратной: объём обмена на шаге пропорционален n/Pr + n/Pc.
+    """
+    rows = math.isqrt(count)
+    while count % rows:
+        rows -= 1
+    return rows, count // rows
+
+
+def _pack_items(items: List[Dict[str, Any]], key: str, arrays: Dict[str, np.ndarray], prefix: str) -> List[Dict[str, Any]]:
+    """
+    Добавляет массивы items[...][key] в кадр под именами prefix.0, prefix.1, ... и заменяет их описаниями.
+    """
+    return [{**item, key: pack_matrix(item[key], f"{prefix}.{n}", arrays)} for n, item in enumerate(items)]
+
+
+@dataclass
+class TileWorker:
+    name: str
+    url: str
+    session_id: Optional[str] = None
+
+
+class DistributedLU:
+    """
+    Одно распределённое LU-разложение: P·A = L·U (A[perm] = L·U, как у blocked_lu на worker node).
+    """
+
+    def __init__(self, workers: List[TileWorker], block_size: int = DISTRIBUTED_LU_BLOCK_SIZE):
+        self.workers = workers
+        self.grid = process_grid(len(workers))
+        self.block_size = max(1, int(block_size))
+
+    def owner(self, i: int, j: int) -> TileWorker:
+        rows, cols = self.grid
+        return self.workers[(i % rows) * cols + j % cols]
+
+    def _bounds(self, i: int, n: int) -> Tuple[int, int]:
+        return i * self.block_size, min(n, (i + 1) * self.block_size)
+
+    async def _call(self, worker: TileWorker, operation: str, meta: Dict[str, Any],
+                    arrays: Dict[str, np.ndarray]) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        body = await run_in_threadpool(encode_frame, meta, arrays)
+        try:
+            response = await get_http_client().post(
+                f"{worker.url}/tiles/{worker.session_id}/{operation}",
+                content=body,
+                headers={"Content-Type": MATRIX_FRAME_CONTENT_TYPE},
+                timeout=httpx.Timeout(10.0, read=DISTRIBUTED_LU_TIMEOUT),
+            )
+        except httpx.RequestError as e:
+            raise DistributedLUError(f"Tile operation {operation} on {worker.name} failed: {e}") from e
+        if response.status_code != 200:
+            raise DistributedLUError(f"Tile operation {operation} on {worker.name} failed: HTTP {response.status_code} {response.text}")
+        return decode_frame(response.content)
+
+    async def _open(self) -> None:
+        async def open_session(worker: TileWorker) -> None:
+            try:
+                response = await get_http_client().post(f"{worker.url}/tiles")
+            except httpx.RequestError as e:
+                raise DistributedLUError(f"Failed to open tile session on {worker.name}: {e}") from e
+            if response.status_code != 200:
+                raise DistributedLUError(f"Failed to open tile session on {worker.name}: HTTP {response.status_code}")
+            worker.session_id = response.json()["session_id"]
+
+        await asyncio.gather(*(open_session(worker) for worker in self.workers))
+
+    async def _close(self) -> None:
+        async def close_session(worker: TileWorker) -> None:
+            try:
+                await get_http_client().delete(f"{worker.url}/tiles/{worker.session_id}")
+            except httpx.RequestError as e:
+                log(f"Failed to close tile session on {worker.name}: {e}", level="warning")
+
+        await asyncio.gather(*(close_session(worker) for worker in self.workers if worker.session_id))
+
+    async def _distribute(self, matrix: np.ndarray, nt: int) -> None:
+        """
+        Раздаёт тайлы узлам-владельцам пакетами не больше DISTRIBUTED_LU_BATCH_BYTES.
+        """
+        n = matrix.shape[0]
+        owned: Dict[str, List[Tuple[int, int]]] = {worker.name: [] for worker in self.workers}
+        for i in range(nt):
+            for j in range(nt):
+                owned[self.owner(i, j).name].append((i, j))
+
+        async def send(worker: TileWorker) -> None:
+            batch, size = [], 0
+            for i, j in owned[worker.name]:
+                (r0, r1), (c0, c1) = self._bounds(i, n), self._bounds(j, n)
+                batch.append({"i": i, "j": j, "tile": matrix[r0:r1, c0:c1]})
+                size += (r1 - r0) * (c1 - c0) * 8
+                if size >= DISTRIBUTED_LU_BATCH_BYTES:
+                    await self._store(worker, batch)
+                    batch, size = [], 0
+            if batch:
+                await self._store(worker, batch)
+
+        await asyncio.gather(*(send(worker) for worker in self.workers))
+
+    async def _store(self, worker: TileWorker, batch: List[Dict[str, Any]]) -> None:
+        arrays = {}
+        await self._call(worker, "store", {"tiles": _pack_items(batch, "tile", arrays, "tile")}, arrays)
+
+    def _group(self, tiles: List[Tuple[int, int]]) -> Dict[str, Tuple[TileWorker, List[Tuple[int, int]]]]:
+        groups: Dict[str, Tuple[TileWorker, List[Tuple[int, int]]]] = {}
+        for i, j in tiles:
+            worker = self.owner(i, j)
+            groups.setdefault(worker.name, (worker, []))[1].append((i, j))
+        return groups
+
+    async def _gather_panel(self, k: int, nt: int) -> np.ndarray:
+        """
+        Собирает столбец тайлов k (от диагонального до последнего) и удаляет его с узлов.
+        """
+        tiles: Dict[int, np.ndarray] = {}
+
+        async def fetch(worker: TileWorker, items: List[Tuple[int, int]]) -> None:
+            meta, arrays = await self._call(worker, "fetch", {"tiles": items, "drop": True}, {})
+            for item in meta["tiles"]:
+                tiles[item["i"]] = unpack_matrix(item["tile"], arrays)
+
+        groups = self._group([(i, k) for i in range(k, nt)])
+        await asyncio.gather(*(fetch(worker, items) for worker, items in groups.values()))
+        return np.vstack([tiles[i] for i in range(k, nt)])
+
+    async def _factor_panel(self, k: int, panel: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = {}
+        meta = {"panel": pack_matrix(panel, "panel", arrays)}
+        meta, arrays = await self._call(self.owner(k, k), "panel", meta, arrays)
+        return unpack_matrix(meta["perm"], arrays), unpack_matrix(meta["panel"], arrays)
+
+    async def _swap_and_solve(self, k: int, nt: int, n: int, perm: np.ndarray, L_kk: np.ndarray) -> Dict[int, np.ndarray]:
+        """
+        Применяет перестановку панели к тайлам хвоста (столбцы j > k) и решает L_kk·U_kj = A_kj.
+
+        :return: Тайлы U_kj по номеру столбца.
+        """
+        k0 = k * self.block_size
+        # Меняются только строки, в которые переставлены ведущие элементы (не больше 2·block_size)
+        changed = np.flatnonzero(perm != np.arange(perm.shape[0]))
+        position = np.full(perm.shape[0], -1)
+        position[changed] = np.arange(changed.shape[0])
+        rows_by_tile: Dict[int, np.ndarray] = {}
+        for i in range(k, nt):
+            start, end = self._bounds(i, n)
+            rows = changed[(changed >= start - k0) & (changed < end - k0)]
+            if rows.shape[0]:
+                rows_by_tile[i] = rows
+
+        columns = range(k + 1, nt)
+        old: Dict[Tuple[int, int], np.ndarray] = {}
+
+        async def gather(worker: TileWorker, items: List[Tuple[int, int]]) -> None:
+            request = [{"i": i, "j": j, "local": (rows_by_tile[i] + k0 - i * self.block_size).tolist()} for i, j in items]
+            meta, arrays = await self._call(worker, "rows", {"rows": request}, {})
+            for item in meta["rows"]:
+                old[(item["i"], item["j"])] = unpack_matrix(item["values"], arrays)
+
+        groups = self._group([(i, j) for i in rows_by_tile for j in columns])
+        await asyncio.gather(*(gather(worker, items) for worker, items in groups.values()))
+
+        # Новое значение переставленной строки r - прежнее значение строки perm[r] того же столбца
+        updates: Dict[str, List[Dict[str, Any]]] = {worker.name: [] for worker in self.workers}
+        for j in columns:
+            start, end = self._bounds(j, n)
+            column = np.empty((changed.shape[0], end - start))
+            for i, rows in rows_by_tile.items():
+                column[position[rows]] = old[(i, j)]
+            column = column[position[perm[changed]]]
+            for i, rows in rows_by_tile.items():
+                updates[self.owner(i, j).name].append({
+                    "i": i, "j": j,
+                    "local": (rows + k0 - i * self.block_size).tolist(),
+                    "values": column[position[rows]],
+                })
+
+        solves: Dict[str, List[int]] = {worker.name: [] for worker in self.workers}
+        for j in columns:
+            solves[self.owner(k, j).name].append(j)
+
+        u_tiles: Dict[int, np.ndarray] = {}
+
+        async def update(worker: TileWorker) -> None:
+            arrays = {}
+            meta = {"k": k, "rows": _pack_items(updates[worker.name], "values", arrays, "values"), "trsm": solves[worker.name]}
+            if solves[worker.name]:
+                meta["l_kk"] = pack_matrix(L_kk, "l_kk", arrays)
+            meta, arrays = await self._call(worker, "update", meta, arrays)
+            for item in meta["u"]:
+                u_tiles[item["j"]] = unpack_matrix(item["tile"], arrays)
+
+        await asyncio.gather(*(
+            update(worker) for worker in self.workers if updates[worker.name] or solves[worker.name]
+        ))
+        return u_tiles
+
+    async def _update_trailing(self, k: int, nt: int, n: int, L: np.ndarray, U: np.ndarray) -> None:
+        """
+        Рассылает узлам нужные им тайлы L_ik и U_kj и ждёт GEMM-обновления хвоста.
+        """
+        rows, cols = self.grid
+        k0, k1 = self._bounds(k, n)
+
+        async def gemm(index: int, worker: TileWorker) -> None:
+            row, col = divmod(index, cols)
+            l_items = [{"i": i, "tile": L[slice(*self._bounds(i, n)), k0:k1]} for i in range(k + 1, nt) if i % rows == row]
+            u_items = [{"j": j, "tile": U[k0:k1, slice(*self._bounds(j, n))]} for j in range(k + 1, nt) if j % cols == col]
+            if not l_items or not u_items:
+                return
+            arrays = {}
+            meta = {"l": _pack_items(l_items, "tile", arrays, "l"), "u": _pack_items(u_items, "tile", arrays, "u")}
+            await self._call(worker, "gemm", meta, arrays)
+
+        await asyncio.gather(*(gemm(index, worker) for index, worker in enumerate(self.workers)))
+
+    async def _factor(self, matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        n = matrix.shape[0]
+        nt = -(-n // self.block_size)
+        await self._distribute(matrix, nt)
+
+        perm = np.arange(n)
+        L = np.zeros((n, n))
+        U = np.zeros((n, n))
+        for k in range(nt):
+            k0, k1 = self._bounds(k, n)
+            panel = await self._gather_panel(k, nt)
+            panel_perm, lu = await self._factor_panel(k, panel)
+
+            # Перестановка панели относится и к уже вычисленным столбцам L, и к итоговому perm
+            changed = np.flatnonzero(panel_perm != np.arange(panel_perm.shape[0]))
+            perm[k0 + changed] = perm[k0 + panel_perm[changed]]
+            L[k0 + changed, :k0] = L[k0 + panel_perm[changed], :k0]
+            L[k0:, k0:k1] = np.tril(lu, -1)
+            L[k0:k1, k0:k1] += np.eye(k1 - k0)
+            U[k0:k1, k0:k1] = np.triu(lu[:k1 - k0])
+            if k + 1 == nt:
+                break
+
+            u_tiles = await self._swap_and_solve(k, nt, n, panel_perm, L[k0:k1, k0:k1])
+            for j, tile in u_tiles.items():
+                U[k0:k1, slice(*self._bounds(j, n))] = tile
+            await self._update_trailing(k, nt, n, L, U)
+        return perm, L, U
+
+    async def run(self, matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Выполняет разложение квадратной плотной матрицы.
+
+        :return: Кортеж (perm, L, U).
+        :raises DistributedLUError: Если узел недоступен или операция завершилась ошибкой.
+        """
+        if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+            raise ValueError("Matrix must be square for LU decomposition.")
+        log(f"Distributed LU of a {matrix.shape[0]}x{matrix.shape[1]} matrix on {len(self.workers)} workers, "
+            f"grid {self.grid[0]}x{self.grid[1]}, block size {self.block_size}")
+        try:
+            await self._open()
+            return await self._factor(matrix)
+        finally:
+            await self._close()
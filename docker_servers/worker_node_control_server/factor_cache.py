@@ -0,0 +1,147 @@
+# factor_cache.py
+# Кэш разложений для решения систем A·X = B (POST /solve).
+# Матрица раскладывается один раз (LU, QR, LDLᵀ или Холецкий) обычным путём через очередь задач
+# и кэш результатов, множители хранятся в памяти в виде numpy-массивов по хэшу содержимого матрицы
+# (LRU с ограничением суммарного размера FACTOR_CACHE_MAX_BYTES). Каждое следующее решение стоит
+# O(n²) на правую часть: подстановка по треугольным множителям, а несколько правых частей
+# решаются одним вызовом TRSM (BLAS-3) для матрицы B из k столбцов.
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import numpy as np
+from scipy.linalg import solve_banded, solve_triangular
+
+FACTOR_CACHE_MAX_BYTES = int(os.getenv("FACTOR_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Разложения, по которым можно решать систему
+SOLVE_METHODS = ("lu", "qr", "ldl", "cholesky")
+
+
+@dataclass
+class Factorization:
+    """
+    Множители разложения матрицы размера rows×cols.
+    LU: A[perm] = L·U; QR: A = Q·R; LDLᵀ: A[perm][:, perm] = L·D·Lᵀ; Холецкий: A = L·Lᵀ.
+    """
+    method: str
+    factors: Dict[str, np.ndarray]
+    rows: int
+    cols: int
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.factors.values())
+
+    def solve(self, B: np.ndarray) -> np.ndarray:
+        """
+        Решает A·X = B для матрицы B размера rows×k (для QR прямоугольной матрицы - в смысле
+        наименьших квадратов). Вырожденный треугольный множитель даёт numpy.linalg.LinAlgError.
+        """
+        f = self.factors
+        if self.method == "lu":
+            Y = solve_triangular(f["L"], B[f["perm"]], lower=True, unit_diagonal=True, check_finite=False)
+            return solve_triangular(f["U"], Y, check_finite=False)
+        if self.method == "qr":
+            return solve_triangular(f["R"], f["Q"].T @ B, check_finite=False)
+        if self.method == "ldl":
+            perm, L, D = f["perm"], f["L"], f["D"]
+            Y = solve_triangular(L, B[perm], lower=True, unit_diagonal=True, check_finite=False)
+            # D трёхдиагональная (блоки 1×1 и 2×2) - решается ленточным методом за O(n·k)
+            bands = np.zeros((3, self.cols))
+            bands[0, 1:] = D[1, :-1]
+            bands[1] = D[0]
+            bands[2, :-1] = D[1, :-1]
+            Y = solve_banded((1, 1), bands, Y, check_finite=False)
+            Y = solve_triangular(L, Y, trans="T", lower=True, unit_diagonal=True, check_finite=False)
+            X = np.empty_like(Y)
+            X[perm] = Y
+            return X
+        L = f["L"]
+        Y = solve_triangular(L, B, lower=True, check_finite=False)
+        return solve_triangular(L, Y, trans="T", lower=True, check_finite=False)
+
+
+def build_factorization(method: str, result: Dict[str, Any]) -> Factorization:
+    """
+    Собирает множители из результата разложения (формат ответа worker node: блоки в "result",
+    перестановка в "permutation"). Блокирующая функция - вызывается в пуле потоков.
+    """
+    blocks = [np.asarray(block, dtype=np.float64) for block in result["result"]]
+    if method == "lu":
+        L, U = blocks[:2]
+        factors = {"perm": np.asarray(result["permutation"], dtype=np.intp), "L": L, "U": U}
+        rows, cols = L.shape[0], U.shape[1]
+    elif method == "qr":
+        Q, R = blocks[:2]
+        if R.shape[0] != R.shape[1]:
+            # Полное QR (mode=complete): для решения достаточно первых n столбцов Q
+            Q, R = Q[:, :R.shape[1]], R[:R.shape[1]]
+        factors = {"Q": Q, "R": R}
+        rows, cols = Q.shape[0], R.shape[1]
+    elif method == "ldl":
+        L, D = blocks[:2]
+        factors = {"perm": np.asarray(result["permutation"], dtype=np.intp), "L": L, "D": D}
+        rows = cols = L.shape[0]
+    elif method == "cholesky":
+        factors = {"L": blocks[0]}
+        rows = cols = blocks[0].shape[0]
+    else:
+        raise ValueError(f"Unsupported solve method: {method}")
+    return Factorization(method, factors, rows, cols)
+
+
+class FactorCache:
+    """
+    LRU-кэш множителей по ключу (хэш матрицы, метод). Множители доступны только для чтения.
+    """
+
+    def __init__(self, max_bytes: int = FACTOR_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Factorization]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(matrix_hash: str, method: str) -> str:
+        return f"{matrix_hash}:{method}"
+
+    def get(self, matrix_hash: str, method: str) -> Optional[Factorization]:
+        key = self.key(matrix_hash, method)
+        with self._lock:
+            factorization = self._entries.get(key)
+            if factorization is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return factorization
+
+    def put(self, matrix_hash: str, factorization: Factorization) -> None:
+        nbytes = factorization.nbytes
+        if nbytes > self.max_bytes:
+            return
+        for array in factorization.factors.values():
+            array.flags.writeable = False
+        key = self.key(matrix_hash, factorization.method)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key).nbytes
+            self._entries[key] = factorization
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.nbytes
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
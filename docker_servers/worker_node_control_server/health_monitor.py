@@ -0,0 +1,176 @@
+# health_monitor.py
+# Фоновый мониторинг доступности соседних сервисов.
+# Монитор опрашивает GET {url}/status всех сервисов параллельно с заданным интервалом
+# и хранит последнее состояние; обработчики запросов читают его без сетевых запросов.
+# Состояние старше HEALTH_MAX_STALENESS считается устаревшим и обновляется по требованию.
+# Для каждого сервиса работает автомат "предохранителя" (circuit breaker): после
+# HEALTH_FAILURE_THRESHOLD неудач подряд сервис считается недоступным на
+# HEALTH_RESET_TIMEOUT секунд и не опрашивается, затем выполняется пробный запрос.
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+import httpx
+from logger import log  # Используем кастомный логгер
+from http_client import get_http_client
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+HEALTH_MAX_STALENESS = float(os.getenv("HEALTH_MAX_STALENESS", "15"))
+HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", "3"))
+HEALTH_RESET_TIMEOUT = float(os.getenv("HEALTH_RESET_TIMEOUT", "30"))
+
+# Состояния предохранителя
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+@dataclass
+class CircuitBreaker:
+    failure_threshold: int = HEALTH_FAILURE_THRESHOLD
+    reset_timeout: float = HEALTH_RESET_TIMEOUT
+    failures: int = 0
+    opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return BREAKER_CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return BREAKER_HALF_OPEN
+        return BREAKER_OPEN
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        # Неудачная пробная попытка снова размыкает предохранитель
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+@dataclass
+class ServiceHealth:
+    url: str
+    available: bool = False
+    checked_at: Optional[float] = None
+    latency: Optional[float] = None
+    error: Optional[str] = None
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+    def is_stale(self) -> bool:
+        return self.checked_at is None or time.monotonic() - self.checked_at > HEALTH_MAX_STALENESS
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "available": self.available and self.breaker.state != BREAKER_OPEN,
+            "age": None if self.checked_at is None else round(time.monotonic() - self.checked_at, 3),
+            "latency": None if self.latency is None else round(self.latency, 4),
+            "breaker": self.breaker.state,
+            "error": self.error,
+        }
+
+
+class HealthMonitor:
+    """
+    Кэш состояния сервисов, обновляемый фоновой задачей.
+    """
+
+    def __init__(self, services: Dict[str, Optional[str]], interval: float = HEALTH_CHECK_INTERVAL):
+        self.interval = interval
+        self.services: Dict[str, ServiceHealth] = {
+            name: ServiceHealth(url=url) for name, url in services.items() if url
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    async def _probe(self, name: str) -> bool:
+        service = self.services[name]
+        if service.breaker.state == BREAKER_OPEN:
+            # Предохранитель разомкнут: сервис не опрашиваем до истечения HEALTH_RESET_TIMEOUT
+            service.available = False
+            service.checked_at = time.monotonic()
+            return False
+        start = time.monotonic()
+        try:
+            response = await get_http_client().get(f"{service.url}/status", timeout=HEALTH_CHECK_TIMEOUT)
+            available = response.status_code == 200
+            error = None if available else f"HTTP {response.status_code}"
+        except httpx.HTTPError as e:
+            available, error = False, str(e) or type(e).__name__
+        service.latency = time.monotonic() - start
+        service.checked_at = time.monotonic()
+        if available != service.available:
+            log(f"Service {name} ({service.url}) is now {'available' if available else 'unavailable'}",
+                level="info" if available else "warning")
+        service.available, service.error = available, error
+        if available:
+            service.breaker.record_success()
+        else:
+            service.breaker.record_failure()
+        return available
+
+    async def refresh(self) -> None:
+        """
+        Опрашивает все сервисы параллельно.
+        """
+        await asyncio.gather(*(self._probe(name) for name in self.services))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                log(f"Health monitor iteration failed: {e}", level="error")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        log(f"Health monitor started for {', '.join(self.services)} (interval {self.interval}s)")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def is_available(self, name: str) -> bool:
+        """
+        Возвращает кэшированную доступность сервиса; устаревшее состояние обновляется запросом.
+        """
+        service = self.services.get(name)
+        if service is None:
+            return False
+        if service.is_stale():
+            return await self._probe(name)
+        return service.available and service.breaker.state != BREAKER_OPEN
+
+    def report_failure(self, name: str, error: Exception) -> None:
+        """
+        Учитывает ошибку соединения, полученную обработчиком запроса, не дожидаясь следующего опроса.
+        Единичная ошибка не делает сервис недоступным: доступность определяют состояние
+        предохранителя (после HEALTH_FAILURE_THRESHOLD неудач подряд) и периодический опрос.
+        """
+        service = self.services.get(name)
+        if service is None:
+            return
+        service.breaker.record_failure()
+
+    def find_service(self, url: str) -> Optional[str]:
+        """
+        Возвращает имя сервиса, которому принадлежит URL запроса.
+        """
+        for name, service in self.services.items():
+            if url.startswith(service.url):
+                return name
+        return None
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: service.summary() for name, service in self.services.items()}
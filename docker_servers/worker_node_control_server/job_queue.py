@@ -0,0 +1,330 @@
+# job_queue.py
+# Очередь задач control server'а с приоритетами и сохранением состояния.
+# Клиент отправляет задачу (POST /jobs) и сразу получает её идентификатор, а результат
+# забирает позже (GET /jobs/{job_id}, в том числе long-poll с ?wait=...). Задачи хранятся
+# в локальной базе SQLite (CONTROL_JOB_DB): после перезапуска сервиса задачи, которые
+# ждали в очереди или выполнялись, снова ставятся в очередь. Одновременно выполняется
+# не больше CONTROL_JOB_CONCURRENCY задач (дальше их распределяет планировщик, scheduler.py);
+# если в очереди уже CONTROL_JOB_QUEUE_LIMIT задач, новые отклоняются с 429.
+# Синхронные задачи (клиент ждёт результат в том же запросе) в базу не записываются:
+# результат передаётся ожидающему обработчику в памяти, без сериализации в SQLite.
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from logger import log  # Используем кастомный логгер
+
+CONTROL_JOB_DB = os.getenv("CONTROL_JOB_DB", "data/jobs.db")
+CONTROL_JOB_CONCURRENCY = int(os.getenv("CONTROL_JOB_CONCURRENCY", "16"))
+CONTROL_JOB_QUEUE_LIMIT = int(os.getenv("CONTROL_JOB_QUEUE_LIMIT", "1000"))
+# Время хранения завершённых задач и их результатов (в секундах)
+CONTROL_JOB_RESULT_TTL = float(os.getenv("CONTROL_JOB_RESULT_TTL", "86400"))
+CONTROL_JOB_PURGE_INTERVAL = 600
+
+# Состояния задачи
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """
+    Очередь заполнена: задачу нужно отправить позже.
+    """
+
+
+@dataclass
+class QueuedJob:
+    id: str
+    request: Dict[str, Any]  # Параметры задачи (имя матрицы, алгоритм, параметры разложения)
+    priority: int = 0  # Задачи с большим приоритетом выполняются раньше
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[Any] = None
+    error_code: Optional[int] = None  # HTTP-код ошибки для ответа клиенту
+    result: Optional[Dict[str, Any]] = None  # Результат завершённой задачи (из базы или, для синхронной, в памяти)
+    cancel_requested: bool = False
+    durable: bool = True  # Задача и результат сохраняются в базе; False - синхронная задача, только в памяти
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "request": self.request,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+class JobStore:
+    """
+    Хранилище задач в локальной базе SQLite. Методы блокирующие: вызываются из пула потоков.
+    """
+
+    def __init__(self, path: str = CONTROL_JOB_DB):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, request TEXT NOT NULL, priority INTEGER NOT NULL, status TEXT NOT NULL, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, error TEXT, error_code INTEGER, result TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+        self._db.commit()
+
+    def save(self, job: QueuedJob, result: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, json.dumps(job.request), job.priority, job.status, job.created_at, job.started_at,
+                 job.finished_at, None if job.error is None else json.dumps(job.error), job.error_code,
+                 None if result is None else json.dumps(result)),
+            )
+            self._db.commit()
+
+    @staticmethod
+    def _from_row(row: Tuple, with_result: bool = False) -> QueuedJob:
+        job = QueuedJob(
+            id=row[0], request=json.loads(row[1]), priority=row[2], status=row[3], created_at=row[4],
+            started_at=row[5], finished_at=row[6], error=None if row[7] is None else json.loads(row[7]),
+            error_code=row[8],
+        )
+        if with_result and row[9] is not None:
+            job.result = json.loads(row[9])
+        return job
+
+    def get(self, job_id: str) -> Optional[QueuedJob]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else self._from_row(row, with_result=True)
+
+    def load_unfinished(self) -> List[QueuedJob]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._db.commit()
+        return cursor.rowcount > 0
+
+    def purge(self, older_than: float) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (older_than,)
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class JobQueue:
+    """
+    Очередь задач с приоритетами: фоновые обработчики берут задачи по убыванию приоритета
+    (при равном приоритете - в порядке поступления) и выполняют их функцией runner.
+    """
+
+    def __init__(self, runner: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]], path: str = CONTROL_JOB_DB,
+                 concurrency: int = CONTROL_JOB_CONCURRENCY, limit: int = CONTROL_JOB_QUEUE_LIMIT):
+        self.runner = runner
+        self.path = path
+        self.store: Optional[JobStore] = None
+        self.concurrency = concurrency
+        self.limit = limit
+        self.jobs: Dict[str, QueuedJob] = {}  # Незавершённые задачи; завершённые читаются из базы
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status == JOB_QUEUED)
+
+    def _push(self, job: QueuedJob) -> None:
+        self._queue.put_nowait((-job.priority, next(self._seq), job.id))
+
+    def position(self, job: QueuedJob) -> Optional[int]:
+        """
+        Число задач в очереди перед данной (None, если задача не в очереди).
+        """
+        if job.status != JOB_QUEUED:
+            return None
+        return sum(
+            1 for other in self.jobs.values()
+            if other.status == JOB_QUEUED and (other.priority, -other.created_at) > (job.priority, -job.created_at)
+        )
+
+    async def start(self) -> None:
+        self.store = await run_in_threadpool(JobStore, self.path)
+        # Задачи, прерванные остановкой сервиса, выполняются заново
+        for job in await run_in_threadpool(self.store.load_unfinished):
+            job.status, job.started_at = JOB_QUEUED, None
+            self.jobs[job.id] = job
+            self._push(job)
+        if self.jobs:
+            log(f"Recovered {len(self.jobs)} unfinished jobs from {self.path}")
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._purge()))
+        log(f"Job queue started ({self.concurrency} concurrent jobs, limit {self.limit} queued)")
+
+    async def stop(self) -> None:
+        # Выполняющиеся задачи остаются в базе в состоянии running и будут перезапущены
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+
+    async def _save(self, job: QueuedJob, result: Optional[Dict[str, Any]] = None) -> None:
+        if job.durable:
+            await run_in_threadpool(self.store.save, job, result)
+
+    async def submit(self, request: Dict[str, Any], priority: int = 0, durable: bool = True) -> QueuedJob:
+        """
+        Ставит задачу в очередь.
+
+        :param durable: Сохранять задачу и результат в базе. Синхронная задача (durable=False)
+            живёт только в памяти: её результат остаётся в объекте задачи, после перезапуска
+            сервиса она не восстанавливается (ожидавший её клиент уже отключён).
+        :raises JobQueueFull: Если в очереди уже limit задач.
+        """
+        if self.queued >= self.limit:
+            raise JobQueueFull(f"Job queue is full ({self.limit} queued jobs)")
+        job = QueuedJob(id=uuid.uuid4().hex, request=request, priority=priority, durable=durable)
+        self.jobs[job.id] = job
+        await self._save(job)
+        self._push(job)
+        log(f"Job {job.id} queued with priority {priority} ({self.queued} jobs queued)")
+        return job
+
+    async def _work(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job.status != JOB_QUEUED:
+                continue  # Задача отменена, пока ждала в очереди
+            job.status, job.started_at = JOB_RUNNING, time.time()
+            await self._save(job)
+            task = asyncio.create_task(self.runner(job.request))
+            self._running[job.id] = task
+            try:
+                result = await task
+            except asyncio.CancelledError:
+                if not job.cancel_requested:
+                    task.cancel()
+                    raise
+                await self._finish(job, JOB_CANCELLED, error="Job cancelled", error_code=410)
+            except HTTPException as e:
+                await self._finish(job, JOB_FAILED, error=e.detail, error_code=e.status_code)
+            except Exception as e:
+                log(f"Job {job.id} failed: {e}", level="error")
+                await self._finish(job, JOB_FAILED, error=str(e), error_code=500)
+            else:
+                await self._finish(job, JOB_DONE, result=result)
+            finally:
+                self._running.pop(job.id, None)
+
+    async def _finish(self, job: QueuedJob, status: str, result: Optional[Dict[str, Any]] = None,
+                      error: Optional[Any] = None, error_code: Optional[int] = None) -> None:
+        job.status, job.finished_at, job.error, job.error_code = status, time.time(), error, error_code
+        if job.durable:
+            await self._save(job, result)
+        else:
+            job.result = result
+        self.jobs.pop(job.id, None)
+        log(f"Job {job.id} {status}" + ("" if job.started_at is None else f" in {job.finished_at - job.started_at:.3f}s"))
+        for future in self._waiters.pop(job.id, []):
+            if not future.done():
+                future.set_result(None)
+
+    async def _purge(self) -> None:
+        while True:
+            try:
+                removed = await run_in_threadpool(self.store.purge, time.time() - CONTROL_JOB_RESULT_TTL)
+                if removed:
+                    log(f"Removed {removed} expired jobs")
+            except sqlite3.Error as e:
+                log(f"Failed to remove expired jobs: {e}", level="error")
+            await asyncio.sleep(CONTROL_JOB_PURGE_INTERVAL)
+
+    async def get(self, job_id: str) -> Optional[QueuedJob]:
+        """
+        Возвращает задачу; для завершённой задачи - вместе с результатом из базы.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        return await run_in_threadpool(self.store.get, job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[QueuedJob]:
+        """
+        Ждёт завершения задачи не дольше timeout секунд и возвращает её текущее состояние.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None and timeout > 0:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(job_id, []).append(future)
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                waiters = self._waiters.get(job_id)
+                if waiters is not None and future in waiters:
+                    waiters.remove(future)
+        if job is not None and not job.durable:
+            return job
+        return await self.get(job_id)
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        Отменяет задачу в очереди или выполняющуюся задачу.
+
+        :return: False, если задача не найдена или уже завершена.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel_requested = True
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        else:
+            await self._finish(job, JOB_CANCELLED, error="Job cancelled", error_code=410)
+        return True
+
+    async def delete(self, job_id: str) -> bool:
+        """
+        Удаляет завершённую задачу вместе с результатом.
+        """
+        if job_id in self.jobs:
+            return False
+        return await run_in_threadpool(self.store.delete, job_id)
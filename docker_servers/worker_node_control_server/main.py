@@ -1,16 +1,49 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 import asyncio
 import httpx
+import json
 import os
 import numpy as np
+from scipy import sparse
 from scipy.io import mmread, mmwrite
 from io import BytesIO
 from pydantic import BaseModel
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 from logger import log  # Используем кастомный логгер
+from http_client import close_http_client, get_http_client, start_http_client, stream_proxy
+from health_monitor import HealthMonitor
+from worker_load import WorkerLoadTable
+from scheduler import SCHEDULER_QUEUE_TIMEOUT, CostAwareScheduler, estimate_cost, estimate_memory
+from result_cache import ResultCache, result_key
+from matrix_cache import MatrixCache, etag_hash
+from single_flight import SingleFlight
+from factor_cache import SOLVE_METHODS, FactorCache, Factorization, build_factorization
+from distributed_lu import DISTRIBUTED_LU_BLOCK_SIZE, DISTRIBUTED_LU_MAX_WORKERS, DistributedLU, DistributedLUError, TileWorker, should_distribute
+from job_queue import JOB_CANCELLED, JOB_DONE, JOB_FAILED, JobQueue, JobQueueFull, QueuedJob
+from matrix_codec import MATRIX_FRAME_CONTENT_TYPE, decode_frame, decode_frame_meta, encode_frame, iter_frame, pack_matrix, unpack_matrix
 import random
+import time
+import uuid
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_http_client()
+    health_monitor.start()
+    worker_load.start()
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    await result_cache.close()
+    await worker_load.stop()
+    await health_monitor.stop()
+    await close_http_client()
+
+
+app = FastAPI(lifespan=lifespan)
 TEMP_DIR = "temp_mtx_files"
 
 # Load configurations from environment variables
@@ -18,39 +51,86 @@ SQLITE_URL = os.getenv("SQLITE_URL")
 MONGO_SERVER_URL = os.getenv("MONGO_SERVER_URL")
 MAIN_SERVER_URL = os.getenv("MAIN_SERVER_URL")
 
-WORKER_NODE_1_URL = os.getenv("WORKER_NODE_1_URL")
-WORKER_NODE_2_URL = os.getenv("WORKER_NODE_2_URL")
-WORKER_NODE_3_URL = os.getenv("WORKER_NODE_3_URL")
+# Формат передачи матриц на worker nodes: "json" (по умолчанию) или "binary" (application/x-matrix-frame)
+WORKER_WIRE_FORMAT = os.getenv("WORKER_WIRE_FORMAT", "json").lower()
+# Формат получения матриц с MongoDB сервера: "binary" (по умолчанию, без разбора текста) или "mtx"
+MATRIX_FETCH_FORMAT = os.getenv("MATRIX_FETCH_FORMAT", "binary").lower()
+# Время удержания одного long-poll запроса результата на worker node (в секундах)
+WORKER_RESULT_WAIT = float(os.getenv("WORKER_RESULT_WAIT", "30"))
+# Число подряд неудачных запросов результата, после которого задача считается потерянной
+WORKER_RESULT_MAX_ERRORS = int(os.getenv("WORKER_RESULT_MAX_ERRORS", "5"))
+# Максимальное время ожидания результата в одном запросе GET /jobs/{job_id}?wait=... (в секундах)
+CONTROL_JOB_MAX_WAIT = float(os.getenv("CONTROL_JOB_MAX_WAIT", "60"))
+# Через сколько секунд клиенту предлагается повторить запрос, если очередь заполнена
+JOB_RETRY_AFTER = 5
+# Результаты (бинарные кадры) от этого размера сохраняются в GridFS как артефакты и передаются потоком,
+# а в ответе и в кэше результатов остаётся только их описание со ссылкой /artifacts/{id}
+RESULT_ARTIFACT_MIN_BYTES = int(os.getenv("RESULT_ARTIFACT_MIN_BYTES", str(16 * 1024 * 1024)))
+# Таймаут передачи артефакта между сервисами (в секундах)
+ARTIFACT_TIMEOUT = float(os.getenv("ARTIFACT_TIMEOUT", "600"))
+# Максимальное число задач (матрица × алгоритм) в одном запросе POST /batch
+BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", "64"))
 
+# Worker nodes регистрируются сами (POST /workers/register). Для узлов без регистрации
+# можно задать адреса статически через запятую; такие узлы опрашиваются control server'ом.
 WORKER_NODE_URLS = {
-    "WORKER_NODE_1": WORKER_NODE_1_URL,
-    "WORKER_NODE_2": WORKER_NODE_2_URL,
-    "WORKER_NODE_3": WORKER_NODE_3_URL,
+    url: url for url in (url.strip() for url in os.getenv("WORKER_NODE_URLS", "").split(",")) if url
 }
 
+# Кэш доступности сервисов, обновляемый в фоне
+health_monitor = HealthMonitor({
+    "sqlite": SQLITE_URL,
+    "mongo": MONGO_SERVER_URL,
+})
+# Реестр и таблица загрузки worker nodes, по которой работает планировщик
+worker_load = WorkerLoadTable(WORKER_NODE_URLS)
+# Планировщик задач с учётом стоимости разложения
+scheduler = CostAwareScheduler(worker_load)
+# Кэш результатов разложений по хэшу матрицы, алгоритму и параметрам
+result_cache = ResultCache(MONGO_SERVER_URL)
+# Кэш разобранных матриц (в памяти и на диске)
+matrix_cache = MatrixCache()
+# Одинаковые разложения, которые выполняются одновременно, вычисляются один раз
+in_flight = SingleFlight()
+# Множители разложений для POST /solve по хэшу матрицы
+factor_cache = FactorCache()
+
+# accept_artifact: клиент принимает большой результат (от RESULT_ARTIFACT_MIN_BYTES) ссылкой на артефакт
+# (поле "artifact", скачивание через GET /artifacts/{id}); иначе результат возвращается целиком, блоками в "result"
 class MatrixRequest(BaseModel):
     matrix_name: str
     algorithm: str
+    options: Dict[str, Any] = {}
+    accept_artifact: bool = False
     
+# Задача для очереди: параметры разложения и приоритет (задачи с большим приоритетом выполняются раньше)
+class JobRequest(MatrixRequest):
+    priority: int = 0
+
 class InvertibleMatrixRequest(BaseModel):
     matrix_name: str
+    accept_artifact: bool = False
+
+# Пакет разложений: каждая матрица из списка раскладывается каждым алгоритмом
+class BatchRequest(BaseModel):
+    matrix_names: List[str]
+    algorithms: List[str]
+    options: Dict[str, Any] = {}
+    priority: int = 0
+    accept_artifact: bool = False
+
+# Решение системы A·x = b: одна правая часть (вектор) или несколько (список векторов)
+class SolveRequest(BaseModel):
+    matrix_name: str
+    rhs: Union[List[float], List[List[float]]]
+    method: str = "lu"
+
+# Регистрация worker node: имя, адрес и текущее состояние (как в ответе /status узла)
+class WorkerRegistration(BaseModel):
+    name: str
+    url: str
+    status: Dict[str, Any] = {}
 
-# Function to check server availability
-async def check_server_availability(url: str):
-    try:
-        async with httpx.AsyncClient() as client:
-            log(f"Checking server availability for URL: {url}")
-            response = await client.get(url)
-            if response.status_code == 200:
-                log(f"Server {url} is available.")
-                return True
-            else:
-                log(f"Server {url} responded with status code {response.status_code}.")
-                return False
-    except httpx.RequestError as e:
-        log(f"Failed to check server availability for {url}: {e}", level="error")
-        return False
-    
 def remove_file(file_path: str):
     """
     Удаляет временный файл.
@@ -61,28 +141,68 @@ def remove_file(file_path: str):
     except OSError as e:
         log(f"Error removing file {file_path}: {e}", level="error")
 
+
 @app.get("/status")
 async def get_status():
-    sqlite_status = await check_server_availability(f"{SQLITE_URL}/status")
-    mongo_server_status = await check_server_availability(f"{MONGO_SERVER_URL}/status")
-    worker1_node_status = await check_server_availability(f"{WORKER_NODE_1_URL}/status")
-    worker2_node_status = await check_server_availability(f"{WORKER_NODE_2_URL}/status")
-    worker3_node_status = await check_server_availability(f"{WORKER_NODE_3_URL}/status")
+    """
+    Возвращает кэшированное состояние сервисов (см. health_monitor.py) без синхронного опроса.
+    """
+    sqlite_status = await health_monitor.is_available("sqlite")
+    mongo_server_status = await health_monitor.is_available("mongo")
     log("Service status checked.")
     return {
         "status": "running",
         "SQLITE_URL": SQLITE_URL,
         "MONGO_SERVER_URL": MONGO_SERVER_URL,
-        "WORKER_NODE_1_URL": WORKER_NODE_1_URL,
-        "WORKER_NODE_2_URL": WORKER_NODE_2_URL,
-        "WORKER_NODE_3_URL": WORKER_NODE_3_URL,
         "sqlite_status": sqlite_status,
         "mongo_server_status": mongo_server_status,
-        "worker1_node_status" : worker1_node_status,
-        "worker2_node_status" : worker2_node_status,
-        "worker3_node_status" : worker3_node_status,
+        "services": health_monitor.snapshot(),
+        "workers": worker_load.snapshot(),
+        "result_cache": {**result_cache.snapshot(), "in_flight": len(in_flight)},
+        "matrix_cache": matrix_cache.snapshot(),
+        "factor_cache": factor_cache.snapshot(),
+        "jobs": {"queued": job_queue.queued, "running": len(job_queue.jobs) - job_queue.queued, "limit": job_queue.limit},
     }
 
+
+@app.post("/workers/register")
+async def register_worker(registration: WorkerRegistration):
+    """
+    Регистрирует worker node (вызывается узлом при запуске и при повторной регистрации).
+    """
+    worker_load.register(registration.name, registration.url.rstrip("/"), registration.status)
+    return {"message": "Worker registered", "name": registration.name}
+
+
+@app.post("/workers/{name}/heartbeat")
+async def worker_heartbeat(name: str, status: Dict[str, Any]):
+    """
+    Обновляет состояние worker node: ядра, свободная память, свободные слоты, загрузка.
+    404 означает, что узел удалён из реестра и должен зарегистрироваться заново.
+    """
+    if not worker_load.heartbeat(name, status):
+        raise HTTPException(status_code=404, detail=f"Worker {name} is not registered")
+    return {"message": "OK"}
+
+
+@app.delete("/workers/{name}")
+async def deregister_worker(name: str):
+    """
+    Удаляет worker node из реестра (вызывается узлом при остановке).
+    """
+    if not worker_load.deregister(name):
+        raise HTTPException(status_code=404, detail=f"Worker {name} is not registered")
+    return {"message": "Worker deregistered", "name": name}
+
+
+@app.get("/workers")
+async def list_workers():
+    """
+    Возвращает реестр worker nodes с последним известным состоянием.
+    """
+    return {"workers": worker_load.snapshot(), "queued_tasks": scheduler.queue_length}
+
+
 def convert_np_array_to_matrix_market(matrix: np.ndarray, file_path: str):
     """
     Конвертирует numpy.array в формат Matrix Market (.mtx) и сохраняет в файл.
@@ -101,36 +221,116 @@ def convert_np_array_to_matrix_market(matrix: np.ndarray, file_path: str):
         log(f"Failed to write matrix to file: {e}", level="error")
         raise IOError(f"Failed to write matrix to file: {e}") from e
 
+def parse_matrix_market(matrix_data: bytes):
+    """
+    Разбирает файл Matrix Market: плотная матрица - numpy.ndarray, разреженная - scipy.sparse CSR.
+    """
+    try:
+        matrix = mmread(BytesIO(matrix_data))
+    except Exception as e:
+        log(f"Failed to parse the matrix file: {e}", level="error")
+        raise HTTPException(status_code=500, detail=f"Failed to parse the matrix file: {e}") from e
+    return matrix if isinstance(matrix, np.ndarray) else sparse.csr_matrix(matrix)
+
+
+def parse_matrix_response(response: httpx.Response):
+    """
+    Разбирает ответ MongoDB сервера: бинарный кадр (массивы читаются без копирования) или файл Matrix Market.
+    """
+    if response.headers.get("content-type", "").startswith(MATRIX_FRAME_CONTENT_TYPE):
+        meta, arrays = decode_frame(response.content)
+        return unpack_matrix(meta["matrix"], arrays)
+    return parse_matrix_market(response.content)
+
+
+async def load_matrix(matrix_name: str):
+    """
+    Возвращает разобранную матрицу из кэша, проверяя её актуальность по ETag (If-None-Match),
+    или загружает её с MongoDB сервера (в бинарной форме или как файл Matrix Market, см. MATRIX_FETCH_FORMAT).
+    """
+    if MATRIX_FETCH_FORMAT == "binary":
+        mongo_endpoint = f"{MONGO_SERVER_URL}/get_matrix_binary_by_matrix_name"
+    else:
+        mongo_endpoint = f"{MONGO_SERVER_URL}/get_matrix_by_matrix_name"
+    client = get_http_client()
+    cached_hash = matrix_cache.known_hash(matrix_name)
+    headers = {"If-None-Match": f'"{cached_hash}"'} if cached_hash else {}
+    log(f"Requesting matrix {matrix_name} from MongoDB at {mongo_endpoint}")
+    response = await client.get(mongo_endpoint, params={"matrix_name": matrix_name}, headers=headers)
+    if response.status_code == 304:
+        matrix = await run_in_threadpool(matrix_cache.get, cached_hash)
+        if matrix is not None:
+            log(f"Matrix {matrix_name} is not modified, using the cached copy.")
+            return matrix
+        # Матрица вытеснена из кэша - запрашиваем файл целиком
+        response = await client.get(mongo_endpoint, params={"matrix_name": matrix_name})
+    if response.status_code != 200:
+        log(f"Matrix not found on MongoDB server: {response.status_code}")
+        raise HTTPException(status_code=response.status_code, detail="Matrix not found on MongoDB server")
+
+    log(f"Matrix {matrix_name} retrieved successfully from MongoDB.")
+    matrix_hash = etag_hash(response.headers.get("etag"))
+    if matrix_hash is None:
+        return await run_in_threadpool(parse_matrix_response, response)
+    # После перезапуска разобранная матрица может остаться в кэше на диске
+    matrix = await run_in_threadpool(matrix_cache.get, matrix_hash)
+    if matrix is None:
+        matrix = await run_in_threadpool(parse_matrix_response, response)
+        matrix = await run_in_threadpool(matrix_cache.put, matrix_name, matrix_hash, matrix)
+    else:
+        matrix_cache.names[matrix_name] = matrix_hash
+    return matrix
+
+
+async def load_matrix_version(matrix_hash: str):
+    """
+    Возвращает версию матрицы с заданным хэшем содержимого: из кэша или с MongoDB сервера по хэшу,
+    а не по имени (имя могло быть загружено заново). Версия в кэш не записывается,
+    чтобы не сбить сопоставление имени с последним хэшем.
+    """
+    matrix = await run_in_threadpool(matrix_cache.get, matrix_hash)
+    if matrix is not None:
+        return matrix
+    try:
+        response = await get_http_client().get(f"{MONGO_SERVER_URL}/get_matrix_by_hash", params={"matrix_hash": matrix_hash})
+    except httpx.RequestError as e:
+        log(f"Failed to connect to MongoDB server: {e}", level="error")
+        health_monitor.report_failure("mongo", e)
+        raise HTTPException(status_code=500, detail="Failed to connect to MongoDB server") from e
+    if response.status_code != 200:
+        log(f"Matrix with hash {matrix_hash} not found on MongoDB server: {response.status_code}", level="error")
+        raise HTTPException(status_code=response.status_code, detail="Matrix not found on MongoDB server")
+    return await run_in_threadpool(parse_matrix_response, response)
+
+
 @app.post("/get_matrix_by_name")
-async def get_matrix_by_name(matrix_name: str):
+async def get_matrix_by_name(matrix_name: str, keep_sparse: bool = False):
     """
     Получение матрицы по имени с MongoDB сервера и конвертация в numpy.array.
+    При keep_sparse=True матрица не уплотняется и возвращается в формате scipy.sparse CSR.
+    Разобранные матрицы кэшируются (см. matrix_cache.py); матрица из кэша доступна только для чтения.
     """
-    mongo_endpoint = f"{MONGO_SERVER_URL}/get_matrix_by_matrix_name"
     try:
-        async with httpx.AsyncClient() as client:
-            log(f"Requesting matrix {matrix_name} from MongoDB at {mongo_endpoint}")
-            response = await client.get(mongo_endpoint, params={"matrix_name": matrix_name})
-            if response.status_code == 200:
-                log(f"Matrix {matrix_name} retrieved successfully from MongoDB.")
-                matrix_data = response.content
-                try:
-                    matrix = mmread(BytesIO(matrix_data))
-                    if isinstance(matrix, np.ndarray):
-                        log("Matrix is already a dense numpy array.")
-                    else:
-                        log("Matrix is sparse, converting to dense numpy array.")
-                        matrix = matrix.toarray()
-                    return matrix
-                except Exception as e:
-                    log(f"Failed to parse the matrix file: {e}", level="error")
-                    raise HTTPException(status_code=500, detail=f"Failed to parse the matrix file: {e}") from e
-            else:
-                log(f"Matrix not found on MongoDB server: {response.status_code}")
-                raise HTTPException(status_code=response.status_code, detail="Matrix not found on MongoDB server")
+        matrix = await load_matrix(matrix_name)
     except httpx.RequestError as e:
         log(f"Failed to connect to MongoDB server: {e}", level="error")
+        health_monitor.report_failure("mongo", e)
         raise HTTPException(status_code=500, detail="Failed to connect to MongoDB server") from e
+    return await prepare_matrix(matrix, keep_sparse)
+
+
+async def prepare_matrix(matrix, keep_sparse: bool = False):
+    """
+    Приводит матрицу из кэша к нужному виду: плотная numpy.ndarray или (при keep_sparse=True) scipy.sparse CSR.
+    """
+    if keep_sparse:
+        log("Sparse mode requested, keeping matrix in CSR format.")
+        return matrix if sparse.issparse(matrix) else sparse.csr_matrix(matrix)
+    if isinstance(matrix, np.ndarray):
+        log("Matrix is already a dense numpy array.")
+        return matrix
+    log("Matrix is sparse, converting to dense numpy array.")
+    return await run_in_threadpool(matrix.toarray)
 
 @app.post("/print_matrix_by_matrix_name")
 async def print_matrix_by_matrix_name(request: MatrixRequest):
@@ -150,139 +350,475 @@ async def print_matrix_by_matrix_name(request: MatrixRequest):
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
     
     
+def serialize_matrix(matrix) -> Any:
+    """
+    Преобразует матрицу в JSON: плотную - во вложенные списки, разреженную - в словарь CSR.
+    """
+    if sparse.issparse(matrix):
+        matrix = matrix.tocsr()
+        return {
+            "format": "csr",
+            "shape": list(matrix.shape),
+            "data": matrix.data.tolist(),
+            "indices": matrix.indices.tolist(),
+            "indptr": matrix.indptr.tolist(),
+        }
+    return matrix.tolist()
+
+
+def matrix_to_payload(matrix) -> Dict[str, Any]:
+    """
+    Формирует тело запроса к worker node: плотная матрица передаётся как input_matrix,
+    разреженная - как sparse_matrix в формате CSR, без уплотнения.
+    """
+    if sparse.issparse(matrix):
+        return {"sparse_matrix": serialize_matrix(matrix)}
+    return {"input_matrix": serialize_matrix(matrix)}
+
+
+def encode_task_frame(matrix, algorithm: str, options: Dict[str, Any]) -> bytes:
+    """
+    Кодирует задачу для worker node в бинарный кадр application/x-matrix-frame.
+    """
+    arrays = {}
+    meta = {"algorithm": algorithm, "options": options, "matrix": pack_matrix(matrix, "matrix", arrays)}
+    return encode_frame(meta, arrays)
+
+
+def decode_result_frame(body: bytes, matrix) -> Dict[str, Any]:
+    """
+    Декодирует бинарный результат worker node и приводит его к тому же JSON-виду,
+    что и ответ /jobs/{job_id} в формате JSON.
+    """
+    meta, arrays = decode_frame(body)
+    result = {
+        "job_id": meta.get("job_id"),
+        "input_matrix": serialize_matrix(matrix),
+        "algorithm": meta["algorithm"],
+        "result": [serialize_matrix(unpack_matrix(block, arrays)) for block in meta["result"]],
+        "time_taken": meta["time_taken"],
+    }
+    for key in ("permutation", "column_permutation"):
+        if key in meta:
+            result[key] = unpack_matrix(meta[key], arrays).tolist()
+    if "condition_number" in meta:
+        result["condition_number"] = meta["condition_number"]
+    return result
+
+
+def artifact_result(artifact_id: str, size: int, meta: Dict[str, Any], matrix) -> Dict[str, Any]:
+    """
+    Описание результата, сохранённого как артефакт: вместо блоков - ссылка на бинарный кадр
+    (его метаданные описывают блоки "result" и перестановки, см. matrix_codec.py).
+    Исходная матрица в ответ не включается - её можно получить по имени.
+    """
+    result = {
+        "job_id": meta.get("job_id"),
+        "algorithm": meta["algorithm"],
+        "time_taken": meta.get("time_taken"),
+        "shape": list(matrix.shape),
+        "artifact": {
+            "id": artifact_id,
+            "url": f"/artifacts/{artifact_id}",
+            "size": size,
+            "content_type": MATRIX_FRAME_CONTENT_TYPE,
+        },
+    }
+    for key in ("condition_number", "workers", "grid"):
+        if key in meta:
+            result[key] = meta[key]
+    return result
+
+
+def is_artifact_response(response: httpx.Response) -> bool:
+    """
+    Проверяет по заголовкам, что ответ worker node - готовый результат в виде кадра не меньше RESULT_ARTIFACT_MIN_BYTES.
+    """
+    return (
+        response.status_code == 200
+        and response.headers.get("content-type", "").startswith(MATRIX_FRAME_CONTENT_TYPE)
+        and int(response.headers.get("content-length") or 0) >= RESULT_ARTIFACT_MIN_BYTES
+    )
+
+
+async def upload_artifact(artifact_id: str, chunks: AsyncIterator[bytes]) -> int:
+    """
+    Передаёт артефакт на MongoDB сервер потоком и возвращает его размер.
+    """
+    response = await get_http_client().put(
+        f"{MONGO_SERVER_URL}/artifacts/{artifact_id}", content=chunks,
+        headers={"Content-Type": MATRIX_FRAME_CONTENT_TYPE},
+        timeout=httpx.Timeout(10.0, read=ARTIFACT_TIMEOUT, write=ARTIFACT_TIMEOUT),
+    )
+    if response.status_code != 200:
+        raise IOError(f"MongoDB server rejected artifact {artifact_id}: HTTP {response.status_code}")
+    return response.json()["size"]
+
+
+async def store_result_artifact(artifact_id: str, response: httpx.Response, matrix) -> Dict[str, Any]:
+    """
+    Передаёт бинарный результат worker node в GridFS по частям, не собирая его в памяти;
+    метаданные разбираются из заголовка кадра на лету.
+    """
+    head = bytearray()
+    meta: Dict[str, Any] = {}
+
+    async def forward() -> AsyncIterator[bytes]:
+        async for chunk in response.aiter_raw():
+            if not meta:
+                head.extend(chunk)
+                parsed = decode_frame_meta(head)
+                if parsed is not None:
+                    meta.update(parsed)
+                    head.clear()
+            yield chunk
+
+    size = await upload_artifact(artifact_id, forward())
+    if not meta:
+        raise ValueError("Worker result is not a valid matrix frame.")
+    return artifact_result(artifact_id, size, meta, matrix)
+
+
+async def artifact_exists(artifact_id: str) -> bool:
+    """
+    Проверяет, что артефакт ещё хранится в GridFS (артефакты удаляются по истечении ARTIFACT_TTL).
+    """
+    try:
+        response = await get_http_client().get(f"{MONGO_SERVER_URL}/artifacts/{artifact_id}", headers={"Range": "bytes=0-0"})
+    except httpx.RequestError as e:
+        log(f"Failed to check artifact {artifact_id}: {e}", level="warning")
+        return False
+    return response.status_code in (200, 206)
+
+
+async def load_artifact(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Загружает артефакт результата и возвращает блоки и перестановки в виде массивов numpy
+    (в том же виде, что и поля "result" и "permutation" обычного результата).
+    """
+    artifact_id = result["artifact"]["id"]
+    response = await get_http_client().get(f"{MONGO_SERVER_URL}/artifacts/{artifact_id}",
+                                           timeout=httpx.Timeout(10.0, read=ARTIFACT_TIMEOUT))
+    if response.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"Failed to load result artifact {artifact_id}: HTTP {response.status_code}")
+
+    def decode() -> Dict[str, Any]:
+        meta, arrays = decode_frame(response.content)
+        loaded = {**result, "result": [unpack_matrix(block, arrays) for block in meta["result"]]}
+        for key in ("permutation", "column_permutation"):
+            if key in meta:
+                loaded[key] = unpack_matrix(meta[key], arrays)
+        return loaded
+
+    return await run_in_threadpool(decode)
+
+
+async def client_result(job: QueuedJob) -> Dict[str, Any]:
+    """
+    Результат завершённой задачи для ответа клиенту. Если результат сохранён как артефакт,
+    а клиент не запросил артефакт (accept_artifact), результат разворачивается в обычный вид:
+    блоки в "result", перестановки и исходная матрица "input_matrix".
+    """
+    result = job.result
+    if "artifact" not in result or job.request.get("accept_artifact"):
+        return result
+    keep_sparse = bool((job.request.get("options") or {}).get("sparse", False))
+    loaded = await load_artifact(result)
+    # Исходная матрица берётся по хэшу той версии, которая была разложена
+    if result.get("matrix_hash"):
+        matrix = await prepare_matrix(await load_matrix_version(result["matrix_hash"]), keep_sparse)
+    else:
+        matrix = await get_matrix_by_name(job.request["matrix_name"], keep_sparse=keep_sparse)
+
+    def expand() -> Dict[str, Any]:
+        expanded = {key: value for key, value in loaded.items() if key not in ("artifact", "shape", "matrix_hash")}
+        expanded["input_matrix"] = serialize_matrix(matrix)
+        expanded["result"] = [serialize_matrix(block) for block in loaded["result"]]
+        for key in ("permutation", "column_permutation"):
+            if key in loaded:
+                expanded[key] = loaded[key].tolist()
+        return expanded
+
+    return await run_in_threadpool(expand)
+
+
 # Функция отправки задачи на worker node
-async def send_task_to_worker_node(matrix: np.array, algorithm: str, retries: int = 5, retry_delay: float = 1.0):
+async def send_task_to_worker_node(matrix: np.array, algorithm: str, options: Optional[Dict[str, Any]] = None, retries: int = 5,
+                                   queue_timeout: Optional[float] = SCHEDULER_QUEUE_TIMEOUT, artifact_id: Optional[str] = None):
     """
-    Отправляет задачу на наименее загруженный worker node. Если все узлы заняты, повторяет попытку.
+    Отправляет задачу на узел, выбранный планировщиком по оценке стоимости задачи (см. scheduler.py).
+    Если свободных узлов нет, задача ждёт в очереди планировщика до SCHEDULER_QUEUE_TIMEOUT секунд.
 
     Args:
-        matrix (np.array): Матрица для обработки.
+        matrix (np.array | scipy.sparse.spmatrix): Матрица для обработки.
         algorithm (str): Алгоритм обработки (например, "lu", "qr", "ldl").
-        retries (int): Количество попыток.
-        retry_delay (float): Задержка между попытками (в секундах).
+        options (dict): Параметры разложения (например, {"mode": "complete"} для QR).
+        retries (int): Количество попыток, если выбранный узел отклонил задачу (нет свободных слотов).
+        queue_timeout (float): Максимальное время ожидания свободного узла (None - без ограничения).
+        artifact_id (str): Идентификатор артефакта: результат от RESULT_ARTIFACT_MIN_BYTES байт
+            передаётся с узла в GridFS потоком, а вместо него возвращается описание артефакта.
 
     Returns:
         json: Ответ от выбранного worker node.
 
     Raises:
-        HTTPException: Если ни один узел не доступен после всех попыток.
+        HTTPException: Если ни один узел не освободился за время ожидания или после всех попыток.
     """
-    async with httpx.AsyncClient() as client:
-        for attempt in range(retries):
-            log(f"Attempt {attempt + 1} of {retries} to send task.", level="info")
+    client = get_http_client()
+    cost = estimate_cost(algorithm, matrix)
+    memory = estimate_memory(matrix)
+    log(f"Estimated task cost: {cost:.3g} FLOP, {memory} bytes", level="info")
+    for attempt in range(retries):
+        log(f"Attempt {attempt + 1} of {retries} to send task.", level="info")
 
-            worker_statuses = []
-            for worker_name, worker_url in WORKER_NODE_URLS.items():
-                if not worker_url:
-                    log(f"URL for {worker_name} is not defined. Skipping.", level="warning")
-                    continue
+        try:
+            selected_worker = await scheduler.acquire(cost, memory, timeout=queue_timeout)
+        except asyncio.TimeoutError:
+            log("No worker became available within the queue timeout.", level="error")
+            raise HTTPException(status_code=503, detail="No available worker nodes.")
+        worker_name, worker_url = selected_worker.name, selected_worker.url
+        time_taken = None  # Время вычисления на узле - для уточнения производительности узла
 
-                try:
-                    log(f"Checking status of {worker_name} at {worker_url}.", level="info")
-                    response = await client.get(f"{worker_url}/status")
-                    if response.status_code == 200:
-                        try:
-                            status = response.json()
-                            log(f"Status of {worker_name}: {status}", level="info")
-                            worker_statuses.append((worker_name, worker_url, status))
-                        except ValueError:
-                            log(f"Invalid JSON response from {worker_name}. Skipping.", level="error")
-                    else:
-                        log(f"Failed to get status of {worker_name}. HTTP {response.status_code}: {response.text}", level="error")
-                except Exception as e:
-                    log(f"Error checking status of {worker_name}: {e}", level="error")
-
-            # Фильтрация свободных узлов
-            free_workers = [
-                (name, url, status)
-                for name, url, status in worker_statuses
-                if not status.get("running", True) in status
-            ]
-            log(f"free workers list = {free_workers}")
-
-            if free_workers:
-                # Сортировка свободных узлов по нагрузке
-                free_workers.sort(key=lambda x: (x[2]["load"].get("cpu", float('inf')), x[2]["load"].get("memory", float('inf'))))
-                # TODO : пофиксить статус реквест на worker node
-                selected_worker = free_workers[0] #random.choice(free_workers)
-                worker_name, worker_url, _ = selected_worker
-
-                # Отправка задачи на выбранный узел
-                try:
+        try:
+            # Отправка задачи на выбранный узел
+            try:
+                log(f"Sending task to {worker_name} at {worker_url}.", level="info")
+
+                # Отправка задачи
+                if WORKER_WIRE_FORMAT == "binary":
+                    frame = encode_task_frame(matrix, algorithm, options or {})
+                    log(f"Sending {algorithm} task for {matrix.shape[0]}x{matrix.shape[1]} matrix ({len(frame)} bytes).")
+                    response = await client.post(
+                        f"{worker_url}/process_task",
+                        content=frame,
+                        headers={"Content-Type": MATRIX_FRAME_CONTENT_TYPE},
+                    )
+                else:
                     data_to_send = {
-                        "input_matrix": matrix.tolist(),
+                        **matrix_to_payload(matrix),
                         "algorithm": algorithm,
+                        "options": options or {},
                     }
-                    log(f"sending data: \n\n{data_to_send} \n\n")
-                    log(f"Sending task to {worker_name} at {worker_url}.", level="info")
-
-                    # Отправка задачи
+                    log(f"Sending {algorithm} task for {matrix.shape[0]}x{matrix.shape[1]} matrix as JSON.")
                     response = await client.post(f"{worker_url}/process_task", json=data_to_send)
 
-                    if response.status_code == 200:
-                        log(f"Task successfully sent to {worker_name}. Response: {response.json()}", level="info")
-                    else:
-                        log(f"Failed to process task on {worker_name}. HTTP {response.status_code}: {response.text}", level="error")
-                        raise HTTPException(status_code=503, detail=f"Task failed on {worker_name}. HTTP {response.status_code}")
-                except Exception as e:
-                    log(f"Error sending task to {worker_name}: {e}", level="error")
-                    raise HTTPException(status_code=503, detail=f"Error sending task to {worker_name}: {e}")
-
-                # Ожидание результата от сервера
-                log(f"Waiting for result from {worker_name}...")
-                result = None
-                max_retries = 30  # Максимальное количество попыток
-                retry_interval = 0.5  # Интервал между попытками (в секундах)
-
-                for attempt in range(max_retries):
+                if response.status_code == 200:
+                    job_id = response.json()["job_id"]
+                    log(f"Task successfully sent to {worker_name}. Response: {response.json()}", level="info")
+                elif response.status_code == 503:
+                    # Все слоты узла заняты (таблица загрузки устарела) - выбираем узел заново
+                    log(f"{worker_name} has no free job slots, rescheduling.", level="warning")
+                    worker_load.mark_full(worker_name)
+                    continue
+                else:
+                    log(f"Failed to process task on {worker_name}. HTTP {response.status_code}: {response.text}", level="error")
+                    raise HTTPException(status_code=503, detail=f"Task failed on {worker_name}. HTTP {response.status_code}")
+            except Exception as e:
+                log(f"Error sending task to {worker_name}: {e}", level="error")
+                raise HTTPException(status_code=503, detail=f"Error sending task to {worker_name}: {e}")
+
+            # Ожидание результата от сервера: long-poll GET /jobs/{job_id}?wait=...
+            # Узел отвечает сразу после завершения задачи, поэтому опрос не добавляет задержки,
+            # а длительность задачи ограничена только таймаутом задачи на самом узле.
+            log(f"Waiting for result from {worker_name}...")
+            result = None
+            errors = 0  # Число подряд неудачных запросов
+            retry_interval = 0.5  # Пауза после неудачного запроса (в секундах)
+            # Артефакт сохраняется из бинарного кадра, поэтому кадр запрашивается при любом формате передачи
+            binary_result = WORKER_WIRE_FORMAT == "binary" or artifact_id is not None
+            result_headers = {"Accept": MATRIX_FRAME_CONTENT_TYPE} if binary_result else {}
+
+            try:
+                while errors < WORKER_RESULT_MAX_ERRORS:
                     try:
-                        # Опрос статуса выполнения задачи
-                        status_response = await client.get(f"{worker_url}/get_result")
-                        if status_response.status_code == 200:
-                            result = status_response.json()
-                            log(f"Received result from {worker_name}: {result}", level="info")
+                        status_request = client.build_request(
+                            "GET",
+                            f"{worker_url}/jobs/{job_id}",
+                            params={"wait": WORKER_RESULT_WAIT},
+                            headers=result_headers,
+                            timeout=httpx.Timeout(10.0, read=WORKER_RESULT_WAIT + 30.0),
+                        )
+                        status_response = await client.send(status_request, stream=True)
+                        try:
+                            if artifact_id is not None and is_artifact_response(status_response):
+                                try:
+                                    result = await store_result_artifact(artifact_id, status_response, matrix)
+                                except (httpx.HTTPError, IOError, ValueError) as e:
+                                    # Повторный запрос результата разбирается обычным образом
+                                    log(f"Failed to store result of job {job_id} as artifact: {e}", level="warning")
+                                    artifact_id = None
+                                    raise
+                            else:
+                                await status_response.aread()
+                        finally:
+                            await status_response.aclose()
+
+                        if status_response.status_code == 202:
+                            errors = 0
+                            log(f"Job {job_id} is still running on {worker_name}.")
+                            continue
+                        elif status_response.status_code == 200:
+                            if result is not None:
+                                log(f"Result of job {job_id} from {worker_name} saved as artifact {artifact_id}.", level="info")
+                            elif status_response.headers.get("content-type", "").startswith(MATRIX_FRAME_CONTENT_TYPE):
+                                result = decode_result_frame(status_response.content, matrix)
+                            else:
+                                result = status_response.json()
+                            if result.get("artifact") is None:
+                                log(f"Received {algorithm} result of job {job_id} from {worker_name} "
+                                    f"({len(status_response.content)} bytes).", level="info")
+                            time_taken = result.get("time_taken")
                             break
+                        elif status_response.status_code in (410, 422):
+                            # 422 - ошибка или таймаут разложения, 410 - задача отменена
+                            log(f"Task failed on {worker_name}: {status_response.text}", level="error")
+                            raise HTTPException(status_code=status_response.status_code, detail=status_response.json().get("detail"))
                         else:
                             log(f"Status check failed on {worker_name}. HTTP {status_response.status_code}: {status_response.text}")
+                    except HTTPException:
+                        raise
                     except Exception as e:
                         log(f"Error checking status on {worker_name}: {e}", level="error")
-                    
+
+                    errors += 1
                     await asyncio.sleep(retry_interval)
+            except asyncio.CancelledError:
+                # Задача отменена на control server'е - отменяем её и на узле
+                log(f"Cancelling job {job_id} on {worker_name}.", level="warning")
+                try:
+                    await client.delete(f"{worker_url}/jobs/{job_id}")
+                except httpx.RequestError as e:
+                    log(f"Failed to cancel job {job_id} on {worker_name}: {e}", level="warning")
+                raise
 
-                if result is None:
-                    log(f"Failed to get result from {worker_name} after {max_retries} retries.", level="error")
-                    raise HTTPException(status_code=504, detail=f"Failed to get result from {worker_name}.")
+            if result is None:
+                log(f"Failed to get result from {worker_name} after {errors} failed requests.", level="error")
+                # Отменяем задачу, чтобы она не занимала процесс узла
+                try:
+                    await client.delete(f"{worker_url}/jobs/{job_id}")
+                except httpx.RequestError as e:
+                    log(f"Failed to cancel job {job_id} on {worker_name}: {e}", level="warning")
+                raise HTTPException(status_code=504, detail=f"Failed to get result from {worker_name}.")
 
-                return result
+            # Результат получен - освобождаем место в таблице задач узла
+            try:
+                await client.delete(f"{worker_url}/jobs/{job_id}")
+            except httpx.RequestError as e:
+                log(f"Failed to remove job {job_id} from {worker_name}: {e}", level="warning")
 
-            # Если все узлы заняты, ждем перед повторной попыткой
-            log(f"All workers are busy. Retrying in {retry_delay} seconds...", level="warning")
-            await asyncio.sleep(retry_delay)
+            return result
+        finally:
+            scheduler.release(worker_name, cost, time_taken)
 
-        # Если после всех попыток узел не найден
-        log("No available worker nodes after maximum retries.", level="error")
-        raise HTTPException(status_code=503, detail="No available worker nodes.")
+    # Если после всех попыток узел не найден
+    log("No available worker nodes after maximum retries.", level="error")
+    raise HTTPException(status_code=503, detail="No available worker nodes.")
 
 
-# MAIN METHOD
-@app.post("/calculate_decomposition_of_matrix_by_matrix_name")
-async def calculate_decomposition_of_matrix_by_matrix_name(request: MatrixRequest):
+async def get_matrix_hash(matrix_name: str) -> Optional[str]:
     """
-    Вычисляет и возвращает все разложения матрицы по имени матрицы.
+    Возвращает хэш содержимого матрицы с MongoDB сервера (None, если его не удалось получить).
     """
-    matrix_name = request.matrix_name
-    algorithm = request.algorithm.lower()
+    try:
+        response = await get_http_client().get(f"{MONGO_SERVER_URL}/get_matrix_hash", params={"matrix_name": matrix_name})
+    except httpx.RequestError as e:
+        log(f"Failed to get hash of matrix {matrix_name}: {e}", level="warning")
+        health_monitor.report_failure("mongo", e)
+        return None
+    if response.status_code != 200:
+        return None
+    return response.json().get("hash")
 
+
+async def run_distributed_lu(matrix: np.ndarray, options: Dict[str, Any], artifact_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Раскладывает плотную матрицу распределённым LU на всех свободных узлах (см. distributed_lu.py).
+    Возвращает None, если свободных узлов меньше двух или разложение не удалось:
+    тогда матрица раскладывается обычным образом на одном узле.
+    Результат от RESULT_ARTIFACT_MIN_BYTES байт сохраняется как артефакт artifact_id.
+    """
+    cost = estimate_cost("lu", matrix)
+    workers = scheduler.acquire_group(cost, estimate_memory(matrix), DISTRIBUTED_LU_MAX_WORKERS)
+    share = cost / max(len(workers), 1)
     try:
-        log(f"Fetching matrix by name: {matrix_name}", level="info")
-        matrix = await get_matrix_by_name(matrix_name)
-    except HTTPException as e:
-        log(f"Error fetching matrix: {e.detail}", level="error")
-        raise HTTPException(status_code=e.status_code, detail=f"Failed to fetch the matrix: {e.detail}")
+        if len(workers) < 2:
+            log("Not enough free workers for distributed LU, using a single worker.", level="info")
+            return None
+        lu = DistributedLU(
+            [TileWorker(worker.name, worker.url) for worker in workers],
+            block_size=options.get("block_size", DISTRIBUTED_LU_BLOCK_SIZE),
+        )
+        start = time.time()
+        try:
+            perm, L, U = await lu.run(matrix)
+        except DistributedLUError as e:
+            log(f"Distributed LU failed, using a single worker: {e}", level="warning")
+            return None
+        time_taken = time.time() - start
+    finally:
+        for worker in workers:
+            scheduler.release(worker.name, share)
+    log(f"Distributed LU finished in {time_taken:.3f}s on {len(workers)} workers.", level="info")
+
+    if artifact_id is not None and L.nbytes + U.nbytes >= RESULT_ARTIFACT_MIN_BYTES:
+        arrays = {}
+        meta = {
+            "job_id": None,
+            "algorithm": "lu",
+            "result": [pack_matrix(L, "result.0", arrays), pack_matrix(U, "result.1", arrays)],
+            "permutation": pack_matrix(perm, "permutation", arrays),
+            "time_taken": round(time_taken, 3),
+            "workers": [worker.name for worker in workers],
+            "grid": list(lu.grid),
+        }
+        _, chunks = iter_frame(meta, arrays)
+        try:
+            size = await upload_artifact(artifact_id, iterate_in_threadpool(chunks))
+            return artifact_result(artifact_id, size, meta, matrix)
+        except (httpx.HTTPError, IOError) as e:
+            log(f"Failed to store distributed LU result as artifact: {e}", level="warning")
+
+    def build_result() -> Dict[str, Any]:
+        return {
+            "job_id": None,
+            "input_matrix": serialize_matrix(matrix),
+            "algorithm": "lu",
+            "result": [L.tolist(), U.tolist()],
+            "permutation": perm.tolist(),
+            "time_taken": round(time_taken, 3),
+            "workers": [worker.name for worker in workers],
+            "grid": list(lu.grid),
+        }
+
+    return await run_in_threadpool(build_result)
+
+
+async def compute_decomposition(matrix_name: str, algorithm: str, options: Dict[str, Any], matrix=None,
+                                artifact_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Получает матрицу по имени (если она не передана уже загруженной) и вычисляет её разложение на worker node.
+    Свободного узла задача ждёт без ограничения по времени - она уже находится в очереди.
+    Большой результат сохраняется как артефакт artifact_id (см. RESULT_ARTIFACT_MIN_BYTES).
+    """
+    keep_sparse = bool(options.get("sparse", False))
+    if matrix is not None:
+        matrix = await prepare_matrix(matrix, keep_sparse)
+    else:
+        try:
+            log(f"Fetching matrix by name: {matrix_name}", level="info")
+            matrix = await get_matrix_by_name(matrix_name, keep_sparse=keep_sparse)
+        except HTTPException as e:
+            log(f"Error fetching matrix: {e.detail}", level="error")
+            raise HTTPException(status_code=e.status_code, detail=f"Failed to fetch the matrix: {e.detail}")
+
+    if should_distribute(matrix, algorithm, options):
+        result = await run_distributed_lu(matrix, options, artifact_id)
+        if result is not None:
+            return result
 
     try:
         log("Sending matrix to worker nodes.", level="info")
-        result = await send_task_to_worker_node(matrix, algorithm)
+        result = await send_task_to_worker_node(matrix, algorithm, options, queue_timeout=None, artifact_id=artifact_id)
     except HTTPException as e:
         log(f"Failed to process task: {e.detail}", level="error")
         raise HTTPException(status_code=e.status_code, detail=f"Task processing failed: {e.detail}")
@@ -291,46 +827,338 @@ async def calculate_decomposition_of_matrix_by_matrix_name(request: MatrixReques
     return result
 
 
-def calculate_invertible_matrix(matrix: np.array) -> np.array:
+async def run_decomposition(request: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Вычисляет обратную матрицу для заданной матрицы.
+    Выполняет задачу разложения из очереди.
+    Если разложение этой матрицы с теми же параметрами уже вычислялось, результат берётся из кэша;
+    если оно вычисляется прямо сейчас (например, по запросу другого пользователя), задача ждёт его результата.
+    Задачи пакета (POST /batch) содержат хэш уже загруженной матрицы: пока матрица с этим хэшем
+    есть в кэше, она не запрашивается с MongoDB сервера повторно.
+    Большой результат хранится как артефакт под ключом кэша: одинаковые разложения используют один артефакт.
     """
-    log("Calculating inverse matrix.")
-    if matrix.shape[0] != matrix.shape[1]:
-        log("Matrix must be square to calculate its inverse.", level="error")
-        raise ValueError("Matrix must be square to calculate its inverse.")
+    matrix_name = request["matrix_name"]
+    algorithm = request["algorithm"].lower()
+    options = request.get("options") or {}
 
-    determinant = np.linalg.det(matrix)
-    if determinant == 0:
-        log("Matrix is not invertible (determinant is zero).", level="error")
-        raise ValueError("Matrix is not invertible (determinant is zero).")
-    
-    
-    inverse_matrix = np.linalg.inv(matrix)
-    log("Inverse matrix calculated successfully.")
-    return inverse_matrix
+    matrix_hash = request.get("matrix_hash")
+    matrix = await run_in_threadpool(matrix_cache.get, matrix_hash) if matrix_hash else None
+    if matrix is None:
+        matrix_hash = await get_matrix_hash(matrix_name)
+    if matrix_hash is None:
+        result = await compute_decomposition(matrix_name, algorithm, options, artifact_id=uuid.uuid4().hex)
+        if "artifact" in result:
+            # Хэш загруженной версии известен из ETag ответа MongoDB сервера
+            result["matrix_hash"] = matrix_cache.known_hash(matrix_name)
+        return result
+
+    cache_key = result_key(matrix_hash, algorithm, options)
+    cached = await result_cache.get(cache_key)
+    # Артефакт кэшированного результата мог быть удалён по истечении срока хранения - тогда результат вычисляется заново
+    if cached is not None and ("artifact" not in cached or await artifact_exists(cached["artifact"]["id"])):
+        log(f"Returning cached {algorithm} decomposition of {matrix_name} (hash {matrix_hash}).", level="info")
+        return cached
+
+    async def compute_and_cache() -> Dict[str, Any]:
+        result = await compute_decomposition(matrix_name, algorithm, options, matrix, artifact_id=cache_key)
+        if "artifact" in result:
+            # По хэшу результат из артефакта сопоставляется именно с разложенной версией матрицы
+            result["matrix_hash"] = matrix_hash
+        await result_cache.put(cache_key, result, {"matrix_hash": matrix_hash, "algorithm": algorithm})
+        return result
+
+    return await in_flight.run(cache_key, compute_and_cache)
+
+
+# Очередь задач разложения с сохранением состояния в локальной базе
+job_queue = JobQueue(run_decomposition)
+
+
+async def submit_job(request: MatrixRequest, priority: int = 0, matrix_hash: Optional[str] = None,
+                     durable: bool = True) -> QueuedJob:
+    """
+    Ставит задачу в очередь; если очередь заполнена, клиент получает 429 и повторяет запрос позже.
+    matrix_hash - хэш уже загруженной версии матрицы (см. run_decomposition),
+    durable - сохранять ли задачу в базе (см. JobQueue.submit).
+    """
+    payload = request.model_dump()
+    if matrix_hash is not None:
+        payload["matrix_hash"] = matrix_hash
+    try:
+        return await job_queue.submit(payload, priority=priority, durable=durable)
+    except JobQueueFull as e:
+        log(str(e), level="warning")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(JOB_RETRY_AFTER)})
+
+
+async def job_response(job: QueuedJob) -> Response:
+    """
+    Ответ по состоянию задачи: 200 с результатом, 202 если задача ещё в очереди или выполняется,
+    код ошибки задачи (410 для отменённой), если она не выполнена.
+    """
+    if job.status == JOB_DONE:
+        return JSONResponse(content=await client_result(job))
+    if job.status in (JOB_FAILED, JOB_CANCELLED):
+        raise HTTPException(status_code=job.error_code or 500, detail=job.error)
+    return JSONResponse(status_code=202, content={**job.summary(), "position": job_queue.position(job)})
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    """
+    Ставит задачу разложения в очередь и сразу возвращает её идентификатор.
+    Результат возвращает GET /jobs/{job_id}.
+    """
+    job = await submit_job(request, priority=request.priority)
+    return JSONResponse(
+        status_code=202,
+        content={**job.summary(), "position": job_queue.position(job)},
+        headers={"Location": f"/jobs/{job.id}"},
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Возвращает состояние или результат задачи.
+    С параметром wait запрос ждёт завершения задачи до wait секунд (не более CONTROL_JOB_MAX_WAIT).
+    """
+    job = await job_queue.wait(job_id, min(max(wait, 0.0), CONTROL_JOB_MAX_WAIT))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return await job_response(job)
+
+
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """
+    Отменяет задачу в очереди или выполняющуюся задачу (202); завершённую задачу удаляет вместе с результатом.
+    """
+    if await job_queue.cancel(job_id):
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": JOB_CANCELLED})
+    if await job_queue.delete(job_id):
+        return {"message": "Job deleted", "job_id": job_id}
+    raise HTTPException(status_code=404, detail="Job not found")
+
+
+async def run_job(request: MatrixRequest, priority: int = 0, matrix_hash: Optional[str] = None) -> QueuedJob:
+    """
+    Ставит задачу в очередь и ждёт её завершения (выполнения, ошибки или отмены).
+    Результат сразу отдаётся клиенту, поэтому задача не записывается в базу:
+    он берётся из объекта задачи в памяти.
+    Если ожидание прервано (клиент отключился), задача отменяется.
+    """
+    job = await submit_job(request, priority=priority, matrix_hash=matrix_hash, durable=False)
+    try:
+        while job.status not in (JOB_DONE, JOB_FAILED, JOB_CANCELLED):
+            await job_queue.wait(job.id, CONTROL_JOB_MAX_WAIT)
+    except asyncio.CancelledError:
+        await job_queue.cancel(job.id)
+        raise
+    return job
+
+
+@app.get("/artifacts/{artifact_id}")
+async def get_artifact(artifact_id: str, request: Request):
+    """
+    Отдаёт артефакт результата (бинарный кадр) из GridFS потоком, не загружая его в память.
+    Поддерживаются запросы диапазона (Range) и условные запросы (If-None-Match, If-Range).
+    """
+    return await stream_proxy(f"{MONGO_SERVER_URL}/artifacts/{artifact_id}", request.headers,
+                              timeout=httpx.Timeout(10.0, read=ARTIFACT_TIMEOUT))
+
+
+# MAIN METHOD
+@app.post("/calculate_decomposition_of_matrix_by_matrix_name")
+async def calculate_decomposition_of_matrix_by_matrix_name(request: MatrixRequest):
+    """
+    Вычисляет и возвращает все разложения матрицы по имени матрицы.
+    Задача проходит через ту же очередь, что и POST /jobs, поэтому при всплеске запросов
+    она ждёт свободного узла, а не завершается ошибкой.
+    """
+    job = await run_job(request)
+    return await job_response(job)
 
 
 @app.post("/calculate_invertible_matrix_by_matrix_name")
 async def calculate_invertible_matrix_by_matrix_name(request: InvertibleMatrixRequest):
     """
     Вычисляет и возвращает обратную матрицу по имени матрицы.
+    Обращение выполняется на worker node через LU-разложение (алгоритм "inverse") и проходит
+    через ту же очередь и кэш результатов, что и разложения; вместе с обратной матрицей
+    возвращается оценка числа обусловленности.
     """
-    matrix_name = request.matrix_name
+    job = await run_job(MatrixRequest(matrix_name=request.matrix_name, algorithm="inverse",
+                                      accept_artifact=request.accept_artifact))
+    if job.status == JOB_FAILED and job.error_code == 422:
+        # Вырожденная матрица - ошибка во входных данных, как и раньше
+        log(f"Matrix inversion error: {job.error}", level="error")
+        raise HTTPException(status_code=400, detail=job.error)
+    if job.status != JOB_DONE:
+        return await job_response(job)
+
+    log("Matrix inversion completed.")
+    result = await client_result(job)
+    if "artifact" in result:
+        # Большая обратная матрица отдаётся отдельно: GET /artifacts/{id}
+        return {"artifact": result["artifact"], "condition_number": result.get("condition_number")}
+    return {
+        "original_matrix": result["input_matrix"],
+        "inverse_matrix": result["result"][0],
+        "condition_number": result.get("condition_number"),
+    }
+
+
+async def get_factorization(matrix_name: str, method: str) -> Tuple[Factorization, bool]:
+    """
+    Возвращает множители разложения матрицы из кэша или раскладывает матрицу через очередь задач
+    (и кэш результатов). Одновременные запросы одной матрицы собирают множители один раз.
+
+    :return: Кортеж (множители, взяты ли они из кэша).
+    """
+    matrix_hash = await get_matrix_hash(matrix_name)
+    if matrix_hash is not None:
+        factorization = factor_cache.get(matrix_hash, method)
+        if factorization is not None:
+            return factorization, True
+
+    async def factorize() -> Factorization:
+        job = await run_job(MatrixRequest(matrix_name=matrix_name, algorithm=method))
+        if job.status == JOB_FAILED and job.error_code == 422:
+            # Матрица не подходит для разложения (например, несимметричная для LDL)
+            raise HTTPException(status_code=400, detail=job.error)
+        if job.status != JOB_DONE:
+            raise HTTPException(status_code=job.error_code or 500, detail=job.error)
+        result = await load_artifact(job.result) if "artifact" in job.result else job.result
+        factorization = await run_in_threadpool(build_factorization, method, result)
+        if matrix_hash is not None:
+            factor_cache.put(matrix_hash, factorization)
+        return factorization
+
+    if matrix_hash is None:
+        return await factorize(), False
+    return await in_flight.run(f"factors:{factor_cache.key(matrix_hash, method)}", factorize), False
+
+
+@app.post("/solve")
+async def solve(request: SolveRequest):
+    """
+    Решает систему A·x = b для матрицы по имени без обращения матрицы.
+    Матрица раскладывается один раз (request.method: lu, qr, ldl или cholesky), множители кэшируются
+    по хэшу матрицы; каждое решение - треугольная подстановка за O(n²) на правую часть.
+    Несколько правых частей (rhs - список векторов) решаются одним вызовом как матрица B.
+    """
+    method = request.method.lower()
+    if method not in SOLVE_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unsupported solve method: {request.method}. Use one of {', '.join(SOLVE_METHODS)}.")
     try:
-        matrix = await get_matrix_by_name(matrix_name)
-    except HTTPException as e:
-        log(f"Error fetching matrix: {e.detail}", level="error")
-        raise HTTPException(status_code=e.status_code, detail=f"Failed to fetch the matrix: {e.detail}")
+        rhs = np.asarray(request.rhs, dtype=np.float64)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Right-hand sides must have equal length.")
+    single = rhs.ndim == 1
+    # Правые части приходят строками, а решаются столбцами матрицы B
+    B = rhs.reshape(-1, 1) if single else rhs.T
+
+    start = time.time()
+    factorization, cached = await get_factorization(request.matrix_name, method)
+    if B.shape[0] != factorization.rows:
+        raise HTTPException(status_code=400, detail=f"Right-hand side length {B.shape[0]} does not match matrix with {factorization.rows} rows.")
+    if method != "qr" and factorization.rows != factorization.cols:
+        raise HTTPException(status_code=400, detail="Matrix must be square for solving.")
+    if factorization.cols > factorization.rows:
+        # Недоопределённая система: треугольный множитель R неквадратный, решение неединственно
+        raise HTTPException(status_code=422, detail="QR solve requires a matrix with at least as many rows as columns.")
+
+    def solve_system() -> List[Any]:
+        X = factorization.solve(np.ascontiguousarray(B))
+        return X[:, 0].tolist() if single else X.T.tolist()
 
     try:
-        inverse_matrix = calculate_invertible_matrix(matrix)
-    except ValueError as e:
-        log(f"Matrix inversion error: {e}", level="error")
-        raise HTTPException(status_code=400, detail=str(e))
+        solution = await run_in_threadpool(solve_system)
+    except np.linalg.LinAlgError as e:
+        log(f"Solve error for matrix {request.matrix_name}: {e}", level="error")
+        raise HTTPException(status_code=400, detail=f"Matrix is singular: {e}")
 
-    log("Matrix inversion completed.")
+    log(f"Solved {B.shape[1]} right-hand side(s) for {request.matrix_name} with {method}.", level="info")
     return {
-        "original_matrix": matrix.tolist(),
-        "inverse_matrix": inverse_matrix.tolist()
+        "matrix_name": request.matrix_name,
+        "method": method,
+        "solution": solution,
+        "factorization_cached": cached,
+        "time_taken": round(time.time() - start, 3),
     }
+
+
+async def fetch_batch_matrix(matrix_name: str) -> Optional[str]:
+    """
+    Загружает матрицу пакета в кэш и возвращает хэш загруженной версии.
+    """
+    try:
+        await load_matrix(matrix_name)
+    except httpx.RequestError as e:
+        health_monitor.report_failure("mongo", e)
+        raise HTTPException(status_code=500, detail="Failed to connect to MongoDB server") from e
+    return matrix_cache.known_hash(matrix_name)
+
+
+def batch_line(item: Dict[str, Any]) -> bytes:
+    return json.dumps(item).encode() + b"\n"
+
+
+@app.post("/batch")
+async def calculate_batch(request: BatchRequest):
+    """
+    Вычисляет разложения нескольких матриц несколькими алгоритмами за один запрос.
+    Каждая матрица загружается с MongoDB сервера один раз, все задачи ставятся в очередь сразу
+    и выполняются на worker nodes параллельно. Результаты возвращаются потоком в формате NDJSON
+    (одна JSON-строка на задачу) по мере готовности, а не в порядке запроса:
+    {"index", "matrix_name", "algorithm", "status", "result"} или, при ошибке, {..., "status_code", "error"}.
+    """
+    matrix_names = list(dict.fromkeys(request.matrix_names))
+    algorithms = list(dict.fromkeys(algorithm.lower() for algorithm in request.algorithms))
+    pairs = [(matrix_name, algorithm) for matrix_name in matrix_names for algorithm in algorithms]
+    if not pairs:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one matrix and one algorithm.")
+    if len(pairs) > BATCH_MAX_JOBS:
+        raise HTTPException(status_code=400, detail=f"Batch is too large: {len(pairs)} jobs, at most {BATCH_MAX_JOBS} allowed.")
+    if job_queue.queued + len(pairs) > job_queue.limit:
+        raise HTTPException(status_code=429, detail=f"Job queue cannot accept {len(pairs)} more jobs.",
+                            headers={"Retry-After": str(JOB_RETRY_AFTER)})
+    log(f"Batch of {len(pairs)} jobs: {len(matrix_names)} matrices x {algorithms}.", level="info")
+
+    # Каждая матрица загружается один раз; задачи получают хэш загруженной версии
+    fetched = await asyncio.gather(*(fetch_batch_matrix(name) for name in matrix_names), return_exceptions=True)
+    hashes = dict(zip(matrix_names, fetched))
+
+    async def run_item(index: int, matrix_name: str, algorithm: str) -> Dict[str, Any]:
+        item = {"index": index, "matrix_name": matrix_name, "algorithm": algorithm}
+        matrix_hash = hashes[matrix_name]
+        if isinstance(matrix_hash, HTTPException):
+            return {**item, "status": JOB_FAILED, "status_code": matrix_hash.status_code,
+                    "error": f"Failed to fetch the matrix: {matrix_hash.detail}"}
+        if isinstance(matrix_hash, BaseException):
+            # Матрицу не удалось загрузить заранее - задача загрузит её сама
+            matrix_hash = None
+        try:
+            job = await run_job(MatrixRequest(matrix_name=matrix_name, algorithm=algorithm, options=request.options,
+                                              accept_artifact=request.accept_artifact),
+                                priority=request.priority, matrix_hash=matrix_hash)
+            if job.status == JOB_DONE:
+                result = await client_result(job)
+        except HTTPException as e:
+            return {**item, "status": JOB_FAILED, "status_code": e.status_code, "error": e.detail}
+        if job.status != JOB_DONE:
+            return {**item, "job_id": job.id, "status": job.status, "status_code": job.error_code or 500, "error": job.error}
+        return {**item, "job_id": job.id, "status": JOB_DONE, "result": result}
+
+    async def stream_results():
+        tasks = [asyncio.create_task(run_item(index, *pair)) for index, pair in enumerate(pairs)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                item = await task
+                yield await run_in_threadpool(batch_line, item)
+        finally:
+            # Клиент отключился - незавершённые задачи пакета больше никому не нужны
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
@@ -0,0 +1,165 @@
+# matrix_cache.py
+# Кэш разобранных матриц для get_matrix_by_name.
+# Матрица хранится в памяти (LRU с ограничением суммарного размера MATRIX_CACHE_MAX_BYTES)
+# и на диске в бинарном виде (.npy для плотной, .npz для разреженной матрицы, не больше
+# MATRIX_CACHE_DISK_BYTES). Ключ - хэш содержимого матрицы, который MongoDB сервер
+# возвращает в ETag; по имени матрицы запоминается её последний хэш. При повторном запросе
+# матрица проверяется запросом с If-None-Match: ответ 304 означает, что можно взять
+# разобранную матрицу из кэша без передачи файла и без разбора Matrix Market.
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import numpy as np
+from scipy import sparse
+from logger import log  # Используем кастомный логгер
+
+MATRIX_CACHE_MAX_BYTES = int(os.getenv("MATRIX_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+MATRIX_CACHE_DISK_BYTES = int(os.getenv("MATRIX_CACHE_DISK_BYTES", str(2 * 1024 * 1024 * 1024)))
+MATRIX_CACHE_DIR = os.getenv("MATRIX_CACHE_DIR", "matrix_cache")
+
+
+def matrix_nbytes(matrix) -> int:
+    if sparse.issparse(matrix):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return matrix.nbytes
+
+
+def etag_hash(etag: Optional[str]) -> Optional[str]:
+    """
+    Извлекает хэш из заголовка ETag ("<hash>" или W/"<hash>").
+    """
+    if not etag:
+        return None
+    return etag.removeprefix("W/").strip('"') or None
+
+
+class MatrixCache:
+    """
+    Кэш разобранных матриц: плотные храним как numpy.ndarray, разреженные - в формате CSR.
+    Матрицы из кэша доступны только для чтения. Методы блокирующие (чтение и запись файлов).
+    """
+
+    def __init__(self, directory: str = MATRIX_CACHE_DIR, max_bytes: int = MATRIX_CACHE_MAX_BYTES,
+                 disk_bytes: int = MATRIX_CACHE_DISK_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.disk_bytes = disk_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.names: Dict[str, str] = {}  # имя матрицы -> хэш последней полученной версии
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def known_hash(self, name: str) -> Optional[str]:
+        return self.names.get(name)
+
+    def _path(self, matrix_hash: str, is_sparse: bool) -> str:
+        return os.path.join(self.directory, f"{matrix_hash}.{'npz' if is_sparse else 'npy'}")
+
+    def _remember(self, matrix_hash: str, matrix) -> None:
+        nbytes = matrix_nbytes(matrix)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if matrix_hash in self._entries:
+                self.size -= matrix_nbytes(self._entries.pop(matrix_hash))
+            self._entries[matrix_hash] = matrix
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= matrix_nbytes(evicted)
+
+    def _load_from_disk(self, matrix_hash: str):
+        for is_sparse in (False, True):
+            path = self._path(matrix_hash, is_sparse)
+            if not os.path.exists(path):
+                continue
+            try:
+                matrix = sparse.load_npz(path).tocsr() if is_sparse else np.load(path)
+            except (OSError, ValueError) as e:
+                log(f"Failed to read cached matrix {path}: {e}", level="warning")
+                return None
+            os.utime(path)  # Время доступа используется для вытеснения с диска
+            return matrix
+        return None
+
+    def get(self, matrix_hash: str):
+        """
+        Возвращает разобранную матрицу по хэшу содержимого (None, если её нет в кэше).
+        """
+        with self._lock:
+            matrix = self._entries.get(matrix_hash)
+            if matrix is not None:
+                self._entries.move_to_end(matrix_hash)
+        if matrix is None:
+            matrix = self._load_from_disk(matrix_hash)
+            if matrix is not None:
+                matrix = self._freeze(matrix)
+                self._remember(matrix_hash, matrix)
+        if matrix is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return matrix
+
+    @staticmethod
+    def _freeze(matrix):
+        if sparse.issparse(matrix):
+            for array in (matrix.data, matrix.indices, matrix.indptr):
+                array.setflags(write=False)
+        else:
+            matrix.setflags(write=False)
+        return matrix
+
+    def put(self, name: str, matrix_hash: str, matrix):
+        """
+        Сохраняет разобранную матрицу в памяти и на диске и возвращает матрицу из кэша.
+        Матрица не копируется: переданный массив (для разреженной матрицы - её массивы CSR)
+        становится доступен только для чтения, поэтому вызывающий код не должен изменять его после вызова.
+        """
+        matrix = sparse.csr_matrix(matrix) if sparse.issparse(matrix) else np.ascontiguousarray(matrix)
+        self.names[name] = matrix_hash
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(matrix_hash, sparse.issparse(matrix))
+        if not os.path.exists(path):
+            temp_path = f"{path}.tmp"
+            try:
+                with open(temp_path, "wb") as file:
+                    if sparse.issparse(matrix):
+                        sparse.save_npz(file, matrix, compressed=False)
+                    else:
+                        np.save(file, matrix)
+                os.replace(temp_path, path)
+                self._evict_disk()
+            except OSError as e:
+                log(f"Failed to write cached matrix {path}: {e}", level="warning")
+        matrix = self._freeze(matrix)
+        self._remember(matrix_hash, matrix)
+        return matrix
+
+    def _evict_disk(self) -> None:
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith((".npy", ".npz")):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError as e:
+                log(f"Failed to remove cached matrix {path}: {e}", level="warning")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "size": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
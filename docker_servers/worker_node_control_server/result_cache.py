@@ -0,0 +1,124 @@
+# result_cache.py
+# Кэш результатов разложений с адресацией по содержимому.
+# Ключ - SHA-256 от хэша содержимого матрицы (его вычисляет MongoDB сервер при загрузке),
+# алгоритма и параметров разложения, поэтому повторный запрос той же матрицы любым
+# пользователем и под любым именем обслуживается без обращения к worker nodes.
+# Результаты хранятся в памяти (LRU с ограничением суммарного размера RESULT_CACHE_MAX_BYTES)
+# и сохраняются в GridFS через MongoDB сервер, чтобы переживать перезапуск control server'а.
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from logger import log  # Используем кастомный логгер
+from http_client import get_http_client
+
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Результаты больше этого размера хранятся только в GridFS
+RESULT_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESULT_CACHE_MAX_ENTRY_BYTES", str(RESULT_CACHE_MAX_BYTES // 4)))
+
+
+def result_key(matrix_hash: str, algorithm: str, options: Dict[str, Any]) -> str:
+    """
+    Ключ кэша: хэш матрицы, алгоритм и параметры разложения в каноническом виде.
+    """
+    canonical = json.dumps({"matrix": matrix_hash, "algorithm": algorithm.lower(), "options": options},
+                           sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Двухуровневый кэш результатов: LRU в памяти и GridFS на MongoDB сервере.
+    Значения хранятся в сериализованном виде (JSON), размер учитывается в байтах.
+    """
+
+    def __init__(self, mongo_url: Optional[str], max_bytes: int = RESULT_CACHE_MAX_BYTES,
+                 max_entry_bytes: int = RESULT_CACHE_MAX_ENTRY_BYTES):
+        self.mongo_url = mongo_url
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._pending: Set[asyncio.Task] = set()  # Незавершённые записи в GridFS
+
+    def _remember(self, key: str, content: bytes) -> None:
+        if len(content) > self.max_entry_bytes:
+            return
+        if key in self._entries:
+            self.size -= len(self._entries.pop(key))
+        self._entries[key] = content
+        self.size += len(content)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    async def _load(self, key: str) -> Optional[bytes]:
+        if not self.mongo_url:
+            return None
+        try:
+            response = await get_http_client().get(f"{self.mongo_url}/results/{key}")
+        except httpx.RequestError as e:
+            log(f"Failed to read cached result {key} from MongoDB: {e}", level="warning")
+            return None
+        if response.status_code != 200:
+            return None
+        return response.content
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает результат из памяти или из GridFS (None, если результата нет).
+        """
+        content = self._entries.get(key)
+        if content is not None:
+            self._entries.move_to_end(key)
+        else:
+            content = await self._load(key)
+            if content is not None:
+                self._remember(key, content)
+        if content is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return await run_in_threadpool(json.loads, content)
+
+    async def _store(self, key: str, content: bytes, metadata: Dict[str, str]) -> None:
+        try:
+            response = await get_http_client().put(f"{self.mongo_url}/results/{key}", content=content, params=metadata,
+                                                   headers={"Content-Type": "application/json"})
+            if response.status_code != 200:
+                log(f"Failed to save result {key} to MongoDB: HTTP {response.status_code}", level="warning")
+        except httpx.RequestError as e:
+            log(f"Failed to save result {key} to MongoDB: {e}", level="warning")
+
+    async def put(self, key: str, result: Dict[str, Any], metadata: Dict[str, str]) -> None:
+        """
+        Сохраняет результат в памяти и в фоне записывает его в GridFS.
+        """
+        content = await run_in_threadpool(lambda: json.dumps(result).encode())
+        self._remember(key, content)
+        if self.mongo_url:
+            task = asyncio.create_task(self._store(key, content, metadata))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def close(self) -> None:
+        """
+        Дожидается незавершённых записей в GridFS.
+        """
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "size": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,207 @@
+# scheduler.py
+# Планировщик задач с учётом стоимости.
+# Стоимость задачи оценивается в операциях с плавающей точкой по размеру матрицы,
+# числу ненулевых элементов и алгоритму (LU ~ 2/3·n³, QR ~ 4/3·n³, LDLᵀ и Холецкий ~ 1/3·n³,
+# обращение через LU ~ 2·n³).
+# Для каждого узла учитываются уже назначенная ему работа, число ядер и измеренная
+# производительность (FLOP/s на задачу); задача отправляется на узел с наименьшим
+# оценочным временем завершения. Если свободных слотов нет, задачи ждут в очереди,
+# из которой первыми выходят самые дешёвые (с поправкой на время ожидания),
+# поэтому небольшие матрицы не стоят за большими.
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+from scipy import sparse
+from logger import log  # Используем кастомный логгер
+from worker_load import WorkerLoadTable, WorkerState
+
+# Коэффициенты при n³ для квадратной матрицы
+ALGORITHM_FLOP_FACTORS = {"lu": 2 / 3, "qr": 4 / 3, "ldl": 1 / 3, "cholesky": 1 / 3, "inverse": 2}
+# Производительность одного слота узла по умолчанию, пока она не измерена (FLOP/s)
+SCHEDULER_DEFAULT_FLOP_RATE = float(os.getenv("SCHEDULER_DEFAULT_FLOP_RATE", "1e9"))
+# Во сколько раз заполнение множителей превышает число ненулевых элементов разреженной матрицы
+SPARSE_FILL_FACTOR = float(os.getenv("SPARSE_FILL_FACTOR", "4"))
+# Плотность, начиная с которой разреженная матрица оценивается как плотная
+SPARSE_DENSE_THRESHOLD = 0.1
+# Вес времени ожидания при выборе задачи из очереди (секунды ожидания за секунду оценки)
+SCHEDULER_AGING = float(os.getenv("SCHEDULER_AGING", "1"))
+# Максимальное время ожидания свободного узла (в секундах)
+SCHEDULER_QUEUE_TIMEOUT = float(os.getenv("SCHEDULER_QUEUE_TIMEOUT", "300"))
+# Сглаживание измеренной производительности (доля нового замера)
+RATE_SMOOTHING = 0.3
+
+
+def estimate_cost(algorithm: str, matrix) -> float:
+    """
+    Оценивает число операций с плавающей точкой для разложения матрицы.
+
+    Для плотной m×n матрицы QR стоит 2·m·n² - 2/3·n³ (4/3·n³ для квадратной).
+    Для разреженной матрицы n³ заменяется на n·c², где c - ожидаемое число ненулевых
+    элементов в столбце множителей (среднее по матрице, умноженное на SPARSE_FILL_FACTOR).
+    """
+    m, n = matrix.shape
+    factor = ALGORITHM_FLOP_FACTORS.get(algorithm, 1.0)
+    if algorithm == "qr":
+        dense_cost = 2.0 * m * n * n - 2.0 / 3.0 * n ** 3
+    else:
+        dense_cost = factor * float(n) ** 3
+    if not sparse.issparse(matrix) or matrix.nnz > SPARSE_DENSE_THRESHOLD * m * n:
+        return max(dense_cost, 1.0)
+    column_count = min(float(m), SPARSE_FILL_FACTOR * matrix.nnz / max(n, 1))
+    return max(min(dense_cost, factor * n * column_count ** 2), 1.0)
+
+
+def estimate_memory(matrix) -> int:
+    """
+    Оценивает память узла под задачу: исходная матрица и два множителя (в байтах).
+    """
+    if sparse.issparse(matrix):
+        # Значение (8 байт) и индекс (4 байта) на элемент, множители с учётом заполнения
+        return int(12 * matrix.nnz * (1 + 2 * SPARSE_FILL_FACTOR))
+    return int(3 * 8 * np.prod(matrix.shape))
+
+
+@dataclass
+class _Waiter:
+    enqueued_at: float
+    cost: float
+    memory: int
+    future: asyncio.Future
+
+
+class CostAwareScheduler:
+    """
+    Распределяет задачи по узлам из таблицы загрузки, минимизируя оценочное время завершения.
+    """
+
+    def __init__(self, table: WorkerLoadTable):
+        self.table = table
+        self.rates: Dict[str, float] = {}  # Измеренная производительность слота узла (FLOP/s)
+        self.assigned: Dict[str, float] = {}  # Работа, назначенная узлу и ещё не завершённая (FLOP)
+        self._waiters: List[_Waiter] = []
+        table.on_update(self.dispatch)
+
+    @property
+    def queue_length(self) -> int:
+        return len(self._waiters)
+
+    def rate(self, worker: WorkerState) -> float:
+        return self.rates.get(worker.name) or worker.status.get("flop_rate") or SCHEDULER_DEFAULT_FLOP_RATE
+
+    def estimate_seconds(self, worker: WorkerState, cost: float) -> float:
+        """
+        Оценочное время завершения новой задачи на узле: не меньше времени самой задачи
+        на одном слоте и не меньше времени выполнения всей назначенной узлу работы на всех ядрах.
+        """
+        rate = self.rate(worker)
+        cores = worker.status.get("cores") or 1
+        queued = self.assigned.get(worker.name, 0.0)
+        return max(cost / rate, (queued + cost) / (rate * cores))
+
+    def choose(self, cost: float, memory: int) -> Optional[WorkerState]:
+        """
+        Выбирает свободный узел с наименьшим оценочным временем завершения задачи.
+        """
+        workers = self.table.fresh_workers()
+        # Узлы, на которых задача помещается в свободную память; если таких нет, ограничение не применяется
+        fitting = [worker for worker in workers if worker.status.get("memory_available", memory) >= memory]
+        best, best_time = None, float("inf")
+        for worker in fitting or workers:
+            if worker.free_slots <= 0:
+                continue
+            finish = self.estimate_seconds(worker, cost)
+            if finish < best_time:
+                best, best_time = worker, finish
+        return best
+
+    def _assign(self, worker: WorkerState, cost: float) -> None:
+        self.table.reserve(worker.name)
+        self.assigned[worker.name] = self.assigned.get(worker.name, 0.0) + cost
+
+    def dispatch(self) -> None:
+        """
+        Раздаёт свободные слоты ожидающим задачам: сначала дешёвым, с поправкой на время ожидания.
+        """
+        if not self._waiters:
+            return
+        now = time.monotonic()
+        ordered = sorted(
+            (waiter for waiter in self._waiters if not waiter.future.done()),
+            key=lambda w: w.cost / SCHEDULER_DEFAULT_FLOP_RATE - SCHEDULER_AGING * (now - w.enqueued_at),
+        )
+        for waiter in ordered:
+            worker = self.choose(waiter.cost, waiter.memory)
+            if worker is None:
+                # Слот не нашёлся для самой приоритетной задачи - остальные ждут вместе с ней
+                break
+            self._assign(worker, waiter.cost)
+            waiter.future.set_result(worker)
+        self._waiters = [waiter for waiter in self._waiters if not waiter.future.done()]
+
+    def acquire_group(self, cost: float, memory: int, max_workers: int) -> List[WorkerState]:
+        """
+        Занимает по слоту на свободных узлах (не больше max_workers) для распределённой задачи, без ожидания.
+        Стоимость и память делятся между узлами поровну; первыми выбираются самые производительные узлы.
+        Если в очереди есть ожидающие задачи, узлы не занимаются (возвращается пустой список).
+        """
+        if self._waiters:
+            return []
+        candidates = sorted(
+            (worker for worker in self.table.fresh_workers() if worker.free_slots > 0),
+            key=self.rate, reverse=True,
+        )[:max(1, max_workers)]
+        # Узлы, на которых помещается своя часть матрицы
+        workers = [
+            worker for worker in candidates
+            if worker.status.get("memory_available", memory) >= memory / len(candidates)
+        ]
+        for worker in workers:
+            self._assign(worker, cost / len(workers))
+        return workers
+
+    async def acquire(self, cost: float, memory: int, timeout: float = SCHEDULER_QUEUE_TIMEOUT) -> WorkerState:
+        """
+        Возвращает узел для задачи, при необходимости ожидая освобождения слота.
+
+        :raises asyncio.TimeoutError: Если узел не освободился за timeout секунд.
+        """
+        # Нет ожидающих задач - выбор выполняется сразу, без очереди
+        if not self._waiters:
+            await self.table.candidates()
+            worker = self.choose(cost, memory)
+            if worker is not None:
+                self._assign(worker, cost)
+                return worker
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(time.monotonic(), cost, memory, loop.create_future())
+        self._waiters.append(waiter)
+        log(f"No free worker for a task of {cost:.3g} FLOP, {len(self._waiters)} tasks waiting", level="warning")
+        self.dispatch()
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if waiter.future.done():
+                # Узел назначен одновременно с таймаутом или отменой запроса - возвращаем слот
+                self.release(waiter.future.result().name, cost)
+            else:
+                waiter.future.cancel()
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, worker_name: str, cost: float, time_taken: Optional[float] = None) -> None:
+        """
+        Учитывает завершение задачи на узле: освобождает слот и обновляет измеренную производительность.
+
+        :param time_taken: Время вычисления на узле (в секундах); None, если задача не выполнялась.
+        """
+        self.assigned[worker_name] = max(0.0, self.assigned.get(worker_name, 0.0) - cost)
+        if time_taken:
+            measured = cost / time_taken
+            previous = self.rates.get(worker_name)
+            self.rates[worker_name] = measured if previous is None else (1 - RATE_SMOOTHING) * previous + RATE_SMOOTHING * measured
+        self.table.release(worker_name)
+        self.dispatch()
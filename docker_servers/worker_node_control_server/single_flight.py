@@ -0,0 +1,40 @@
+# single_flight.py
+# Объединение одинаковых одновременных запросов (single flight).
+# Если задача с тем же ключом уже выполняется, новый запрос не запускает её повторно,
+# а ждёт результата уже выполняющейся задачи; все ожидающие получают один и тот же результат
+# (или одну и ту же ошибку). Задача отменяется, только если её перестали ждать все запросы.
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from logger import log  # Используем кастомный логгер
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[str, Tuple[asyncio.Task, list]] = {}  # ключ -> (задача, [число ожидающих])
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполняет func() или присоединяется к уже выполняющемуся вызову с тем же ключом.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.create_task(func())
+            flight = (task, [0])
+            self._flights[key] = flight
+            task.add_done_callback(lambda _: self._flights.pop(key, None) if self._flights.get(key) is flight else None)
+        else:
+            log(f"Joining in-flight task {key} ({flight[1][0]} callers waiting)")
+        task, waiters = flight
+        waiters[0] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and waiters[0] == 1:
+                # Последний ожидающий отменён - результат больше никому не нужен
+                task.cancel()
+            raise
+        finally:
+            waiters[0] -= 1
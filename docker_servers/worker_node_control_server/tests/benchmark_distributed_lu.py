@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from distributed_lu import DistributedLU, TileWorker
+from http_client import close_http_client, start_http_client
+
+# Адреса запущенных worker nodes через запятую, например http://localhost:8004,http://localhost:8005
+WORKER_URLS = [url.strip() for url in os.getenv("WORKER_URLS", "").split(",") if url.strip()]
+BLOCK_SIZE = int(os.getenv("BLOCK_SIZE", "512"))
+
+
+async def factor(matrix, count):
+    workers = [TileWorker(f"worker-{i}", url) for i, url in enumerate(WORKER_URLS[:count])]
+    lu = DistributedLU(workers, block_size=BLOCK_SIZE)
+    start = time.perf_counter()
+    perm, L, U = await lu.run(matrix)
+    elapsed = time.perf_counter() - start
+    residual = np.abs(matrix[perm] - L @ U).max() / np.abs(matrix).max()
+    return lu.grid, elapsed, residual
+
+
+async def main():
+    if not WORKER_URLS:
+        print("Set WORKER_URLS to the addresses of running worker nodes.")
+        return
+    sizes = [int(arg) for arg in sys.argv[1:]] or [2048, 4096]
+    await start_http_client()
+    try:
+        print(f"{'n':>6} {'workers':>8} {'grid':>6} {'time, s':>9} {'speedup':>8} {'residual':>10}")
+        for n in sizes:
+            matrix = np.random.rand(n, n)
+            baseline = None
+            for count in range(1, len(WORKER_URLS) + 1):
+                grid, elapsed, residual = await factor(matrix, count)
+                baseline = baseline or elapsed
+                print(f"{n:>6} {count:>8} {grid[0]:>3}x{grid[1]:<2} {elapsed:>9.3f} {baseline / elapsed:>7.2f}x {residual:>10.2e}")
+    finally:
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
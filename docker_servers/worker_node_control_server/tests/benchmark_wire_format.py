@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from matrix_codec import decode_frame, encode_frame, pack_matrix, unpack_matrix
+
+# Если задан WORKER_URL (например, http://localhost:8004), дополнительно измеряется
+# полный цикл /process_task + /jobs/{job_id} на запущенном worker node.
+WORKER_URL = os.getenv("WORKER_URL")
+
+
+def json_round_trip(matrix):
+    body = json.dumps({"input_matrix": matrix.tolist(), "algorithm": "lu", "options": {}}).encode("utf-8")
+    decoded = np.array(json.loads(body)["input_matrix"])
+    return body, decoded
+
+
+def frame_round_trip(matrix):
+    arrays = {}
+    meta = {"algorithm": "lu", "options": {}, "matrix": pack_matrix(matrix, "matrix", arrays)}
+    body = encode_frame(meta, arrays)
+    meta, arrays = decode_frame(body)
+    return body, unpack_matrix(meta["matrix"], arrays)
+
+
+def measure(func, matrix, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        body, decoded = func(matrix)
+        best = min(best, time.perf_counter() - start)
+    assert np.array_equal(decoded, matrix)
+    return len(body), best
+
+
+def http_round_trip(matrix, binary):
+    import httpx
+
+    frame_type = "application/x-matrix-frame"
+    with httpx.Client(timeout=None) as client:
+        start = time.perf_counter()
+        if binary:
+            arrays = {}
+            meta = {"algorithm": "lu", "options": {}, "matrix": pack_matrix(matrix, "matrix", arrays)}
+            response = client.post(f"{WORKER_URL}/process_task", content=encode_frame(meta, arrays), headers={"Content-Type": frame_type})
+        else:
+            response = client.post(f"{WORKER_URL}/process_task", json={"input_matrix": matrix.tolist(), "algorithm": "lu"})
+        job_id = response.json()["job_id"]
+        while True:
+            response = client.get(f"{WORKER_URL}/jobs/{job_id}", params={"wait": 30}, headers={"Accept": frame_type} if binary else {})
+            if response.status_code == 200:
+                break
+        client.delete(f"{WORKER_URL}/jobs/{job_id}")
+        if binary:
+            decode_frame(response.content)
+        else:
+            response.json()
+        return time.perf_counter() - start, len(response.content)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 500, 1000, 2000]
+    print(f"{'n':>6} {'json, MB':>9} {'frame, MB':>10} {'json, s':>9} {'frame, s':>9} {'speedup':>8}")
+    for n in sizes:
+        matrix = np.random.rand(n, n)
+        json_size, json_time = measure(json_round_trip, matrix)
+        frame_size, frame_time = measure(frame_round_trip, matrix)
+        print(f"{n:>6} {json_size / 1e6:>9.2f} {frame_size / 1e6:>10.2f} {json_time:>9.4f} {frame_time:>9.4f} {json_time / frame_time:>7.0f}x")
+
+    if WORKER_URL:
+        print(f"\nHTTP round trip via {WORKER_URL} (LU, including factorization)")
+        print(f"{'n':>6} {'json, s':>9} {'frame, s':>9} {'json result, MB':>16} {'frame result, MB':>17}")
+        for n in sizes:
+            matrix = np.random.rand(n, n)
+            json_time, json_size = http_round_trip(matrix, binary=False)
+            frame_time, frame_size = http_round_trip(matrix, binary=True)
+            print(f"{n:>6} {json_time:>9.3f} {frame_time:>9.3f} {json_size / 1e6:>16.2f} {frame_size / 1e6:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
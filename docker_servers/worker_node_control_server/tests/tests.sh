@@ -76,3 +76,75 @@ echo "4. Testing invertible matrix by matrix name..."
 curl -X POST "$WORKER_CONTROL_SERVER/calculate_invertible_matrix_by_matrix_name" \
 -H "Content-Type: application/json" \
 -d '{"matrix_name": "'"$MATRIX_FILE_NAME"'"}'
+
+# 6. Test sparse decomposition by name
+echo ""
+echo ""
+echo "6. Testing sparse LU decomposition by matrix name..."
+curl -X POST "$WORKER_CONTROL_SERVER/calculate_decomposition_of_matrix_by_matrix_name" \
+-H "Content-Type: application/json" \
+-d '{"matrix_name": "'"$MATRIX_FILE_NAME"'", "algorithm": "lu", "options": {"sparse": true, "ordering": "COLAMD"}}'
+
+# 7. Test worker registry
+echo ""
+echo ""
+echo "7. Listing registered worker nodes..."
+curl -X GET "$WORKER_CONTROL_SERVER/workers"
+
+# 8. Test asynchronous job API
+echo ""
+echo ""
+echo "8. Submitting an LU decomposition job to the queue..."
+JOB_ID=$(curl -s -X POST "$WORKER_CONTROL_SERVER/jobs" \
+-H "Content-Type: application/json" \
+-d '{"matrix_name": "'"$MATRIX_FILE_NAME"'", "algorithm": "lu", "priority": 1}' | sed -E 's/.*"job_id":"([^"]+)".*/\1/')
+echo "Job ID: $JOB_ID"
+echo "Waiting for the result (long-poll up to 30 s)..."
+curl -s -w "\nHTTP %{http_code}\n" -X GET "$WORKER_CONTROL_SERVER/jobs/$JOB_ID?wait=30"
+echo "Deleting the finished job..."
+curl -s -X DELETE "$WORKER_CONTROL_SERVER/jobs/$JOB_ID"
+
+# 9. Test distributed LU decomposition (tiles are spread over all free worker nodes)
+echo ""
+echo ""
+echo "9. Testing distributed LU decomposition by matrix name..."
+curl -X POST "$WORKER_CONTROL_SERVER/calculate_decomposition_of_matrix_by_matrix_name" \
+-H "Content-Type: application/json" \
+-d '{"matrix_name": "'"$MATRIX_FILE_NAME"'", "algorithm": "lu", "options": {"distributed": true, "block_size": 256}}'
+
+# 10. Test solving linear systems with cached factors
+echo ""
+echo ""
+echo "10. Solving A·x = b for one right-hand side (the matrix is factored once)..."
+RHS=$(seq -s, 1 27)
+curl -X POST "$WORKER_CONTROL_SERVER/solve" \
+-H "Content-Type: application/json" \
+-d '{"matrix_name": "'"$MATRIX_FILE_NAME"'", "rhs": ['"$RHS"'], "method": "lu"}'
+echo ""
+echo "Solving for three right-hand sides at once (the cached LU factors are reused)..."
+curl -X POST "$WORKER_CONTROL_SERVER/solve" \
+-H "Content-Type: application/json" \
+-d '{"matrix_name": "'"$MATRIX_FILE_NAME"'", "rhs": [['"$RHS"'], ['"$RHS"'], ['"$RHS"']], "method": "lu"}'
+
+# 11. Test batch decompositions (results are streamed as NDJSON lines as soon as each job finishes)
+echo ""
+echo ""
+echo "11. Requesting LU, QR and LDL of the matrix in one batch..."
+curl -N -X POST "$WORKER_CONTROL_SERVER/batch" \
+-H "Content-Type: application/json" \
+-d '{"matrix_names": ["'"$MATRIX_FILE_NAME"'"], "algorithms": ["lu", "qr", "ldl"]}'
+
+# 12. Test downloading a large result stored as an artifact
+echo ""
+echo ""
+echo "12. Downloading the LU result artifact (results from RESULT_ARTIFACT_MIN_BYTES are stored as artifacts)..."
+ARTIFACT_URL=$(curl -s -X POST "$MAIN_SERVER_URL/calculate_decomposition_of_matrix_by_matrix_name" \
+-H "Content-Type: application/json" \
+-d '{"matrix_name": "'"$MATRIX_FILE_NAME"'", "algorithm": "lu", "accept_artifact": true}' | sed -nE 's/.*"url":"([^"]+)".*/\1/p')
+if [ -n "$ARTIFACT_URL" ]; then
+    curl -s -o result.mtxf -w "Full download: HTTP %{http_code}, %{size_download} bytes\n" "$MAIN_SERVER_URL$ARTIFACT_URL"
+    curl -s -o /dev/null -H "Range: bytes=0-1023" -w "Range download: HTTP %{http_code}, %{size_download} bytes\n" "$MAIN_SERVER_URL$ARTIFACT_URL"
+    rm -f result.mtxf
+else
+    echo "The result is smaller than RESULT_ARTIFACT_MIN_BYTES and was returned inline."
+fi
@@ -0,0 +1,221 @@
+# worker_load.py
+# Реестр и таблица загрузки worker nodes для планировщика.
+# Узлы регистрируются сами (POST /workers/register) и присылают heartbeat с текущим
+# состоянием (ядра, свободная память, свободные слоты); узел без heartbeat дольше
+# WORKER_REGISTRATION_TTL удаляется из реестра. Узлы, заданные статически (WORKER_NODE_URLS),
+# фоновая задача параллельно опрашивает через GET {url}/status с таймаутом на каждый запрос.
+# Планировщик выбирает узел по таблице без сетевых запросов;
+# только если свежих данных нет, таблица обновляется по требованию.
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import httpx
+from logger import log  # Используем кастомный логгер
+from http_client import get_http_client
+
+WORKER_STATUS_INTERVAL = float(os.getenv("WORKER_STATUS_INTERVAL", "1"))
+WORKER_STATUS_TIMEOUT = float(os.getenv("WORKER_STATUS_TIMEOUT", "1"))
+WORKER_STATUS_MAX_AGE = float(os.getenv("WORKER_STATUS_MAX_AGE", "5"))
+WORKER_REGISTRATION_TTL = float(os.getenv("WORKER_REGISTRATION_TTL", "30"))
+
+
+@dataclass
+class WorkerState:
+    name: str
+    url: str
+    status: Dict[str, Any] = field(default_factory=dict)  # Последний ответ /status узла
+    updated_at: Optional[float] = None
+    error: Optional[str] = None
+    reserved: int = 0  # Слоты, занятые планировщиком после последнего обновления
+    registered: bool = False  # Узел зарегистрировался сам и присылает heartbeat
+    last_seen: Optional[float] = None  # Время последнего успешного обновления состояния
+
+    def is_fresh(self) -> bool:
+        return self.error is None and self.updated_at is not None and time.monotonic() - self.updated_at <= WORKER_STATUS_MAX_AGE
+
+    @property
+    def free_slots(self) -> int:
+        free = self.status.get("free_slots", 0) - self.reserved
+        max_jobs = self.status.get("max_jobs")
+        return free if max_jobs is None else min(free, max_jobs)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "available": self.is_fresh(),
+            "registered": self.registered,
+            "free_slots": self.free_slots,
+            "max_jobs": self.status.get("max_jobs"),
+            "cores": self.status.get("cores"),
+            "flop_rate": self.status.get("flop_rate"),
+            "memory_available": self.status.get("memory_available"),
+            "load": self.status.get("load"),
+            "age": None if self.updated_at is None else round(time.monotonic() - self.updated_at, 3),
+            "error": self.error,
+        }
+
+
+class WorkerLoadTable:
+    """
+    Реестр worker nodes с непрерывно обновляемым состоянием.
+    """
+
+    def __init__(self, workers: Dict[str, Optional[str]], interval: float = WORKER_STATUS_INTERVAL):
+        self.interval = interval
+        self.workers: Dict[str, WorkerState] = {
+            name: WorkerState(name=name, url=url) for name, url in workers.items() if url
+        }
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[], None]] = []
+
+    def on_update(self, listener: Callable[[], None]) -> None:
+        """
+        Подписывает функцию на обновление состояния узлов (вызывается в цикле событий).
+        """
+        self._listeners.append(listener)
+
+    def _notify(self) -> None:
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception as e:
+                log(f"Worker load listener failed: {e}", level="error")
+
+    def register(self, name: str, url: str, status: Dict[str, Any]) -> None:
+        """
+        Добавляет узел в реестр (или обновляет адрес уже зарегистрированного узла).
+        """
+        worker = self.workers.get(name)
+        if worker is None or worker.url != url:
+            log(f"Worker {name} registered at {url}")
+            self.workers[name] = WorkerState(name=name, url=url, registered=True)
+        self.workers[name].registered = True
+        self.update(name, status)
+
+    def heartbeat(self, name: str, status: Dict[str, Any]) -> bool:
+        """
+        Обновляет состояние зарегистрированного узла.
+
+        :return: False, если узел не зарегистрирован (он должен зарегистрироваться заново).
+        """
+        if name not in self.workers:
+            return False
+        self.update(name, status)
+        return True
+
+    def deregister(self, name: str) -> bool:
+        if self.workers.pop(name, None) is None:
+            return False
+        log(f"Worker {name} deregistered")
+        return True
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        expired = [
+            name for name, worker in self.workers.items()
+            if worker.registered and worker.last_seen is not None and now - worker.last_seen > WORKER_REGISTRATION_TTL
+        ]
+        for name in expired:
+            log(f"Worker {name} missed heartbeats for {WORKER_REGISTRATION_TTL}s, removing it from the registry", level="warning")
+            del self.workers[name]
+
+    def update(self, name: str, status: Dict[str, Any]) -> None:
+        """
+        Сохраняет свежее состояние узла.
+        """
+        worker = self.workers[name]
+        worker.status, worker.error = status, None
+        worker.updated_at = worker.last_seen = time.monotonic()
+        worker.reserved = 0
+        self._notify()
+
+    async def _probe(self, worker: WorkerState) -> None:
+        try:
+            response = await get_http_client().get(f"{worker.url}/status", timeout=WORKER_STATUS_TIMEOUT)
+            if response.status_code == 200:
+                self.update(worker.name, response.json())
+                return
+            error = f"HTTP {response.status_code}"
+        except (httpx.HTTPError, ValueError) as e:
+            error = str(e) or type(e).__name__
+        if worker.error is None:
+            log(f"Worker {worker.name} ({worker.url}) is unavailable: {error}", level="warning")
+        worker.error = error
+        worker.updated_at = time.monotonic()
+
+    async def refresh(self, static_only: bool = False) -> None:
+        """
+        Опрашивает узлы параллельно; время обновления ограничено WORKER_STATUS_TIMEOUT.
+
+        :param static_only: Опрашивать только статически заданные узлы (зарегистрированные присылают heartbeat).
+        """
+        workers = [worker for worker in self.workers.values() if not (static_only and worker.registered)]
+        await asyncio.gather(*(self._probe(worker) for worker in workers))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self._evict_expired()
+                await self.refresh(static_only=True)
+            except Exception as e:
+                log(f"Worker status refresh failed: {e}", level="error")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        log(f"Worker load table started with {len(self.workers)} static workers (interval {self.interval}s)")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def fresh_workers(self) -> List[WorkerState]:
+        return [worker for worker in self.workers.values() if worker.is_fresh()]
+
+    async def candidates(self) -> List[WorkerState]:
+        """
+        Возвращает доступные узлы со свежим состоянием; если таких нет, сначала обновляет таблицу.
+        """
+        fresh = self.fresh_workers()
+        if not fresh:
+            await self.refresh()
+            fresh = self.fresh_workers()
+        return fresh
+
+    def reserve(self, name: str) -> None:
+        """
+        Учитывает отправленную на узел задачу до следующего обновления его состояния,
+        чтобы параллельные запросы не выбирали один и тот же узел.
+        """
+        worker = self.workers.get(name)
+        if worker is not None:
+            worker.reserved += 1
+
+    def mark_full(self, name: str) -> None:
+        """
+        Считает все слоты узла занятыми до следующего обновления его состояния (узел отклонил задачу).
+        """
+        worker = self.workers.get(name)
+        if worker is not None:
+            worker.reserved = max(worker.reserved, worker.status.get("free_slots", 0)) + 1
+
+    def release(self, name: str) -> None:
+        """
+        Учитывает завершение задачи на узле до следующего обновления его состояния.
+        Задачу могло уже учесть обновление состояния (оно сбрасывает резерв), поэтому резерв
+        не уходит ниже нуля: освобождённый слот появится в таблице со следующим heartbeat.
+        """
+        worker = self.workers.get(name)
+        if worker is not None:
+            worker.reserved = max(worker.reserved - 1, 0)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [worker.summary() for worker in self.workers.values()]
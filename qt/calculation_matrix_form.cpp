@@ -270,6 +270,9 @@ void calculation_matrix_form::on_decompositions_button_clicked() {
         if (operation == "inverse") {
             on_inverse_button_clicked();
             return;
+        } else if (operation == "all") {
+            request_batch_decompositions(matrixName);
+            return;
         } else {
             endpoint = "/calculate_decomposition_of_matrix_by_matrix_name";
         }
@@ -307,20 +310,7 @@ void calculation_matrix_form::on_decompositions_button_clicked() {
                 qDebug() << "Server response:" << responseDoc.toJson(QJsonDocument::Indented);
 
                 if (responseObject.contains("result")) {
-                    QJsonArray resultArray = responseObject["result"].toArray(); // Получаем массив результата
-                    QString algorithm = responseObject["algorithm"].toString(); // Название алгоритма
-                    double timeTaken = responseObject["time_taken"].toDouble(); // Время выполнения
-
-                    // Формируем данные для передачи в окно
-                    QJsonObject results;
-                    results["algorithm"] = algorithm;
-                    results["time_taken"] = timeTaken;
-                    results["blocks"] = resultArray; // Добавляем блоки результата
-
-                    // Открываем окно с результатами
-                    matrix_decomposition_results_window *resultsWindow = new matrix_decomposition_results_window(this);
-                    resultsWindow->setResults(results, operation); // Передаем результаты и выбранный ключ
-                    resultsWindow->exec(); // Отображаем окно в модальном режиме
+                    show_decomposition_result(responseObject, operation);
                 } else {
                     QMessageBox::warning(this, "Ошибка", "No data found for the selected decomposition.");
                 }
@@ -337,6 +327,96 @@ void calculation_matrix_form::on_decompositions_button_clicked() {
 }
 
 
+void calculation_matrix_form::show_decomposition_result(const QJsonObject &responseObject, const QString &operation)
+{
+    QJsonArray resultArray = responseObject["result"].toArray(); // Получаем массив результата
+    QString algorithm = responseObject["algorithm"].toString(); // Название алгоритма
+    double timeTaken = responseObject["time_taken"].toDouble(); // Время выполнения
+
+    // Формируем данные для передачи в окно
+    QJsonObject results;
+    results["algorithm"] = algorithm;
+    results["time_taken"] = timeTaken;
+    results["blocks"] = resultArray; // Добавляем блоки результата
+    // Перестановки строк (LU, LDL) и столбцов (разреженные LU и QR): множители раскладывают переставленную матрицу
+    for (const QString &key : {QStringLiteral("permutation"), QStringLiteral("column_permutation")}) {
+        if (responseObject.contains(key)) {
+            results[key] = responseObject[key];
+        }
+    }
+
+    // Открываем окно с результатами (немодально: результаты пакета приходят по очереди)
+    matrix_decomposition_results_window *resultsWindow = new matrix_decomposition_results_window(this);
+    resultsWindow->setAttribute(Qt::WA_DeleteOnClose);
+    resultsWindow->setResults(results, operation); // Передаем результаты и выбранный ключ
+    resultsWindow->show();
+}
+
+
+void calculation_matrix_form::request_batch_decompositions(const QString &matrixName)
+{
+    // Один запрос на LU, QR и LDL: сервер возвращает результаты построчно (NDJSON) по мере готовности
+    QUrl url(MAIN_SERVER_URL + "/batch");
+    QNetworkRequest request(url);
+    request.setHeader(QNetworkRequest::ContentTypeHeader, "application/json");
+
+    QJsonObject json;
+    json["matrix_names"] = QJsonArray{matrixName};
+    json["algorithms"] = QJsonArray{"lu", "qr", "ldl"};
+    QByteArray data = QJsonDocument(json).toJson();
+
+    QNetworkAccessManager *networkManager = new QNetworkAccessManager(this);
+    QNetworkReply *reply = networkManager->post(request, data);
+
+    // Неполная последняя строка ответа и ошибки отдельных разложений
+    QByteArray *buffer = new QByteArray();
+    QStringList *errors = new QStringList();
+
+    auto processLine = [this, errors](const QByteArray &line) {
+        QJsonObject item = QJsonDocument::fromJson(line).object();
+        QString algorithm = item["algorithm"].toString();
+        if (item["status"].toString() == "done") {
+            show_decomposition_result(item["result"].toObject(), algorithm);
+        } else {
+            errors->append(algorithm.toUpper() + ": " + item["error"].toVariant().toString());
+        }
+    };
+
+    // Каждое готовое разложение показываем сразу, не дожидаясь остальных
+    connect(reply, &QNetworkReply::readyRead, this, [reply, buffer, processLine]() {
+        if (reply->attribute(QNetworkRequest::HttpStatusCodeAttribute).toInt() != 200) {
+            return;
+        }
+        buffer->append(reply->readAll());
+        int newline;
+        while ((newline = buffer->indexOf('\n')) >= 0) {
+            QByteArray line = buffer->left(newline).trimmed();
+            buffer->remove(0, newline + 1);
+            if (!line.isEmpty()) {
+                processLine(line);
+            }
+        }
+    });
+
+    connect(reply, &QNetworkReply::finished, this, [this, reply, buffer, errors, processLine]() {
+        if (reply->error() == QNetworkReply::NoError) {
+            if (!buffer->trimmed().isEmpty()) {
+                processLine(buffer->trimmed());
+            }
+            if (!errors->isEmpty()) {
+                QMessageBox::warning(this, "Ошибка", "Не удалось выполнить разложения:\n" + errors->join("\n"));
+            }
+        } else {
+            QString errorMessage = reply->errorString();
+            QMessageBox::critical(this, "Ошибка", "Ошибка выполнения операции: " + errorMessage);
+        }
+        delete buffer;
+        delete errors;
+        reply->deleteLater();
+    });
+}
+
+
 
 // Функция "затычка"
 void calculation_matrix_form::longRunningOperation()
@@ -50,6 +50,8 @@ private slots:
 private:
     Ui::calculation_matrix_form *ui;
     void setup_ui();
+    void request_batch_decompositions(const QString &matrixName);
+    void show_decomposition_result(const QJsonObject &responseObject, const QString &operation);
 
     QString m_userlogin;
 
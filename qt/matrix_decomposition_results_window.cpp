@@ -56,22 +56,64 @@ void matrix_decomposition_results_window::setResults(const QJsonObject &results,
 
     qDebug() << "Массив 'blocks': " << resultArray;
 
+    // Множители LU и LDL раскладывают матрицу с переставленными строками (P·A), а не саму A
+    bool permuted = results.contains("permutation");
+    bool columnPermuted = results.contains("column_permutation");
+
     // В зависимости от типа разложения выводим соответствующие матрицы
     if (selectedKey.toLower() == "lu") {
-        addMatrixTextOutput(resultArray.at(0).toArray(), "Матрица L");
-        addMatrixTextOutput(resultArray.at(1).toArray(), "Матрица U");
+        if (permuted) {
+            addPermutationTextOutput(results["permutation"].toArray(),
+                                     "Перестановка строк P (P·A = L·U: строка i произведения L·U - строка perm[i] матрицы A)");
+        }
+        if (columnPermuted) {
+            addPermutationTextOutput(results["column_permutation"].toArray(),
+                                     "Перестановка столбцов Q (P·A·Q = L·U: столбец j произведения L·U - столбец perm[j] матрицы A)");
+        }
+        addMatrixTextOutput(resultArray.at(0).toArray(), permuted ? "Матрица L (множитель P·A)" : "Матрица L");
+        addMatrixTextOutput(resultArray.at(1).toArray(), permuted ? "Матрица U (множитель P·A)" : "Матрица U");
     } else if (selectedKey.toLower() == "qr") {
-        addMatrixTextOutput(resultArray.at(0).toArray(), "Матрица Q");
-        addMatrixTextOutput(resultArray.at(1).toArray(), "Матрица R");
+        if (columnPermuted) {
+            addPermutationTextOutput(results["column_permutation"].toArray(),
+                                     "Перестановка столбцов P (A·P = Q·R: столбец j произведения Q·R - столбец perm[j] матрицы A)");
+        }
+        if (resultArray.size() == 1) {
+            // Для разреженной матрицы сервер возвращает только R (без явного Q)
+            addMatrixTextOutput(resultArray.at(0).toArray(), "Матрица R");
+        } else {
+            addMatrixTextOutput(resultArray.at(0).toArray(), "Матрица Q");
+            addMatrixTextOutput(resultArray.at(1).toArray(), "Матрица R");
+        }
     } else if (selectedKey.toLower() == "ldl") {
-        addMatrixTextOutput(resultArray.at(0).toArray(), "Матрица L");
-        addMatrixTextOutput(resultArray.at(1).toArray(), "Матрица D");
-        addMatrixTextOutput(resultArray.at(2).toArray(), "Матрица L.T");
+        if (permuted) {
+            addPermutationTextOutput(results["permutation"].toArray(),
+                                     "Перестановка P (P·A·Pᵀ = L·D·Lᵀ: строки и столбцы A берутся в порядке perm)");
+        }
+        addMatrixTextOutput(resultArray.at(0).toArray(), permuted ? "Матрица L (множитель P·A·Pᵀ)" : "Матрица L");
+        // D приходит в компактном виде: диагональ и внедиагональные элементы блоков 2×2
+        addMatrixTextOutput(resultArray.at(1).toArray(), "Матрица D (диагональ, поддиагональ)");
+        if (resultArray.size() > 2) {
+            addMatrixTextOutput(resultArray.at(2).toArray(), "Матрица L.T");
+        }
     } else {
         qDebug() << "Неизвестный тип разложения: " << selectedKey;
     }
 }
 
+void matrix_decomposition_results_window::addPermutationTextOutput(const QJsonArray &permutation, const QString &title)
+{
+    if (permutation.isEmpty()) {
+        return;
+    }
+
+    // Вектор перестановки: perm[i] - номер строки (столбца) исходной матрицы на позиции i
+    QStringList indices;
+    for (const QJsonValue &index : permutation) {
+        indices.append(QString::number(index.toInt()));
+    }
+    matrixTextOutput->append(title + ":\n" + indices.join(" ") + "\n");
+}
+
 void matrix_decomposition_results_window::addMatrixTextOutput(const QJsonArray &matrixData, const QString &title)
 {
     qDebug() << "matrix_data: " <<  matrixData << '\n';
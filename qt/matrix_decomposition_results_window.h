@@ -26,6 +26,7 @@ private:
     QTextEdit *matrixTextOutput;
 
     void addMatrixTextOutput(const QJsonArray &matrixData, const QString &title);
+    void addPermutationTextOutput(const QJsonArray &permutation, const QString &title);
 };
 
 #endif // MATRIX_DECOMPOSITION_RESULTS_WINDOW_H
@@ -15,6 +15,7 @@ OperationSelectionDialog::OperationSelectionDialog(QWidget *parent)
     operationComboBox->addItem("LU разложение", "lu");
     operationComboBox->addItem("QR разложение", "qr");
     operationComboBox->addItem("LDL разложение", "ldl");
+    operationComboBox->addItem("LU, QR и LDL одним запросом", "all");
     layout->addWidget(operationComboBox);
 
     QPushButton *sendButton = new QPushButton("Отправить", this);